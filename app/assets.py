@@ -0,0 +1,175 @@
+"""CSS/JS propios con nombre por contenido, precomprimidos y cacheables para siempre.
+
+`flask build-assets` arma cada bundle de BUNDLES (concatena, minifica), lo escribe en
+static/dist/ como <nombre>.<hash>.<ext> junto con .gz (y .br si está el módulo brotli)
+y deja static/dist/manifest.json con {nombre lógico: nombre con hash}. Hoy cada bundle
+tiene un solo archivo fuente. La minificación usa rjsmin/rcssmin (requirements.txt);
+sin rjsmin el JS queda sin minificar y el build lo avisa.
+En los templates `asset_url('js/main.js')` apunta al archivo con hash, servido por
+/assets/ con la variante comprimida que acepte el navegador y Cache-Control immutable.
+Sin build (desarrollo) cae en /static/ con el archivo original.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from flask import abort, current_app, send_file, url_for
+
+from .compression import accepts_encoding
+
+try:  # opcional
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:  # opcional: minificadores más agresivos si están instalados
+    import rcssmin
+except ImportError:  # pragma: no cover
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover
+    rjsmin = None
+
+# Nombre lógico -> archivos de static/ que lo componen, en orden
+BUNDLES = {
+    "css/style.css": ["css/style.css"],
+    "js/main.js": ["js/main.js"],
+    "js/admin_products.js": ["js/admin_products.js"],
+}
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+IMMUTABLE_MAX_AGE = 31536000
+_HASH_LEN = 12
+_MIMETYPES = {".css": "text/css; charset=utf-8", ".js": "text/javascript; charset=utf-8"}
+
+_manifest_cache = {"path": None, "mtime": None, "data": {}}
+
+
+def _minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    return text.replace(";}", "}").strip()
+
+
+def _minify_js(text):
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    # Sin tokenizer no hay transformación segura: la sangría, las líneas vacías y lo que
+    # empieza con // pueden ser parte de un template literal o de una URL. Se sirve tal
+    # cual; el .gz/.br se lleva casi todo el espacio en blanco.
+    return text
+
+
+def missing_minifiers():
+    """Minificadores no instalados (el build sigue, con menos reducción)."""
+    return [name for name, mod in (("rjsmin", rjsmin), ("rcssmin", rcssmin)) if mod is None]
+
+
+def _dist_root(static_folder):
+    return os.path.join(static_folder, DIST_DIR)
+
+
+def _write(path, data):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_folder, prune=True):
+    """Arma los bundles en static/dist y escribe el manifest. Devuelve el manifest."""
+    dist = _dist_root(static_folder)
+    manifest = {}
+    written = set()
+    for name, sources in BUNDLES.items():
+        parts = []
+        for src in sources:
+            with open(os.path.join(static_folder, src), "r", encoding="utf-8") as f:
+                parts.append(f.read())
+        base, ext = os.path.splitext(name)
+        text = "\n".join(parts)
+        text = _minify_css(text) if ext == ".css" else _minify_js(text)
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()[:_HASH_LEN]
+        hashed = f"{base}.{digest}{ext}"
+        out = os.path.join(dist, hashed)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        if not os.path.exists(out):
+            _write(out, data)
+            # mtime=0: el .gz es idéntico entre builds del mismo contenido
+            _write(f"{out}.gz", gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(f"{out}.br", brotli.compress(data, quality=11))
+        manifest[name] = hashed
+        written.update({hashed, f"{hashed}.gz", f"{hashed}.br"})
+    if prune:
+        # Solo se conservan los del build anterior (workers viejos durante un deploy)
+        previous = set(load_manifest_file(os.path.join(dist, MANIFEST_NAME)).values())
+        keep = written | {f"{h}{suffix}" for h in previous for suffix in ("", ".gz", ".br")}
+        for root, _dirs, files in os.walk(dist):
+            for fn in files:
+                rel = os.path.relpath(os.path.join(root, fn), dist).replace(os.sep, "/")
+                if rel != MANIFEST_NAME and rel not in keep:
+                    os.unlink(os.path.join(root, fn))
+    _write(os.path.join(dist, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def load_manifest_file(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _manifest():
+    path = os.path.join(_dist_root(current_app.static_folder), MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    cache = _manifest_cache
+    if cache["path"] != path or cache["mtime"] != mtime:
+        cache.update(path=path, mtime=mtime, data=load_manifest_file(path) if mtime else {})
+    return cache["data"]
+
+
+def asset_url(name):
+    """URL del asset con hash (si hay build) o del archivo original en /static/."""
+    hashed = _manifest().get(name)
+    if hashed:
+        return url_for("assets", filename=hashed)
+    return url_for("static", filename=name)
+
+
+def serve_asset(filename):
+    dist = _dist_root(current_app.static_folder)
+    path = os.path.normpath(os.path.join(dist, filename))
+    ext = os.path.splitext(filename)[1]
+    if not path.startswith(dist + os.sep) or ext not in _MIMETYPES or not os.path.isfile(path):
+        abort(404)
+    encoding = None
+    for enc, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if accepts_encoding(enc) and os.path.isfile(path + suffix):
+            path, encoding = path + suffix, enc
+            break
+    resp = send_file(path, mimetype=_MIMETYPES[ext], conditional=True, etag=True, max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return resp
+
+
+def init_app(app):
+    app.add_url_rule("/assets/<path:filename>", "assets", serve_asset)
+    app.jinja_env.globals["asset_url"] = asset_url
@@ -0,0 +1,159 @@
+"""Tareas de arranque que tocan la base o el filesystem.
+
+Antes corrían dentro de create_app en cada worker de gunicorn. Ahora se ejecutan
+una vez por deploy/contenedor con `flask bootstrap` (ver Procfile), y create_app
+solo las invoca cuando no está en modo lean (útil para `flask run` en desarrollo).
+"""
+import os
+import shutil
+
+from sqlalchemy import inspect
+
+from . import db, slugify
+from .volume_sync import sync_to_volume
+
+
+UPLOAD_SUBDIRS = ["products", "slides", "consultas", "brands"]
+
+
+def link_static_to_volume(app):
+    """Enlaza carpetas de imágenes a un volumen persistente si está habilitado.
+    Registra logs detallados para diagnosticar problemas de montaje o permisos."""
+    try:
+        enabled = os.getenv("ENABLE_UPLOAD_VOLUME_LINKS", "false").lower() == "true"
+        upload_root = os.getenv("UPLOAD_ROOT")
+        img_src = os.path.join(app.static_folder, "img")
+        direct_mount = os.getenv("STATIC_IMG_DIRECT_MOUNT", "false").lower() == "true"
+        if direct_mount:
+            app.logger.info(f"[uploads-volume] modo direct-mount activo; se asume volumen ya montado en {img_src}. No se hacen symlinks.")
+            return
+        if not enabled or not upload_root:
+            app.logger.info(f"[uploads-volume] deshabilitado (ENABLE_UPLOAD_VOLUME_LINKS={enabled}, UPLOAD_ROOT={upload_root})")
+            return
+        app.logger.info(f"[uploads-volume] inicio enlace. upload_root={upload_root} img_src={img_src}")
+        subdirs = UPLOAD_SUBDIRS
+        os.makedirs(upload_root, exist_ok=True)
+        for name in subdirs:
+            os.makedirs(os.path.join(upload_root, name), exist_ok=True)
+        app.logger.info(f"[uploads-volume] subdirs asegurados: {', '.join(subdirs)}")
+        # Copiar al volumen solo lo nuevo/modificado (manifiesto + lock entre procesos)
+        report = sync_to_volume(img_src, upload_root, subdirs, logger=app.logger)
+        if report["locked"]:
+            app.logger.info("[uploads-volume] otro proceso está enlazando el volumen; se omite")
+            return
+        for err in report["errors"]:
+            app.logger.warning(f"[uploads-volume] fallo copiando {err}")
+        # Crear / reemplazar enlaces
+        for name in subdirs:
+            target = os.path.join(upload_root, name)
+            link_path = os.path.join(img_src, name)
+            try:
+                if os.path.islink(link_path):
+                    cur = os.readlink(link_path)
+                    if cur != target:
+                        os.unlink(link_path)
+                        os.symlink(target, link_path)
+                        app.logger.info(f"[uploads-volume] symlink actualizado {link_path} -> {target}")
+                    else:
+                        app.logger.info(f"[uploads-volume] symlink OK {link_path} -> {cur}")
+                    continue
+
+                # Si existe carpeta física (ya sincronizada arriba), reemplazarla por el symlink
+                if os.path.isdir(link_path):
+                    if report["subdirs"].get(name, {}).get("errors"):
+                        app.logger.warning(f"[uploads-volume] hubo errores copiando {link_path}; se conserva la carpeta local")
+                        continue
+                    try:
+                        shutil.rmtree(link_path)
+                        app.logger.info(f"[uploads-volume] carpeta original eliminada {link_path}")
+                    except Exception as e_rm:
+                        app.logger.warning(f"[uploads-volume] no se pudo eliminar {link_path}: {e_rm}")
+                        continue
+
+                if not os.path.exists(target):
+                    os.makedirs(target, exist_ok=True)
+                try:
+                    os.symlink(target, link_path)
+                    app.logger.info(f"[uploads-volume] symlink creado {link_path} -> {target}")
+                except FileExistsError:
+                    app.logger.warning(f"[uploads-volume] todavía existe {link_path} impidiendo symlink; se seguirá usando almacenamiento local")
+            except Exception as e_link:
+                app.logger.warning(f"[uploads-volume] fallo symlink {link_path}: {e_link}")
+    except Exception as e_outer:
+        app.logger.warning(f"[uploads-volume] error general enlace: {e_outer}")
+
+
+def seed_defaults(app):
+    """Crea categorías base, usuario admin y SiteInfo si faltan. Idempotente.
+    Debe llamarse dentro de un app_context."""
+    from .models import Category, User, SiteInfo
+
+    try:
+        # Un solo inspector para todas las verificaciones de tablas
+        tables = set(inspect(db.engine).get_table_names())
+        if "categories" in tables and Category.query.count() == 0:
+            for name in ["Pintureria", "Electricidad", "Ferreteria", "Herramientas"]:
+                c = Category(name=name, slug=slugify(name))
+                db.session.add(c)
+            db.session.commit()
+        # Crear usuario admin por defecto (idempotente, tolerante a concurrencia)
+        if "users" in tables:
+            try:
+                from sqlalchemy.exc import IntegrityError
+                target_user = User.query.filter_by(username="PaulukN").first()
+                if not target_user:
+                    # Si existe el usuario 'admin' viejo, lo actualizamos
+                    old_admin = User.query.filter_by(username="admin").first()
+                    if old_admin:
+                        old_admin.username = "PaulukN"
+                        old_admin.set_password("RRA2000")
+                        db.session.commit()
+                    else:
+                        # Si no, creamos el nuevo
+                        new_user = User(username="PaulukN", is_admin=True)
+                        new_user.set_password("RRA2000")
+                        db.session.add(new_user)
+                        db.session.commit()
+            except IntegrityError:
+                # Otro proceso pudo crearlo en paralelo; ignorar
+                try:
+                    db.session.rollback()
+                except Exception:
+                    pass
+        # Seed SiteInfo por defecto
+        if "site_info" in tables and SiteInfo.query.count() == 0:
+            info = SiteInfo(
+                store_name="Ferretería Casa Pauluk",
+                address="Moreno 199, Tres Isletas, Chaco, Argentina",
+                hours="Lunes a Viernes: 08:00-12:00 / 16:00-20:00 | Sábados: 08:00-12:30 / 16:30-20:00",
+                email=None,
+                phone=None,
+                instagram=None,
+            )
+            db.session.add(info)
+            db.session.commit()
+        # Upgrade nombre si existe antiguo sin 'Casa Pauluk'
+        if "site_info" in tables:
+            current_info = SiteInfo.query.first()
+            if current_info and "casa pauluk" not in current_info.store_name.lower():
+                # Solo modificar si es exactamente 'Ferretería' o muy corto
+                if current_info.store_name.strip().lower() in {"ferretería", "ferreteria"}:
+                    current_info.store_name = "Ferretería Casa Pauluk"
+                    db.session.commit()
+    except Exception as _e:  # si aún no hay tablas o falla algo, limpiar transacción
+        # Importante: si ocurre un error en una transacción SQLAlchemy queda en estado 'aborted'
+        # y posteriores queries disparan psycopg 'InFailedSqlTransaction'. Hacemos rollback.
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        app.logger.warning(f"Seed omitido o falló inicialización: {_e}")
+
+
+def run_bootstrap(app, seed=True, link_volume=True):
+    """Ejecuta las tareas de arranque seleccionadas."""
+    if link_volume:
+        link_static_to_volume(app)
+    if seed:
+        with app.app_context():
+            seed_defaults(app)
@@ -0,0 +1,264 @@
+"""Cache por proceso de estructuras del catálogo que se leen en casi todas las páginas.
+
+Guarda datos planos (SimpleNamespace / dicts), nunca instancias ORM, así se pueden
+compartir entre requests y threads sin tocar la sesión. Con gunicorn en modo preload
+(`gunicorn.conf.py`) se construyen en el master antes del fork y los workers las heredan
+copy-on-write.
+
+Cada entrada declara de qué namespaces depende (ver catalog_versions): se invalida al
+commitear en este proceso y cuando el chequeo de versiones detecta cambios de otro
+worker. El TTL (CATALOG_CACHE_TTL) queda como red de seguridad.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import func
+
+from . import db, catalog_versions
+
+_lock = threading.Lock()
+_entries = {}  # key -> (deps, built_at, value)
+
+
+def get_or_build(key, deps, builder, ttl=None):
+    """Devuelve el valor cacheado de `key` o lo construye con builder()."""
+    if ttl is None:
+        ttl = current_app.config.get("CATALOG_CACHE_TTL", 60)
+    catalog_versions.poll()
+    now = time.monotonic()
+    hit = _entries.get(key)
+    if hit is not None and (ttl <= 0 or now - hit[1] < ttl):
+        return hit[2]
+    value = builder()
+    with _lock:
+        _entries[key] = (frozenset(deps), now, value)
+    return value
+
+
+def invalidate(*namespaces):
+    """Descarta las entradas que dependen de alguno de los namespaces (todas si no se pasa ninguno)."""
+    with _lock:
+        if not namespaces:
+            _entries.clear()
+            return
+        wanted = set(namespaces)
+        for key in [k for k, (deps, _, _) in _entries.items() if deps & wanted]:
+            _entries.pop(key, None)
+
+
+# --- Builders -----------------------------------------------------------------
+
+def _product_row(p):
+    return SimpleNamespace(
+        id=p.id,
+        name=p.name,
+        sku=p.sku,
+        price=p.price,
+        in_stock=p.in_stock,
+        featured=p.featured,
+        image_filename=p.image_filename,
+        category_id=p.category_id,
+        brand_id=p.brand_id,
+        updated_at=p.updated_at,
+    )
+
+
+def _build_category_tree():
+    from .models import Category
+
+    rows = (
+        db.session.query(Category.id, Category.name, Category.slug, Category.parent_id)
+        .order_by(Category.name)
+        .all()
+    )
+    nodes = {r.id: SimpleNamespace(id=r.id, name=r.name, slug=r.slug, parent_id=r.parent_id, children=[]) for r in rows}
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node.parent_id) if node.parent_id else None
+        (parent.children if parent else roots).append(node)
+    return {"roots": roots, "by_id": nodes, "by_slug": {n.slug: n for n in nodes.values()}}
+
+
+def _build_brand_list():
+    from .models import Brand
+
+    rows = db.session.query(Brand.id, Brand.name, Brand.slug, Brand.visible).order_by(Brand.name).all()
+    return [SimpleNamespace(id=r.id, name=r.name, slug=r.slug, visible=r.visible) for r in rows]
+
+
+def _build_site_info():
+    from .models import SiteInfo
+
+    si = SiteInfo.query.first()
+    if si is None:
+        return None
+    return SimpleNamespace(**{c.key: getattr(si, c.key) for c in SiteInfo.__table__.columns})
+
+
+def _subtree_ids(node):
+    ids = [node.id]
+    stack = list(node.children)
+    while stack:
+        n = stack.pop()
+        ids.append(n.id)
+        stack.extend(n.children)
+    return ids
+
+
+def _build_homepage_snapshot(homepage_slugs):
+    from .models import Product, Slide
+
+    products = [_product_row(p) for p in Product.query.order_by(Product.created_at.desc()).limit(10).all()]
+    featured = [
+        _product_row(p)
+        for p in Product.query.filter_by(featured=True)
+        .order_by(Product.updated_at.desc(), Product.created_at.desc())
+        .limit(12)
+        .all()
+    ]
+    slides = [
+        SimpleNamespace(id=s.id, image_filename=s.image_filename, order=s.order)
+        for s in Slide.query.filter_by(visible=True)
+        .order_by(Slide.order.asc(), Slide.created_at.desc())
+        .limit(15)
+        .all()
+    ]
+    tree = category_tree()
+    homepage_categories = []
+    for slug in (homepage_slugs or [])[:10]:
+        cat = tree["by_slug"].get(slug)
+        if not cat:
+            continue
+        prods = (
+            Product.query.filter(Product.category_id.in_(_subtree_ids(cat)))
+            .order_by(func.random())
+            .limit(10)
+            .all()
+        )
+        homepage_categories.append({"category": cat, "products": [_product_row(p) for p in prods]})
+    return {
+        "products": products,
+        "featured_products": featured,
+        "slides": slides,
+        "homepage_categories": homepage_categories,
+    }
+
+
+# --- API pública ----------------------------------------------------------------
+
+def category_tree():
+    """Árbol completo de categorías: {"roots", "by_id", "by_slug"} con nodos planos."""
+    return get_or_build("category_tree", {"categories"}, _build_category_tree)
+
+
+def nav_categories():
+    return category_tree()["roots"]
+
+
+def category_branch_ids(category_id):
+    """Id de la categoría más los de todos sus descendientes ([] si no existe)."""
+    node = category_tree()["by_id"].get(category_id)
+    return _subtree_ids(node) if node else []
+
+
+def brand_list(visible_only=False):
+    brands = get_or_build("brand_list", {"brands"}, _build_brand_list)
+    if visible_only:
+        return [b for b in brands if b.visible]
+    return brands
+
+
+def site_info():
+    """Copia plana de la fila de SiteInfo (o None) para las plantillas."""
+    return get_or_build("site_info", {"siteinfo"}, _build_site_info)
+
+
+def homepage_snapshot(homepage_slugs):
+    """Productos recientes, destacados, slides y categorías de portada ya resueltos.
+    Los productos al azar por categoría quedan fijos mientras dure la entrada."""
+    key = ("homepage", tuple(homepage_slugs or ()))
+    return get_or_build(
+        key,
+        {"products", "categories", "slides", "homepage"},
+        lambda: _build_homepage_snapshot(homepage_slugs),
+    )
+
+
+def compile_templates(app):
+    """Compila todas las plantillas .html al cache del entorno Jinja. Devuelve cuántas."""
+    env = app.jinja_env
+    compiled = 0
+    for name in env.list_templates(extensions=["html"]):
+        try:
+            env.get_template(name)
+            compiled += 1
+        except Exception as exc:
+            app.logger.warning(f"[catalog-cache] no se pudo compilar {name}: {exc}")
+    return compiled
+
+
+def prime(app, homepage_slugs=None, deadline=None):
+    """Construye las entradas y compila todas las plantillas. Pensado para correr en el
+    master de gunicorn antes del fork; nunca lanza. Devuelve un resumen dict.
+
+    `deadline` (time.perf_counter()) se revisa antes de cada paso: los que no entran
+    quedan en report["skipped"]. Un paso ya empezado no se corta."""
+    t0 = time.perf_counter()
+    report = {"templates": 0, "caches": [], "errors": [], "skipped": []}
+
+    def due(step):
+        if deadline is not None and time.perf_counter() >= deadline:
+            report["skipped"].append(step)
+            return True
+        return False
+
+    if not due("templates"):
+        report["templates"] = compile_templates(app)
+    with app.app_context():
+        try:
+            # Línea base de versiones antes de construir: lo que cambie después se detecta
+            catalog_versions.poll(force=True)
+            from . import catalog_engine, suggest
+
+            steps = [
+                ("category_tree", category_tree),
+                ("brand_list", brand_list),
+                ("site_info", site_info),
+                ("homepage", lambda: homepage_snapshot(_homepage_slugs(homepage_slugs))),
+                ("suggest", suggest.warm),
+            ]
+            if catalog_engine.enabled():
+                steps.append(("catalog_engine", catalog_engine.warm))
+            for name, step in steps:
+                if due(name):
+                    continue
+                step()
+                report["caches"].append(name)
+        except Exception as exc:
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
+            report["errors"].append(str(exc))
+            app.logger.warning(f"[catalog-cache] precarga incompleta: {exc}")
+        finally:
+            db.session.remove()
+    report["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+    app.logger.info(
+        f"[catalog-cache] precargado ({report['templates']} plantillas, {', '.join(report['caches']) or 'sin datos'}) "
+        f"en {report['elapsed_ms']:.0f} ms"
+        + (f"; sin tiempo para {', '.join(report['skipped'])}" if report["skipped"] else "")
+    )
+    return report
+
+
+def _homepage_slugs(slugs):
+    if slugs is None:
+        from .routes import _load_homepage_categories
+        slugs = _load_homepage_categories()
+    return slugs
+
+
+catalog_versions.subscribe(lambda namespaces: invalidate(*namespaces))
@@ -0,0 +1,359 @@
+"""Motor en memoria (opcional, NumPy) para los listados públicos: categoría, marca y búsqueda.
+
+Guarda por worker una foto columnar de los campos de listado: precio, stock, destacado,
+fecha de alta e índices de categoría y marca en arreglos NumPy, más un índice invertido
+palabra -> filas sobre nombre, descripciones y SKU. Un listado se resuelve con máscaras
+booleanas; solo los ids de la página se leen después de la base, por PK.
+
+Respeta la semántica de la consulta SQL de las vistas: cada palabra de `q` tiene que
+aparecer como substring (ILIKE, sin plegar acentos) en algún campo, y el orden es por
+created_at descendente con los NULL primero, como en PostgreSQL. Las palabras con
+comodines de LIKE (% _ \\) y los errores hacen que la vista use el camino SQL.
+
+Se activa con CATALOG_ENGINE_ENABLED=true si NumPy está instalado. Los cambios de
+productos llegan por catalog_versions: se leen solo las filas con updated_at posterior a
+la última vista, menos CATALOG_REFRESH_LOOKBACK_SECONDS (una transacción sella
+updated_at antes de commitear y puede terminar después del refresco), y las lápidas de
+deleted_records. Un cambio de categorías o marcas rearma todo. Comparación contra el camino SQL: scripts/bench_catalog_engine.py.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import inspect as sa_inspect, select
+
+from . import db, catalog_versions
+
+# NumPy (opcional) se importa en enabled(): con el motor apagado el arranque no lo paga
+np = None
+_numpy_missing = False
+
+_LIKE_WILDCARDS = ("%", "_", "\\")
+_TOKEN_CACHE_SIZE = 256
+# NULL en created_at: primero en orden descendente, como PostgreSQL
+_NULL_CREATED = 2**62
+
+_lock = threading.Lock()
+_state = {"snapshot": None, "dirty": set()}
+
+
+class _Snapshot:
+    """Foto inmutable para los lectores: un refresco arma otra y la reemplaza."""
+
+    def __init__(self):
+        self.ids = []  # fila -> UUID
+        self.pos = {}  # UUID -> fila
+        self.texts = []  # fila -> nombre/descripciones/SKU en minúsculas
+        self.skus = []  # fila -> SKU en minúsculas
+        self.vocab = {}  # palabra -> np.ndarray de filas
+        self.cat_index = {}  # UUID de categoría -> índice
+        self.brand_index = {}
+        self.cat_ids = []
+        self.brand_ids = []
+        self.price = self.in_stock = self.featured = self.created = None
+        self.cat = self.brand = self.alive = self.order = None
+        self.watermark = None
+        self.deleted_watermark = None
+        self.token_cache = {}
+
+
+def _load_numpy():
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover
+            _numpy_missing = True
+        else:
+            np = numpy
+    return np is not None
+
+
+def enabled():
+    return bool(current_app.config.get("CATALOG_ENGINE_ENABLED", False)) and _load_numpy()
+
+
+def _columns():
+    from .models import Product
+
+    return (
+        Product.id, Product.name, Product.sku, Product.short_desc, Product.long_desc, Product.price,
+        Product.in_stock, Product.featured, Product.created_at, Product.category_id, Product.brand_id,
+        Product.updated_at,
+    )
+
+
+def _text(row):
+    return "\n".join(v for v in (row.name, row.short_desc, row.long_desc, row.sku) if v).lower()
+
+
+def _idx(index, ids, key):
+    if key is None:
+        return -1
+    i = index.get(key)
+    if i is None:
+        i = index[key] = len(ids)
+        ids.append(key)
+    return i
+
+
+def _created(value):
+    return _NULL_CREATED if value is None else int(value.timestamp() * 1_000_000)
+
+
+def _track_watermark(snap, row):
+    if row.updated_at is not None and (snap.watermark is None or row.updated_at > snap.watermark):
+        snap.watermark = row.updated_at
+
+
+def _build_full():
+    snap = _Snapshot()
+    price, in_stock, featured, created, cat, brand = [], [], [], [], [], []
+    postings = {}
+    stmt = select(*_columns()).execution_options(yield_per=2000)
+    for row in db.session.execute(stmt):
+        i = len(snap.ids)
+        snap.ids.append(row.id)
+        snap.pos[row.id] = i
+        text = _text(row)
+        snap.texts.append(text)
+        snap.skus.append((row.sku or "").lower())
+        for word in set(text.split()):
+            postings.setdefault(word, []).append(i)
+        price.append(float("nan") if row.price is None else float(row.price))
+        in_stock.append(bool(row.in_stock))
+        featured.append(bool(row.featured))
+        created.append(_created(row.created_at))
+        cat.append(_idx(snap.cat_index, snap.cat_ids, row.category_id))
+        brand.append(_idx(snap.brand_index, snap.brand_ids, row.brand_id))
+        _track_watermark(snap, row)
+    snap.vocab = {w: np.asarray(rows, dtype=np.int32) for w, rows in postings.items()}
+    snap.price = np.asarray(price, dtype=np.float64)
+    snap.in_stock = np.asarray(in_stock, dtype=bool)
+    snap.featured = np.asarray(featured, dtype=bool)
+    snap.created = np.asarray(created, dtype=np.int64)
+    snap.cat = np.asarray(cat, dtype=np.int32)
+    snap.brand = np.asarray(brand, dtype=np.int32)
+    snap.alive = np.ones(len(snap.ids), dtype=bool)
+    _apply_deleted(snap)
+    snap.order = np.argsort(-snap.created, kind="stable")
+    return snap
+
+
+def _lookback(mark):
+    if mark is None:
+        return None
+    return mark - timedelta(seconds=current_app.config.get("CATALOG_REFRESH_LOOKBACK_SECONDS", 300))
+
+
+def _apply_deleted(snap, touched=None):
+    """Marca como borradas las filas con lápida posterior a la última vista, salvo las que
+    volvieron a escribirse después (touched: id -> updated_at; None = foto completa, solo
+    se avanza la marca de agua). False si no existe la tabla de lápidas."""
+    from .models import DeletedRecord
+
+    if not sa_inspect(db.engine).has_table(DeletedRecord.__tablename__):
+        return False
+    stmt = select(DeletedRecord.record_id, DeletedRecord.deleted_at).where(DeletedRecord.table_name == "products")
+    since = snap.deleted_watermark
+    if since is not None:
+        stmt = stmt.where(DeletedRecord.deleted_at >= _lookback(since))
+    for record_id, deleted_at in db.session.execute(stmt):
+        i = snap.pos.get(record_id) if touched is not None else None
+        written = touched.get(record_id) if touched else None
+        if i is not None and (written is None or written < deleted_at):
+            snap.alive[i] = False
+        if since is None or deleted_at > since:
+            since = deleted_at
+    snap.deleted_watermark = since
+    return True
+
+
+def _build_incremental(old):
+    """Copia la foto y le aplica las filas modificadas desde la última marca de agua (menos
+    el margen de relectura; aplicar dos veces la misma fila no cambia nada)."""
+    from .models import Product
+
+    if old.watermark is None:
+        return _build_full()
+    rows = db.session.execute(select(*_columns()).where(Product.updated_at >= _lookback(old.watermark))).all()
+    snap = _Snapshot()
+    snap.ids, snap.pos, snap.texts, snap.skus = list(old.ids), dict(old.pos), list(old.texts), list(old.skus)
+    snap.cat_index, snap.cat_ids = dict(old.cat_index), list(old.cat_ids)
+    snap.brand_index, snap.brand_ids = dict(old.brand_index), list(old.brand_ids)
+    snap.watermark, snap.deleted_watermark = old.watermark, old.deleted_watermark
+    new = [r for r in rows if r.id not in snap.pos]
+    grow = len(new)
+
+    def extend(arr, fill):
+        return np.concatenate([arr, np.full(grow, fill, dtype=arr.dtype)]) if grow else arr.copy()
+
+    snap.price, snap.in_stock, snap.featured = extend(old.price, np.nan), extend(old.in_stock, False), extend(old.featured, False)
+    snap.created, snap.cat, snap.brand = extend(old.created, 0), extend(old.cat, -1), extend(old.brand, -1)
+    snap.alive = extend(old.alive, False)
+    for r in new:
+        snap.pos[r.id] = len(snap.ids)
+        snap.ids.append(r.id)
+        snap.texts.append("")
+        snap.skus.append("")
+
+    added, removed = {}, {}
+    for r in rows:
+        i = snap.pos[r.id]
+        text = _text(r)
+        before, after = set(snap.texts[i].split()), set(text.split())
+        for w in after - before:
+            added.setdefault(w, []).append(i)
+        for w in before - after:
+            removed.setdefault(w, []).append(i)
+        snap.texts[i] = text
+        snap.skus[i] = (r.sku or "").lower()
+        snap.price[i] = np.nan if r.price is None else float(r.price)
+        snap.in_stock[i] = bool(r.in_stock)
+        snap.featured[i] = bool(r.featured)
+        snap.created[i] = _created(r.created_at)
+        snap.cat[i] = _idx(snap.cat_index, snap.cat_ids, r.category_id)
+        snap.brand[i] = _idx(snap.brand_index, snap.brand_ids, r.brand_id)
+        snap.alive[i] = True
+        _track_watermark(snap, r)
+
+    # Postings copy-on-write: solo se reemplazan los arreglos de las palabras tocadas
+    snap.vocab = dict(old.vocab)
+    for w in set(added) | set(removed):
+        current = snap.vocab.get(w, np.empty(0, dtype=np.int32))
+        if w in removed:
+            current = np.setdiff1d(current, np.asarray(removed[w], dtype=np.int32), assume_unique=True)
+        if w in added:
+            current = np.union1d(current, np.asarray(added[w], dtype=np.int32)).astype(np.int32)
+        if current.size:
+            snap.vocab[w] = current
+        else:
+            snap.vocab.pop(w, None)
+    if not _apply_deleted(snap, touched={r.id: r.updated_at for r in rows}):
+        return _build_full()
+    snap.order = np.argsort(-snap.created, kind="stable")
+    return snap
+
+
+def _snapshot():
+    """Foto vigente, refrescada si catalog_versions avisó cambios. None si falla."""
+    snap = _state["snapshot"]
+    if snap is not None and not _state["dirty"]:
+        return snap
+    with _lock:
+        snap = _state["snapshot"]
+        dirty = _state["dirty"]
+        if snap is not None and not dirty:
+            return snap
+        _state["dirty"] = set()
+        t0 = time.perf_counter()
+        try:
+            if snap is None or dirty & {"categories", "brands"}:
+                kind, snap = "completa", _build_full()
+            else:
+                kind, snap = "incremental", _build_incremental(snap)
+        except Exception as exc:
+            current_app.logger.warning(f"[catalog-engine] no se pudo actualizar la foto: {exc}")
+            db.session.rollback()
+            _state["dirty"] |= dirty
+            return None
+        _state["snapshot"] = snap
+        current_app.logger.info(
+            f"[catalog-engine] foto {kind}: {int(snap.alive.sum())} productos en {(time.perf_counter() - t0) * 1000:.0f} ms"
+        )
+        return snap
+
+
+def _on_catalog_change(namespaces):
+    _state["dirty"] |= set(namespaces) & {"products", "categories", "brands"}
+
+
+catalog_versions.subscribe(_on_catalog_change)
+
+
+def warm():
+    if enabled():
+        _snapshot()
+
+
+# --- Consultas ----------------------------------------------------------------------
+
+def _token_rows(snap, token):
+    """Filas donde `token` aparece como substring de alguna palabra (equivale a ILIKE %token%)."""
+    rows = snap.token_cache.get(token)
+    if rows is None:
+        parts = [rows for word, rows in snap.vocab.items() if token in word]
+        rows = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int32)
+        if len(snap.token_cache) >= _TOKEN_CACHE_SIZE:
+            snap.token_cache.clear()
+        snap.token_cache[token] = rows
+    return rows
+
+
+def _mask(snap, category_ids=None, brand_id=None, code="", stock="", pmin=None, pmax=None, q=""):
+    """Máscara de filas que cumplen los filtros, o None si hace falta el camino SQL."""
+    tokens = [t.lower() for t in (q or "").split()]
+    code = (code or "").lower()
+    if any(w in t for t in tokens + [code] for w in _LIKE_WILDCARDS):
+        return None
+    mask = snap.alive.copy()
+    if category_ids is not None:
+        idx = [snap.cat_index[c] for c in category_ids if c in snap.cat_index]
+        mask &= np.isin(snap.cat, np.asarray(idx, dtype=np.int32))
+    if brand_id is not None:
+        mask &= snap.brand == snap.brand_index.get(brand_id, -2)
+    if stock == "in":
+        mask &= snap.in_stock
+    elif stock == "out":
+        mask &= ~snap.in_stock
+    # NaN (sin precio) da False en las comparaciones, como `price IS NOT NULL AND ...`
+    if pmin is not None:
+        mask &= snap.price >= float(pmin)
+    if pmax is not None:
+        mask &= snap.price <= float(pmax)
+    for token in tokens:
+        hit = np.zeros(len(snap.ids), dtype=bool)
+        hit[_token_rows(snap, token)] = True
+        mask &= hit
+    if code:
+        # SKU parcial: puede tener espacios, se recorre solo lo que quedó
+        for i in np.flatnonzero(mask):
+            if code not in snap.skus[i]:
+                mask[i] = False
+    return mask
+
+
+def listing(page=1, per_page=10, **filters):
+    """(productos ORM de la página en orden, total, página ajustada) o None para usar SQL.
+    Filtros: category_ids, brand_id, code, stock, pmin, pmax, q (ver _mask)."""
+    from .models import Product
+
+    snap = _snapshot()
+    if snap is None:
+        return None
+    mask = _mask(snap, **filters)
+    if mask is None:
+        return None
+    rows = snap.order[mask[snap.order]]
+    total = int(rows.size)
+    page = min(max(1, page), max(1, (total + per_page - 1) // per_page))
+    ids = [snap.ids[i] for i in rows[(page - 1) * per_page:page * per_page]]
+    if not ids:
+        return [], total, page
+    found = {p.id: p for p in Product.query.filter(Product.id.in_(ids)).all()}
+    return [found[i] for i in ids if i in found], total, page
+
+
+def facet_ids(facet, **filters):
+    """Ids distintos de "brand" o "category" entre los productos que cumplen los filtros
+    (None si no aplica el motor)."""
+    snap = _snapshot()
+    if snap is None:
+        return None
+    mask = _mask(snap, **filters)
+    if mask is None:
+        return None
+    column, ids = (snap.brand, snap.brand_ids) if facet == "brand" else (snap.cat, snap.cat_ids)
+    values = np.unique(column[mask])
+    return {ids[v] for v in values if v >= 0}
@@ -0,0 +1,271 @@
+"""Coherencia entre workers para los caches por proceso del catálogo.
+
+Cada escritura sobre productos, categorías, marcas, slides o SiteInfo incrementa el
+contador de su espacio de nombres. Con el backend "db" (default) el incremento va en la
+misma transacción que el cambio, en la tabla catalog_versions; con "file" (un solo nodo)
+se reescribe un archivo por namespace después del commit. Cada worker lee los contadores
+como mucho una vez cada CATALOG_VERSION_CHECK_MS y descarta lo que quedó viejo.
+
+    @bp.route("/")
+    @depends_on("products", "categories")
+    def index(): ...
+"""
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from . import db
+
+NAMESPACES = ("products", "categories", "brands", "slides", "siteinfo", "homepage")
+
+# tabla -> namespace
+TABLE_NAMESPACES = {
+    "categories": "categories",
+    "brands": "brands",
+    "products": "products",
+    "product_images": "products",
+    "slides": "slides",
+    "site_info": "siteinfo",
+}
+
+_lock = threading.Lock()
+_state = {"backend": None, "checked_at": 0.0, "seen": None}
+_subscribers = []
+
+
+def subscribe(callback):
+    """callback(namespaces) se llama con los namespaces modificados: al commitear en este
+    proceso y cuando el chequeo periódico detecta cambios hechos por otro."""
+    if callback not in _subscribers:
+        _subscribers.append(callback)
+
+
+def _notify(namespaces):
+    if not namespaces:
+        return
+    for cb in list(_subscribers):
+        try:
+            cb(set(namespaces))
+        except Exception as exc:
+            if has_app_context():
+                current_app.logger.warning(f"[catalog-versions] suscriptor falló: {exc}")
+
+
+def namespaces_for_tables(tables):
+    return {TABLE_NAMESPACES[t] for t in tables if t in TABLE_NAMESPACES}
+
+
+# --- Backends ----------------------------------------------------------------------
+
+def _backend():
+    """"db", "file" o "none" (tabla inexistente o deshabilitado). Se resuelve una vez."""
+    backend = _state["backend"]
+    if backend is not None:
+        return backend
+    wanted = current_app.config.get("CATALOG_VERSION_BACKEND", "db")
+    if wanted == "db":
+        try:
+            if not inspect(db.engine).has_table("catalog_versions"):
+                current_app.logger.warning("[catalog-versions] falta la tabla catalog_versions; solo invalidación local + TTL")
+                wanted = "none"
+        except Exception as exc:
+            current_app.logger.warning(f"[catalog-versions] no se pudo verificar la tabla: {exc}")
+            wanted = "none"
+    _state["backend"] = wanted
+    return wanted
+
+
+def _version_dir():
+    path = current_app.config.get("CATALOG_VERSION_DIR") or os.path.join(
+        os.path.abspath(os.path.join(current_app.root_path, os.pardir)), "data", "catalog_versions"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _versions_table():
+    from .models import CatalogVersion
+    return CatalogVersion.__table__
+
+
+def _bump_sql(conn, namespaces):
+    t = _versions_table()
+    conn.execute(
+        t.update()
+        .where(t.c.namespace.in_(sorted(namespaces)))
+        .values(version=t.c.version + 1, updated_at=func.now())
+    )
+
+
+def _bump_files(namespaces):
+    base = _version_dir()
+    token = str(time.time_ns())
+    for ns in namespaces:
+        path = os.path.join(base, f"{ns}.ver")
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="ascii") as f:
+            f.write(token)
+        os.replace(tmp, path)
+
+
+def read_versions():
+    """{namespace: versión} según el backend activo ({} si no hay)."""
+    backend = _backend()
+    if backend == "db":
+        t = _versions_table()
+        with db.engine.connect() as conn:
+            return {row.namespace: row.version for row in conn.execute(select(t.c.namespace, t.c.version))}
+    if backend == "file":
+        base = _version_dir()
+        out = {}
+        for ns in NAMESPACES:
+            try:
+                st = os.stat(os.path.join(base, f"{ns}.ver"))
+                out[ns] = (st.st_mtime_ns, st.st_ino)
+            except FileNotFoundError:
+                out[ns] = None
+        return out
+    return {}
+
+
+def bump(*namespaces):
+    """Incrementa fuera de una transacción ORM (p. ej. la selección de portada, que vive en un JSON)."""
+    namespaces = set(namespaces)
+    if not namespaces:
+        return
+    backend = _backend()
+    try:
+        if backend == "db":
+            with db.engine.begin() as conn:
+                _bump_sql(conn, namespaces)
+        elif backend == "file":
+            _bump_files(namespaces)
+    except Exception as exc:
+        current_app.logger.warning(f"[catalog-versions] no se pudo incrementar {sorted(namespaces)}: {exc}")
+    _notify(namespaces)
+
+
+def poll(force=False):
+    """Compara contra lo último visto (como mucho cada CATALOG_VERSION_CHECK_MS) y avisa a
+    los suscriptores qué namespaces cambiaron. Devuelve ese conjunto."""
+    interval = current_app.config.get("CATALOG_VERSION_CHECK_MS", 1000) / 1000.0
+    now = time.monotonic()
+    if not force and now - _state["checked_at"] < interval:
+        return set()
+    with _lock:
+        if not force and now - _state["checked_at"] < interval:
+            return set()
+        _state["checked_at"] = now
+        try:
+            current = read_versions()
+        except Exception as exc:
+            current_app.logger.warning(f"[catalog-versions] fallo leyendo versiones: {exc}")
+            return set()
+        seen = _state["seen"]
+        _state["seen"] = current
+    if seen is None:
+        return set()
+    changed = {ns for ns in set(current) | set(seen) if current.get(ns) != seen.get(ns)}
+    _notify(changed)
+    return changed
+
+
+def current_versions():
+    """Últimas versiones leídas por este proceso ({} sin backend). No consulta más
+    seguido que poll()."""
+    if _backend() == "none":
+        return {}
+    poll()
+    if _state["seen"] is None:
+        poll(force=True)
+    return _state["seen"] or {}
+
+
+def depends_on(*namespaces):
+    """Declara de qué partes del catálogo depende una vista: refresca los caches si otro
+    worker las modificó y deja la lista en g.catalog_deps."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            g.catalog_deps = tuple(namespaces)
+            poll()
+            return f(*args, **kwargs)
+        wrapper.catalog_deps = tuple(namespaces)
+        return wrapper
+    return decorator
+
+
+# --- Seguimiento de escrituras ------------------------------------------------------
+
+def _pending(session):
+    return session.info.setdefault("catalog_touched", set())
+
+
+def _bump_in_transaction(session, namespaces):
+    """Incrementa una sola vez por transacción y namespace, sobre la conexión de la sesión."""
+    done = session.info.setdefault("catalog_bumped", set())
+    todo = set(namespaces) - done
+    if not todo:
+        return
+    if _backend() == "db":
+        _bump_sql(session.connection(), todo)
+    done.update(todo)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_touched(session, flush_context, instances):
+    tables = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            tables.add(table)
+    touched = namespaces_for_tables(tables)
+    if touched:
+        _pending(session).update(touched)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_after_flush(session, flush_context):
+    touched = session.info.get("catalog_touched")
+    if touched and has_app_context():
+        _bump_in_transaction(session, touched)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_touched(orm_execute_state):
+    # query.update()/query.delete() y los insert/update masivos no pasan por before_flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    table = getattr(getattr(mapper, "local_table", None), "name", None)
+    touched = namespaces_for_tables([table])
+    if touched:
+        session = orm_execute_state.session
+        _pending(session).update(touched)
+        if has_app_context():
+            _bump_in_transaction(session, touched)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    touched = session.info.pop("catalog_touched", None)
+    session.info.pop("catalog_bumped", None)
+    if not touched:
+        return
+    if has_app_context() and _backend() == "file":
+        try:
+            _bump_files(touched)
+        except Exception as exc:
+            current_app.logger.warning(f"[catalog-versions] no se pudo escribir versión: {exc}")
+    _notify(touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("catalog_touched", None)
+    session.info.pop("catalog_bumped", None)
@@ -0,0 +1,188 @@
+"""Comandos `flask ...` propios de la aplicación."""
+import os
+import subprocess
+import sys
+import time
+
+import click
+
+
+def register_cli(app):
+    @app.cli.command("bootstrap")
+    @click.option("--skip-seed", is_flag=True, help="No crear datos por defecto (categorías, admin, SiteInfo).")
+    @click.option("--skip-volume", is_flag=True, help="No enlazar static/img al volumen persistente.")
+    def bootstrap_command(skip_seed, skip_volume):
+        """Seed de datos base y enlace del volumen de uploads (una vez por deploy)."""
+        from .bootstrap import run_bootstrap
+
+        t0 = time.perf_counter()
+        run_bootstrap(app, seed=not skip_seed, link_volume=not skip_volume)
+        click.echo(f"[bootstrap] listo en {(time.perf_counter() - t0) * 1000:.0f} ms (seed={not skip_seed}, volume={not skip_volume})")
+
+    @app.cli.command("startup-check")
+    @click.option("--budget-ms", type=float, default=None, help="Máximo permitido para un arranque en frío en modo lean (default STARTUP_BUDGET_MS).")
+    @click.option("--runs", type=int, default=3, show_default=True, help="Cantidad de mediciones; se toma la mejor.")
+    def startup_check_command(budget_ms, runs):
+        """Mide un arranque en frío (intérprete nuevo: imports + create_app(lean=True)) y
+        falla si supera el presupuesto."""
+        budget = budget_ms if budget_ms is not None else app.config.get("STARTUP_BUDGET_MS", 2000)
+        project_root = os.path.abspath(os.path.join(app.root_path, os.pardir))
+        child = "from app import create_app; print(create_app(lean=True).config['STARTUP_MS'])"
+        timings, create_ms = [], []
+        for _ in range(max(1, runs)):
+            t0 = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-c", child], cwd=project_root, capture_output=True, text=True)
+            timings.append((time.perf_counter() - t0) * 1000)
+            if proc.returncode != 0:
+                raise click.ClickException(f"el arranque falló:\n{proc.stderr.strip()[-2000:]}")
+            create_ms.append(float(proc.stdout.strip().splitlines()[-1]))
+        best = min(timings)
+        click.echo(
+            f"[startup-check] arranque en frío mejor={best:.1f} ms peor={max(timings):.1f} ms "
+            f"(create_app {min(create_ms):.1f} ms) presupuesto={budget:.0f} ms"
+        )
+        if best > budget:
+            raise click.ClickException(f"el arranque en frío tardó {best:.1f} ms (> {budget:.0f} ms)")
+
+    @app.cli.command("build-assets")
+    @click.option("--no-prune", is_flag=True, help="No borrar los bundles de builds anteriores.")
+    def build_assets_command(no_prune):
+        """Arma los CSS/JS con hash en static/dist (minificados, .gz y .br)."""
+        from .assets import build_assets, missing_minifiers
+
+        for name in missing_minifiers():
+            detail = "JS sin minificar" if name == "rjsmin" else "CSS con el minificador básico"
+            click.echo(f"[build-assets] falta {name}: {detail} (pip install -r requirements.txt)", err=True)
+        t0 = time.perf_counter()
+        manifest = build_assets(app.static_folder, prune=not no_prune)
+        for name, hashed in sorted(manifest.items()):
+            click.echo(f"  {name} -> {hashed}")
+        click.echo(f"[build-assets] {len(manifest)} bundle(s) en {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    @app.cli.command("sync-uploads")
+    @click.option("--dry-run", is_flag=True, help="Solo mostrar qué se copiaría.")
+    @click.option("--workers", type=int, default=None, help="Hilos de copia en paralelo.")
+    @click.option("--verify-hash", is_flag=True, help="Confirmar por sha256 los archivos con mismo tamaño.")
+    @click.option("--upload-root", default=None, help="Destino (default UPLOAD_ROOT).")
+    def sync_uploads_command(dry_run, workers, verify_hash, upload_root):
+        """Sincroniza incrementalmente static/img con el volumen de uploads."""
+        import os
+        from .bootstrap import UPLOAD_SUBDIRS
+        from .volume_sync import sync_to_volume
+
+        upload_root = upload_root or os.getenv("UPLOAD_ROOT")
+        if not upload_root:
+            raise click.ClickException("Falta UPLOAD_ROOT (o --upload-root)")
+        img_src = os.path.join(app.static_folder, "img")
+        report = sync_to_volume(img_src, upload_root, UPLOAD_SUBDIRS, dry_run=dry_run, workers=workers, verify_hash=verify_hash)
+        if report["locked"]:
+            click.echo("[sync-uploads] otro proceso tiene el lock; no se hizo nada")
+            return
+        for name, sub in report["subdirs"].items():
+            click.echo(f"{name}: {sub['files']} archivo(s) a copiar ({sub['bytes']} bytes), {sub['unchanged']} sin cambios")
+            if dry_run:
+                for fn in sub["plan"]:
+                    click.echo(f"  + {fn}")
+        verb = "se copiarían" if dry_run else "copiados"
+        click.echo(f"[sync-uploads] {verb} {report['files']} archivo(s), {report['bytes']} bytes en {report['elapsed_ms']:.0f} ms")
+        for err in report["errors"]:
+            click.echo(f"  ! {err}", err=True)
+
+    @app.cli.command("stock-sync")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+    @click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default=None, help="Default según la extensión.")
+    @click.option("--chunk-size", type=int, default=None, help="Filas por bloque/transacción.")
+    @click.option("--insert", "insert_missing", is_flag=True, help="Crear productos para SKU desconocidos que traen nombre.")
+    @click.option("--update-names", is_flag=True, help="Actualizar también el nombre.")
+    @click.option("--dry-run", is_flag=True, help="Calcular sin escribir.")
+    def stock_sync_command(path, fmt, chunk_size, insert_missing, update_names, dry_run):
+        """Sincroniza stock/precios por SKU desde un CSV o NDJSON ('-' = stdin)."""
+        import sys
+        from .stock_sync import sync_stream, DEFAULT_CHUNK_SIZE
+
+        if fmt is None:
+            fmt = "ndjson" if path.lower().endswith((".ndjson", ".jsonl")) else "csv"
+        chunk_size = chunk_size or app.config.get("STOCK_SYNC_CHUNK", DEFAULT_CHUNK_SIZE)
+        with app.app_context():
+            if path == "-":
+                report = sync_stream(sys.stdin.buffer, fmt=fmt, chunk_size=chunk_size, insert_missing=insert_missing, update_names=update_names, dry_run=dry_run)
+            else:
+                with open(path, "rb") as fh:
+                    report = sync_stream(fh, fmt=fmt, chunk_size=chunk_size, insert_missing=insert_missing, update_names=update_names, dry_run=dry_run)
+        prefix = "[stock-sync] (dry-run) " if dry_run else "[stock-sync] "
+        click.echo(
+            f"{prefix}{report['rows']} filas en {report['chunks']} bloque(s): {report['updated']} actualizadas, "
+            f"{report['inserted']} nuevas, {report['unchanged']} sin cambios, {report['unmatched']} SKU desconocidos, "
+            f"{report['invalid']} inválidas; {report['elapsed_ms']:.0f} ms ({report['rows_per_s']:.0f} filas/s)"
+        )
+        if report["unmatched_skus"]:
+            click.echo("SKU desconocidos: " + ", ".join(report["unmatched_skus"][:50]) + (" …" if report["unmatched"] > 50 else ""))
+        if report["ambiguous_skus"]:
+            click.echo("SKU repetidos en la base: " + ", ".join(report["ambiguous_skus"][:50]))
+        for err in report["errors"][:20]:
+            click.echo(f"  ! {err}", err=True)
+
+    @app.cli.command("import-images")
+    @click.argument("path", type=click.Path(exists=True))
+    @click.option("--workers", type=int, default=None, help="Hilos de copia (default IMAGE_IMPORT_WORKERS).")
+    def import_images_command(path, workers):
+        """Agrega imágenes a productos por SKU desde un ZIP o una carpeta (ABC123.jpg, ABC123_2.jpg)."""
+        import os
+        from . import db
+        from .image_import import run_job, job_status
+        from .models import ImageImportJob
+
+        kind = "folder" if os.path.isdir(path) else "zip"
+        with app.app_context():
+            job = ImageImportJob(source=os.path.basename(os.path.abspath(path))[:300], status="pending")
+            db.session.add(job)
+            db.session.commit()
+            job_id = job.id
+        run_job(app, job_id, kind, os.path.abspath(path), workers=workers)
+        with app.app_context():
+            status = job_status(db.session.get(ImageImportJob, job_id))
+        report = status["report"]
+        click.echo(
+            f"[import-images] {status['status']}: {status['attached']} agregadas, {status['skipped']} omitidas "
+            f"({report.get('unmatched', 0)} sin producto, {report.get('over_limit', 0)} por límite), "
+            f"{status['failed']} con error en {report.get('elapsed_ms', 0):.0f} ms"
+        )
+        for err in report.get("errors", [])[:20]:
+            click.echo(f"  ! {err}", err=True)
+
+    @app.cli.command("export-dump")
+    @click.argument("output", type=click.Path(dir_okay=False, writable=True))
+    @click.option("--since", default=None, help="Solo cambios desde esta fecha ISO (UTC).")
+    @click.option("--base", "base_path", type=click.Path(exists=True, dir_okay=False), default=None, help="ZIP o manifest.json del export anterior.")
+    def export_dump_command(output, since, base_path):
+        """Exporta el catálogo a un ZIP: completo, o incremental con --since/--base."""
+        import os
+        from .dump import write_export, read_manifest
+
+        base_manifest = None
+        if base_path:
+            with open(base_path, "rb") as fh:
+                base_manifest = read_manifest(fh.read())
+        with app.app_context(), open(output, "wb") as fh:
+            manifest = write_export(fh, since=since, base_manifest=base_manifest)
+        counts = ", ".join(f"{k}={v}" for k, v in manifest["counts"].items())
+        click.echo(f"[export-dump] {manifest['kind']} ({os.path.getsize(output)} bytes) desde={manifest['since'] or '-'}: {counts}")
+
+    @app.cli.command("import-dump")
+    @click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+    @click.option("--batch-size", type=int, default=None, help="Filas por lote/transacción (default DUMP_IMPORT_BATCH).")
+    def import_dump_command(paths, batch_size):
+        """Aplica uno o más ZIP de export (el completo y después sus incrementales)."""
+        from .dump import apply_chain
+
+        with app.app_context():
+            results = apply_chain(list(paths), batch_size=batch_size)
+        click.echo(
+            f"[import-dump] {results['applied']} archivo(s): {results['created']} creados, "
+            f"{results['updated']} actualizados, {results['deleted']} borrados, "
+            f"{results['images']} imágenes copiadas ({results['images_unchanged']} sin cambios)"
+        )
+        for warning in results["warnings"]:
+            click.echo(f"  ? {warning}")
+        for err in results["errors"][:20]:
+            click.echo(f"  ! {err}", err=True)
@@ -0,0 +1,166 @@
+"""Compresión gzip / brotli de las respuestas dinámicas (HTML, JSON, texto).
+
+Se aplica en un after_request a las respuestas de tipo comprimible y tamaño mayor a
+COMPRESS_MIN_SIZE, con brotli si el módulo está instalado y el navegador lo acepta, si
+no gzip. Las respuestas en streaming se comprimen de a bloques sin juntarlas en memoria;
+las que ya vienen con archivo (send_file, /assets) no se tocan.
+
+Los cuerpos comprimidos se guardan en un LRU por hash del cuerpo sin comprimir
+(COMPRESS_CACHE_BYTES): una página servida desde cache o que no cambió entre requests
+no se vuelve a comprimir, solo se hashea.
+"""
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import current_app, request
+
+try:  # opcional
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset(
+    {
+        "text/html",
+        "text/plain",
+        "text/css",
+        "text/javascript",
+        "text/xml",
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "application/xhtml+xml",
+        "image/svg+xml",
+    }
+)
+
+
+def accepts_encoding(encoding):
+    """True si Accept-Encoding del request acepta `encoding` (respeta q=0)."""
+    header = request.headers.get("Accept-Encoding", "")
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() != encoding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class _BodyCache:
+    """LRU (encoding, sha1 del cuerpo) -> cuerpo comprimido, acotado en bytes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, budget):
+        if len(value) > budget // 4:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > budget and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache = _BodyCache()
+
+
+def _choose_encoding():
+    if brotli is not None and accepts_encoding("br"):
+        return "br"
+    if accepts_encoding("gzip"):
+        return "gzip"
+    return None
+
+
+def _compress(data, encoding, config):
+    if encoding == "br":
+        return brotli.compress(data, quality=config.get("COMPRESS_BR_LEVEL", 5))
+    return gzip.compress(data, compresslevel=config.get("COMPRESS_LEVEL", 6), mtime=0)
+
+
+def _compress_stream(chunks, encoding, config):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=config.get("COMPRESS_BR_LEVEL", 5))
+        for chunk in chunks:
+            out = compressor.process(chunk)
+            if out:
+                yield out
+        yield compressor.finish()
+        return
+    # wbits=31: formato gzip (cabecera + crc)
+    compressor = zlib.compressobj(config.get("COMPRESS_LEVEL", 6), zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+        # Que cada bloque salga ya, si no el streaming no sirve de nada
+        yield compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def compress_response(response):
+    config = current_app.config
+    if not config.get("COMPRESS_ENABLED", True):
+        return response
+    if response.mimetype not in COMPRESSIBLE_TYPES or response.direct_passthrough:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if "Content-Encoding" in response.headers:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    if encoding is None or request.method == "HEAD":
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding, config)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config.get("COMPRESS_MIN_SIZE", 1024):
+            return response
+        key = (encoding, hashlib.sha1(data).digest())
+        body = _cache.get(key)
+        if body is None:
+            body = _compress(data, encoding, config)
+            _cache.put(key, body, config.get("COMPRESS_CACHE_BYTES", 8 * 1024 * 1024))
+        response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    # El ETag identifica la representación: la comprimida es otra
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
@@ -29,3 +29,69 @@ class Config:
     SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
     SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "false").lower() == "true"
     STORE_TIMEZONE = os.getenv("STORE_TIMEZONE", "America/Argentina/Cordoba")
+    # Arranque lean: create_app no hace seed ni enlaza el volumen (lo hace `flask bootstrap`)
+    LEAN_STARTUP = os.getenv("LEAN_STARTUP", "false").lower() == "true"
+    # Presupuesto de arranque en frío (intérprete nuevo + create_app lean) de `flask startup-check`
+    STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "2000"))
+    # Segundos que vive una entrada del cache de catálogo (árbol de categorías, marcas, portada)
+    CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "60"))
+    # Coherencia de caches entre workers: "db" (tabla catalog_versions), "file" (un solo nodo) o "none"
+    CATALOG_VERSION_BACKEND = os.getenv("CATALOG_VERSION_BACKEND", "db").lower()
+    CATALOG_VERSION_CHECK_MS = int(os.getenv("CATALOG_VERSION_CHECK_MS", "1000"))
+    CATALOG_VERSION_DIR = os.getenv("CATALOG_VERSION_DIR")
+    # Precalentamiento de workers (gunicorn post_worker_init y GET /_warmup)
+    WARMUP_ON_BOOT = os.getenv("WARMUP_ON_BOOT", "true").lower() == "true"
+    WARMUP_BUDGET_MS = float(os.getenv("WARMUP_BUDGET_MS", "3000"))
+    WARMUP_TOP_CATEGORIES = int(os.getenv("WARMUP_TOP_CATEGORIES", "5"))
+    WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", "3"))
+    WARMUP_TOKEN = os.getenv("WARMUP_TOKEN")
+    # Horas que sobrevive un borrador de carga masiva sin usarse
+    DRAFT_TTL_HOURS = int(os.getenv("DRAFT_TTL_HOURS", "24"))
+    # Filas máximas por planilla importada (POST /admin/products/import)
+    IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "50000"))
+    # Carga masiva de imágenes por SKU: carpeta del servidor habilitada, hilos y tamaño máximo por archivo
+    IMAGE_IMPORT_ROOT = os.getenv("IMAGE_IMPORT_ROOT")
+    IMAGE_IMPORT_WORKERS = int(os.getenv("IMAGE_IMPORT_WORKERS", "4"))
+    IMAGE_IMPORT_MAX_BYTES = int(os.getenv("IMAGE_IMPORT_MAX_MB", "10")) * 1024 * 1024
+    # Feed de stock/precios por SKU (POST /admin/products/stock-sync, `flask stock-sync`)
+    STOCK_SYNC_TOKEN = os.getenv("STOCK_SYNC_TOKEN")
+    STOCK_SYNC_CHUNK = int(os.getenv("STOCK_SYNC_CHUNK", "1000"))
+    # Filas por lote/transacción al importar un export (/admin/db/import, `flask import-dump`)
+    DUMP_IMPORT_BATCH = int(os.getenv("DUMP_IMPORT_BATCH", "500"))
+    # Hilos para extraer las imágenes del export
+    DUMP_IMPORT_WORKERS = int(os.getenv("DUMP_IMPORT_WORKERS", "4"))
+    # Entrega de archivos: none (sendfile del servidor WSGI), x-sendfile o x-accel (nginx)
+    FILE_OFFLOAD = os.getenv("FILE_OFFLOAD", "none")
+    FILE_OFFLOAD_PREFIX = os.getenv("FILE_OFFLOAD_PREFIX", "/_files")
+    FILE_OFFLOAD_ROOT = os.getenv("FILE_OFFLOAD_ROOT")
+    # Cache de estáticos sin nombre uuid (los uuid se cachean un año, immutable)
+    STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "3600"))
+    # Compresión de respuestas dinámicas (gzip, o brotli si está instalado)
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+    COMPRESS_BR_LEVEL = int(os.getenv("COMPRESS_BR_LEVEL", "5"))
+    COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_MB", "8")) * 1024 * 1024
+    # GET condicional (ETag/304) en páginas públicas para anónimos; max-age del Cache-Control
+    CONDITIONAL_GET_ENABLED = os.getenv("CONDITIONAL_GET_ENABLED", "true").lower() == "true"
+    PAGE_MAX_AGE = int(os.getenv("PAGE_MAX_AGE", "0"))
+    # Surrogate keys para un proxy con cache y purga al escribir (none|log|file|http)
+    SURROGATE_KEYS_ENABLED = os.getenv("SURROGATE_KEYS_ENABLED", "true").lower() == "true"
+    SURROGATE_KEY_HEADER = os.getenv("SURROGATE_KEY_HEADER", "Surrogate-Key")
+    SURROGATE_MAX_AGE = int(os.getenv("SURROGATE_MAX_AGE", "0"))
+    SURROGATE_PURGER = os.getenv("SURROGATE_PURGER", "none")
+    SURROGATE_PURGE_URL = os.getenv("SURROGATE_PURGE_URL")
+    SURROGATE_PURGE_HEADER = os.getenv("SURROGATE_PURGE_HEADER", "Surrogate-Key")
+    SURROGATE_PURGE_TOKEN = os.getenv("SURROGATE_PURGE_TOKEN")
+    SURROGATE_PURGE_FILE = os.getenv("SURROGATE_PURGE_FILE")
+    # Cache de fragmentos de plantilla ({% cache %}: tarjetas de producto, menú, barra de info)
+    FRAGMENT_CACHE_BYTES = int(os.getenv("FRAGMENT_CACHE_MB", "4")) * 1024 * 1024
+    # Bytecode compilado de las plantillas en disco (vacío = data/jinja_cache, "none" = sin cache)
+    JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR", "")
+    # max-age de /api/suggest para anónimos
+    SUGGEST_MAX_AGE = int(os.getenv("SUGGEST_MAX_AGE", "60"))
+    # Los índices en memoria (suggest, catalog_engine) releen los productos con updated_at
+    # hasta N segundos antes del último visto: cubre transacciones que commitean tarde
+    CATALOG_REFRESH_LOOKBACK_SECONDS = int(os.getenv("CATALOG_REFRESH_LOOKBACK_SECONDS", "300"))
+    # Listados públicos resueltos en memoria con NumPy (ver app/catalog_engine.py)
+    CATALOG_ENGINE_ENABLED = os.getenv("CATALOG_ENGINE_ENABLED", "false").lower() == "true"
@@ -0,0 +1,210 @@
+"""Borradores de carga masiva guardados en la base (product_drafts / product_draft_rows).
+
+Reemplazan a la lista de filas que antes vivía en la cookie de sesión: la sesión solo
+guarda el id del borrador y cada pantalla lee o modifica únicamente las filas que usa.
+Los borradores vencen a las DRAFT_TTL_HOURS de su último uso y se purgan al crear uno
+nuevo.
+"""
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+
+from . import db
+from .models import ProductDraft, ProductDraftRow
+
+_INSERT_BATCH = 500
+
+
+def _expiry():
+    hours = current_app.config.get("DRAFT_TTL_HOURS", 24)
+    return datetime.now(timezone.utc) + timedelta(hours=hours)
+
+
+def _live(draft_id):
+    """Devuelve el borrador si existe y no venció (extendiendo su vencimiento)."""
+    if not draft_id:
+        return None
+    draft = db.session.get(ProductDraft, draft_id)
+    if draft is None:
+        return None
+    now = datetime.now(timezone.utc)
+    expires = draft.expires_at
+    if expires is not None and expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    if expires is not None and expires < now:
+        return None
+    draft.expires_at = _expiry()
+    return draft
+
+
+def purge_expired():
+    """Borra los borradores vencidos y sus filas."""
+    expired = select(ProductDraft.id).where(ProductDraft.expires_at < func.now())
+    # Filas explícitas además del ON DELETE CASCADE (SQLite en desarrollo no lo aplica)
+    db.session.execute(delete(ProductDraftRow).where(ProductDraftRow.draft_id.in_(expired)))
+    result = db.session.execute(delete(ProductDraft).where(ProductDraft.expires_at < func.now()))
+    return result.rowcount or 0
+
+
+def append_rows(draft_id, rows, start_index=0):
+    """Inserta filas en lotes a partir de start_index. Devuelve el próximo índice libre."""
+    idx = start_index
+    batch = []
+    for row in rows:
+        batch.append({"draft_id": draft_id, "row_index": idx, "data": row})
+        idx += 1
+        if len(batch) >= _INSERT_BATCH:
+            db.session.execute(insert(ProductDraftRow), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(ProductDraftRow), batch)
+    return idx
+
+
+def create_draft(rows, user_id=None):
+    """Crea un borrador con `rows` (lista de dicts) y devuelve su id."""
+    try:
+        purge_expired()
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.warning(f"[drafts] no se pudieron purgar vencidos: {exc}")
+    draft = ProductDraft(user_id=user_id, expires_at=_expiry())
+    db.session.add(draft)
+    db.session.flush()
+    append_rows(draft.id, rows)
+    db.session.commit()
+    return draft.id
+
+
+def count_rows(draft_id):
+    if _live(draft_id) is None:
+        return 0
+    return db.session.scalar(select(func.count()).select_from(ProductDraftRow).where(ProductDraftRow.draft_id == draft_id)) or 0
+
+
+def get_rows(draft_id, offset=0, limit=None):
+    """Filas del borrador en orden, como lista de dicts ([] si no existe o venció)."""
+    if _live(draft_id) is None:
+        return []
+    stmt = (
+        select(ProductDraftRow.data)
+        .where(ProductDraftRow.draft_id == draft_id)
+        .order_by(ProductDraftRow.row_index)
+        .offset(offset)
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    rows = [dict(data) for data in db.session.scalars(stmt)]
+    db.session.commit()
+    return rows
+
+
+def get_page(draft_id, offset=0, limit=50):
+    """Como get_rows pero devuelve [(row_index, dict)], para poder editar por índice."""
+    if _live(draft_id) is None:
+        return []
+    stmt = (
+        select(ProductDraftRow.row_index, ProductDraftRow.data)
+        .where(ProductDraftRow.draft_id == draft_id)
+        .order_by(ProductDraftRow.row_index)
+        .offset(offset)
+        .limit(limit)
+    )
+    page = [(idx, dict(data)) for idx, data in db.session.execute(stmt)]
+    db.session.commit()
+    return page
+
+
+def iter_rows(draft_id, batch_size=_INSERT_BATCH):
+    """Recorre el borrador completo por lotes (keyset sobre row_index) sin cargarlo en memoria."""
+    last = -1
+    while True:
+        batch = db.session.execute(
+            select(ProductDraftRow.row_index, ProductDraftRow.data)
+            .where(ProductDraftRow.draft_id == draft_id, ProductDraftRow.row_index > last)
+            .order_by(ProductDraftRow.row_index)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        for idx, data in batch:
+            yield idx, dict(data)
+        last = batch[-1][0]
+
+
+def get_row(draft_id, row_index):
+    if _live(draft_id) is None:
+        return None
+    data = db.session.scalar(
+        select(ProductDraftRow.data).where(
+            ProductDraftRow.draft_id == draft_id, ProductDraftRow.row_index == row_index
+        )
+    )
+    db.session.commit()
+    return dict(data) if data is not None else None
+
+
+def put_row(draft_id, row_index, data):
+    """Reemplaza una fila. Devuelve False si el borrador o la fila no existen."""
+    if _live(draft_id) is None:
+        return False
+    result = db.session.execute(
+        update(ProductDraftRow)
+        .where(ProductDraftRow.draft_id == draft_id, ProductDraftRow.row_index == row_index)
+        .values(data=data)
+    )
+    db.session.commit()
+    return bool(result.rowcount)
+
+
+def patch_row(draft_id, row_index, changes):
+    """Actualiza solo las claves dadas de una fila y devuelve la fila resultante (o None)."""
+    row = get_row(draft_id, row_index)
+    if row is None:
+        return None
+    row.update(changes)
+    return row if put_row(draft_id, row_index, row) else None
+
+
+def patch_rows(draft_id, changes_by_index):
+    """Como patch_row para varias filas ({row_index: cambios}) en una sola transacción:
+    una lectura, un UPDATE por lote (executemany por PK) y un solo vencimiento.
+    Devuelve cuántas filas se actualizaron."""
+    if not changes_by_index or _live(draft_id) is None:
+        return 0
+    rows = db.session.execute(
+        select(ProductDraftRow.row_index, ProductDraftRow.data).where(
+            ProductDraftRow.draft_id == draft_id, ProductDraftRow.row_index.in_(list(changes_by_index))
+        )
+    ).all()
+    params = []
+    for idx, data in rows:
+        merged = dict(data)
+        merged.update(changes_by_index[idx])
+        params.append({"draft_id": draft_id, "row_index": idx, "data": merged})
+    if params:
+        db.session.execute(update(ProductDraftRow), params)
+    db.session.commit()
+    return len(params)
+
+
+def delete_rows(draft_id, row_indexes):
+    """Quita filas del borrador; los índices de las demás no cambian."""
+    if not draft_id or not row_indexes:
+        return 0
+    result = db.session.execute(
+        delete(ProductDraftRow).where(
+            ProductDraftRow.draft_id == draft_id, ProductDraftRow.row_index.in_(list(row_indexes))
+        )
+    )
+    db.session.commit()
+    return result.rowcount or 0
+
+
+def delete_draft(draft_id):
+    if not draft_id:
+        return
+    db.session.execute(delete(ProductDraftRow).where(ProductDraftRow.draft_id == draft_id))
+    db.session.execute(delete(ProductDraft).where(ProductDraft.id == draft_id))
+    db.session.commit()
@@ -0,0 +1,842 @@
+"""Export / import del catálogo (categorías, marcas, productos, imágenes, slides, SiteInfo).
+
+Un export (formato 2) es un ZIP con un NDJSON por tabla (categories.ndjson,
+products.ndjson, ..., deleted.ndjson), manifest.json con cantidad y sha256 de cada
+miembro, e images/<carpeta>/<archivo>. Se escribe y se lee fila por fila: la memoria
+del import depende del tamaño de lote, no del catálogo.
+Puede ser:
+  - completo: todas las filas y todas las imágenes referenciadas;
+  - incremental: solo filas con updated_at posterior a `since` (o al generated_at de un
+    manifest anterior), las lápidas de deleted_records desde esa fecha y solo las
+    imágenes cuyo hash no figura en el manifest base.
+El manifest lista el hash de cada imagen referenciada, así el próximo incremental puede
+partir de él. El import aplica uno o varios dumps en orden (el completo primero y
+después la cadena de incrementales). Los ZIP anteriores con un único dump.json se
+siguen leyendo (sin manifest se toman como completos).
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import uuid
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import db, slugify
+from .models import Brand, Category, DeletedRecord, Product, ProductImage, SiteInfo, Slide
+
+FORMAT_VERSION = 2
+# Orden de escritura y de aplicación de los miembros NDJSON
+TABLES = ("categories", "brands", "products", "product_images", "slides", "site_info", "deleted")
+IMAGE_FOLDERS = ("products", "slides")
+DEFAULT_BATCH_SIZE = 500
+# Filas que trae cada vuelta del cursor al exportar
+EXPORT_YIELD_PER = 1000
+# Solapamiento al tomar `since` de un manifest: filas commiteadas durante el export
+# anterior con updated_at apenas previo a su generated_at. Reaplicarlas es inocuo.
+SINCE_OVERLAP = timedelta(minutes=2)
+# Tablas con lápidas, en el orden en que se aplican los borrados
+TOMBSTONE_TABLES = ("product_images", "products", "slides", "brands", "categories")
+_HASH_CHUNK = 1024 * 1024
+_MODELS = {
+    "categories": Category,
+    "brands": Brand,
+    "products": Product,
+    "product_images": ProductImage,
+    "slides": Slide,
+}
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _parse_ts(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        ts = value
+    else:
+        ts = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _uuid(value):
+    try:
+        return uuid.UUID(str(value)) if value else None
+    except ValueError:
+        return None
+
+
+# --- Lápidas ------------------------------------------------------------------------
+
+_tombstones = {"enabled": None}
+
+
+def _tombstones_enabled(session):
+    if _tombstones["enabled"] is None:
+        try:
+            _tombstones["enabled"] = inspect(session.get_bind()).has_table("deleted_records")
+        except Exception:
+            return False
+    return _tombstones["enabled"]
+
+
+def _record_deleted(session, table, ids):
+    if ids and _tombstones_enabled(session):
+        session.connection().execute(
+            insert(DeletedRecord.__table__),
+            [{"table_name": table, "record_id": rid} for rid in ids],
+        )
+
+
+@event.listens_for(Session, "after_flush")
+def _tombstones_after_flush(session, flush_context):
+    by_table = {}
+    for obj in session.deleted:
+        table = getattr(obj, "__tablename__", None)
+        if table in _MODELS and getattr(obj, "id", None) is not None:
+            by_table.setdefault(table, []).append(obj.id)
+    for table, ids in by_table.items():
+        _record_deleted(session, table, ids)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _tombstones_for_bulk_delete(orm_execute_state):
+    # query.delete() / delete(Model) no pasan por el flush: se leen los ids antes de borrar
+    if not orm_execute_state.is_delete:
+        return
+    mapper = orm_execute_state.bind_mapper
+    table = getattr(getattr(mapper, "local_table", None), "name", None)
+    if table not in _MODELS or not _tombstones_enabled(orm_execute_state.session):
+        return
+    stmt = orm_execute_state.statement
+    id_col = mapper.local_table.c.id
+    ids_stmt = select(id_col)
+    if stmt.whereclause is not None:
+        ids_stmt = ids_stmt.where(stmt.whereclause)
+    ids = list(orm_execute_state.session.connection().execute(ids_stmt).scalars())
+    _record_deleted(orm_execute_state.session, table, ids)
+
+
+# --- Serialización ------------------------------------------------------------------
+
+def _category_row(c):
+    return {"id": str(c.id), "name": c.name, "slug": c.slug, "parent_id": str(c.parent_id) if c.parent_id else None,
+            "created_at": _iso(c.created_at), "updated_at": _iso(c.updated_at)}
+
+
+def _brand_row(b):
+    return {"id": str(b.id), "name": b.name, "slug": b.slug, "visible": b.visible,
+            "created_at": _iso(b.created_at), "updated_at": _iso(b.updated_at)}
+
+
+def _product_row(p):
+    return {
+        "id": str(p.id),
+        "name": p.name,
+        "sku": p.sku,
+        "price": str(p.price) if p.price is not None else None,
+        "in_stock": bool(p.in_stock),
+        "featured": bool(p.featured),
+        "short_desc": p.short_desc,
+        "long_desc": p.long_desc,
+        "image_filename": p.image_filename,
+        "category_id": str(p.category_id) if p.category_id else None,
+        "brand_id": str(p.brand_id) if p.brand_id else None,
+        "created_at": _iso(p.created_at),
+        "updated_at": _iso(p.updated_at),
+    }
+
+
+def _image_row(i):
+    return {"id": str(i.id), "product_id": str(i.product_id), "filename": i.filename, "position": i.position,
+            "created_at": _iso(i.created_at), "updated_at": _iso(i.updated_at)}
+
+
+def _slide_row(s):
+    return {"id": str(s.id), "image_filename": s.image_filename, "order": s.order, "visible": s.visible,
+            "updated_at": _iso(s.updated_at)}
+
+
+def _site_info_row(si):
+    return {"id": str(si.id), "store_name": si.store_name, "address": si.address, "hours": si.hours, "email": si.email,
+            "phone": si.phone, "instagram": si.instagram, "whatsapp": si.whatsapp,
+            "consultas_enabled": bool(si.consultas_enabled), "updated_at": _iso(si.updated_at)}
+
+
+def _changed(model, since):
+    """Filas del modelo con updated_at (o created_at) posterior a `since` (todas si es None)."""
+    query = model.query
+    if since is not None:
+        query = query.filter(func.coalesce(model.updated_at, model.created_at) > since)
+    return query
+
+
+def _export_rows(table, since):
+    """Generador de filas serializadas de una tabla, leyendo la base por tandas."""
+    if table == "categories":
+        query, to_row = _changed(Category, since).order_by(Category.created_at), _category_row
+    elif table == "brands":
+        query, to_row = _changed(Brand, since).order_by(Brand.created_at), _brand_row
+    elif table == "products":
+        query, to_row = _changed(Product, since).order_by(Product.created_at), _product_row
+    elif table == "product_images":
+        query, to_row = _changed(ProductImage, since).order_by(ProductImage.created_at), _image_row
+    elif table == "slides":
+        query, to_row = _changed(Slide, since).order_by(Slide.order.asc()), _slide_row
+    elif table == "site_info":
+        si = SiteInfo.query.first()
+        if si and (since is None or si.updated_at is None or si.updated_at > since):
+            yield _site_info_row(si)
+        return
+    else:  # deleted
+        if since is None:
+            return
+        rows = db.session.execute(
+            select(DeletedRecord.table_name, DeletedRecord.record_id, DeletedRecord.deleted_at)
+            .where(DeletedRecord.deleted_at > since)
+            .order_by(DeletedRecord.deleted_at)
+            .execution_options(yield_per=EXPORT_YIELD_PER)
+        )
+        for t, rid, at in rows:
+            yield {"table": t, "id": str(rid), "deleted_at": _iso(at)}
+        return
+    for obj in query.yield_per(EXPORT_YIELD_PER):
+        yield to_row(obj)
+
+
+# --- Imágenes -----------------------------------------------------------------------
+
+def _hash_cache_path():
+    project_root = os.path.abspath(os.path.join(current_app.root_path, os.pardir))
+    data_dir = os.path.join(project_root, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, ".image_hashes.json")
+
+
+def _load_hash_cache():
+    try:
+        with open(_hash_cache_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+            return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_hash_cache(cache):
+    path = _hash_cache_path()
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()[:32]
+
+
+def referenced_images():
+    """{"carpeta/archivo"} de todas las imágenes que usa el catálogo actual."""
+    names = set()
+    for (fn,) in db.session.execute(select(Product.image_filename).where(Product.image_filename.isnot(None))):
+        names.add(f"products/{fn}")
+    for (fn,) in db.session.execute(select(ProductImage.filename)):
+        names.add(f"products/{fn}")
+    for (fn,) in db.session.execute(select(Slide.image_filename)):
+        names.add(f"slides/{fn}")
+    return names
+
+
+def image_hashes(names):
+    """{"carpeta/archivo": hash} de las imágenes que existen en disco. El hash se cachea
+    por tamaño y mtime, así un export nocturno no relee todas las imágenes."""
+    cache = _load_hash_cache()
+    result = {}
+    dirty = False
+    for name in sorted(names):
+        path = os.path.join(current_app.static_folder, "img", name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        cached = cache.get(name)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            result[name] = cached[2]
+            continue
+        digest = _file_hash(path)
+        cache[name] = [st.st_size, st.st_mtime_ns, digest]
+        result[name] = digest
+        dirty = True
+    if dirty:
+        try:
+            _save_hash_cache(cache)
+        except OSError as exc:
+            current_app.logger.warning(f"[dump] no se pudo guardar el cache de hashes: {exc}")
+    return result
+
+
+def _collect_images(rows, table, into):
+    """Pasa las filas tal cual y anota en `into` las imágenes que referencian."""
+    for row in rows:
+        if table == "products" and row.get("image_filename"):
+            into.add(f"products/{row['image_filename']}")
+        elif table == "product_images" and row.get("filename"):
+            into.add(f"products/{row['filename']}")
+        elif table == "slides" and row.get("image_filename"):
+            into.add(f"slides/{row['image_filename']}")
+        yield row
+
+
+def _write_ndjson(zf, member, rows):
+    digest = hashlib.sha256()
+    count = 0
+    with zf.open(member, "w", force_zip64=True) as out:
+        for row in rows:
+            line = (json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            digest.update(line)
+            out.write(line)
+            count += 1
+    return {"member": member, "count": count, "sha256": digest.hexdigest()}
+
+
+# --- Export -------------------------------------------------------------------------
+
+def read_manifest(data):
+    """Manifest desde bytes de un manifest.json o de un ZIP de export."""
+    if data[:2] == b"PK":
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            if "manifest.json" not in zf.namelist():
+                raise ValueError("El ZIP no tiene manifest.json (export anterior a los incrementales).")
+            data = zf.read("manifest.json")
+    manifest = json.loads(data.decode("utf-8"))
+    if not isinstance(manifest, dict) or "generated_at" not in manifest:
+        raise ValueError("Manifest inválido.")
+    return manifest
+
+
+def write_export(fileobj, since=None, base_manifest=None):
+    """Escribe el ZIP de export en `fileobj` y devuelve el manifest.
+
+    Sin argumentos es completo. Con `base_manifest` el corte es su generated_at (menos
+    SINCE_OVERLAP) y se omiten las imágenes con el mismo hash; con solo `since` se
+    incluyen las imágenes de las filas cambiadas."""
+    generated_at = db.session.scalar(select(func.now()))
+    generated_at = _parse_ts(generated_at) or datetime.now(timezone.utc)
+    base_images = {}
+    if base_manifest is not None:
+        base_images = base_manifest.get("images") or {}
+        since = _parse_ts(base_manifest["generated_at"]) - SINCE_OVERLAP
+    since = _parse_ts(since)
+    kind = "incremental" if since is not None else "full"
+
+    tables = {}
+    row_images = set()
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for table in TABLES:
+            rows = _collect_images(_export_rows(table, since), table, row_images)
+            tables[table] = _write_ndjson(zf, f"{table}.ndjson", rows)
+        hashes = image_hashes(referenced_images())
+        if base_manifest is not None:
+            to_pack = {name for name, digest in hashes.items() if base_images.get(name) != digest}
+        elif since is not None:
+            to_pack = row_images & set(hashes)
+        else:
+            to_pack = set(hashes)
+        for name in sorted(to_pack):
+            zf.write(os.path.join(current_app.static_folder, "img", name), f"images/{name}")
+        manifest = {
+            "format": FORMAT_VERSION,
+            "kind": kind,
+            "generated_at": _iso(generated_at),
+            "since": _iso(since),
+            "base_generated_at": base_manifest.get("generated_at") if base_manifest else None,
+            "tables": tables,
+            "counts": {**{table: info["count"] for table, info in tables.items()}, "images": len(to_pack)},
+            "images": hashes,
+        }
+        zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, separators=(",", ":")))
+    return manifest
+
+
+# --- Import -------------------------------------------------------------------------
+
+class DumpReader:
+    """Lectura fila por fila de un ZIP de export, en formato NDJSON o con el dump.json anterior."""
+
+    def __init__(self, zf):
+        self.zf = zf
+        names = set(zf.namelist())
+        self.manifest = {"kind": "full", "generated_at": None}
+        if "manifest.json" in names:
+            self.manifest = json.loads(zf.read("manifest.json").decode("utf-8"))
+        self.tables = self.manifest.get("tables") if self.manifest.get("format", 1) >= 2 else None
+        self._legacy = None
+        if self.tables is None:
+            if "dump.json" not in names:
+                raise ValueError("El archivo no contiene dump.json")
+            # Formato 1: un único JSON, se carga entero
+            self._legacy = json.loads(zf.read("dump.json").decode("utf-8"))
+
+    def verify(self):
+        """Compara cantidad de filas y sha256 de cada miembro con el manifest."""
+        for table, info in (self.tables or {}).items():
+            digest = hashlib.sha256()
+            count = 0
+            try:
+                with self.zf.open(info["member"]) as raw:
+                    for line in raw:
+                        digest.update(line)
+                        count += 1
+            except KeyError:
+                raise ValueError(f"falta {info['member']}")
+            if digest.hexdigest() != info.get("sha256") or count != info.get("count"):
+                raise ValueError(f"{info['member']} no coincide con el manifest (¿archivo truncado?)")
+
+    def rows(self, table):
+        if self._legacy is not None:
+            value = self._legacy.get(table)
+            if table == "site_info":
+                return iter([value] if value else [])
+            return iter(value or [])
+        info = self.tables.get(table)
+        if not info:
+            return iter(())
+        return self._iter_member(info["member"])
+
+    def _iter_member(self, member):
+        with self.zf.open(member) as raw:
+            for line in io.TextIOWrapper(raw, encoding="utf-8"):
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def batches(rows, size):
+    it = iter(rows)
+    while True:
+        block = list(islice(it, size))
+        if not block:
+            return
+        yield block
+
+
+def _existing(model, block):
+    """{id: fila} de las filas del lote que ya existen, en una sola consulta."""
+    ids = [rid for rid in (_uuid(r.get("id")) for r in block) if rid is not None]
+    if not ids:
+        return {}
+    return {obj.id: obj for obj in model.query.filter(model.id.in_(ids))}
+
+
+def _unique_category_slug(slug_base):
+    slug, i = slug_base, 1
+    while Category.query.filter_by(slug=slug).first() is not None:
+        slug = f"{slug_base}-{i}"
+        i += 1
+    return slug
+
+
+def _image_target(member):
+    """(carpeta, archivo) de un miembro images/<carpeta>/<archivo>, o None si no es una
+    imagen. ValueError si el nombre intenta salir de la carpeta (../, rutas absolutas)."""
+    if not member.startswith("images/") or member.endswith("/"):
+        return None
+    parts = member.split("/")
+    fname = parts[-1]
+    if (
+        len(parts) != 3
+        or parts[1] not in IMAGE_FOLDERS
+        or "\\" in member
+        or fname.startswith(".")
+        or fname != os.path.basename(fname)
+        or ":" in fname
+    ):
+        raise ValueError(f"nombre de imagen rechazado: {member!r}")
+    return parts[1], fname
+
+
+def _file_crc(path):
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc & 0xFFFFFFFF
+
+
+def _same_file(path, name, info, expected_hash, hash_cache):
+    """True si el archivo en disco ya es el del ZIP: mismo tamaño y mismo hash del
+    manifest (según el cache de hashes) o, si no, mismo CRC32."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if st.st_size != info.file_size:
+        return False
+    cached = hash_cache.get(name)
+    if expected_hash and cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2] == expected_hash
+    return _file_crc(path) == info.CRC
+
+
+def extract_images(zip_path, img_root, workers=4, expected_hashes=None, hash_cache=None):
+    """Extrae images/<carpeta>/<archivo> del ZIP a img_root/<carpeta>/ en paralelo.
+
+    Omite los archivos idénticos a los que ya hay, copia por bloques y escribe a un
+    temporal que después se renombra: nunca queda servida una imagen a medio escribir.
+    Devuelve {"written", "unchanged", "rejected", "errors"}."""
+    expected_hashes = expected_hashes or {}
+    hash_cache = hash_cache or {}
+    report = {"written": 0, "unchanged": 0, "rejected": 0, "errors": []}
+    jobs = []
+    with zipfile.ZipFile(zip_path) as zf:
+        for info in zf.infolist():
+            try:
+                target = _image_target(info.filename)
+            except ValueError as exc:
+                report["rejected"] += 1
+                report["errors"].append(str(exc))
+                continue
+            if target is not None:
+                jobs.append((info, target))
+    if not jobs:
+        return report
+    for folder in {folder for _, (folder, _) in jobs}:
+        os.makedirs(os.path.join(img_root, folder), exist_ok=True)
+
+    local = threading.local()
+    handles = []
+    lock = threading.Lock()
+
+    def copy(job):
+        info, (folder, fname) = job
+        name = f"{folder}/{fname}"
+        final = os.path.join(img_root, folder, fname)
+        if _same_file(final, name, info, expected_hashes.get(name), hash_cache):
+            return "unchanged"
+        zf = getattr(local, "zf", None)
+        if zf is None:
+            # ZipFile no es seguro entre hilos: uno por hilo
+            zf = local.zf = zipfile.ZipFile(zip_path)
+            with lock:
+                handles.append(zf)
+        tmp = os.path.join(img_root, folder, f".{fname}.{threading.get_ident()}.part")
+        try:
+            with zf.open(info) as src, open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst, _HASH_CHUNK)
+            os.replace(tmp, final)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return "written"
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(copy, job): job[0].filename for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    report[future.result()] += 1
+                except Exception as exc:
+                    report["errors"].append(f"{futures[future]}: {exc}")
+    finally:
+        for zf in handles:
+            zf.close()
+    return report
+
+
+def _commit_batch(results, label):
+    """Commit de un lote; si la base lo rechaza (FK, tipos) se descarta solo ese lote."""
+    try:
+        db.session.commit()
+    except SQLAlchemyError as ex:
+        db.session.rollback()
+        results["errors"].append(f"{label}: lote descartado: {getattr(ex, 'orig', None) or ex}")
+
+
+def _apply_categories(reader, results, id_map, batch_size):
+    # Los mapas de ids guardan solo las categorías/marcas que cayeron sobre otra por slug
+    for block in batches(reader.rows("categories"), batch_size):
+        existing = _existing(Category, block)
+        for c in block:
+            try:
+                cid_in = _uuid(c.get("id"))
+                cat = existing.get(cid_in)
+                desired_slug = c.get("slug") or slugify(c.get("name") or "")
+                if cat:
+                    cat.name = c.get("name")
+                    if Category.query.filter(Category.slug == desired_slug, Category.id != cat.id).first():
+                        desired_slug = _unique_category_slug(desired_slug)
+                    cat.slug = desired_slug
+                    results["updated"] += 1
+                else:
+                    existing_by_slug = Category.query.filter_by(slug=desired_slug).first()
+                    if existing_by_slug:
+                        # el id entrante se mapea a la categoría que ya tiene ese slug
+                        cat = existing_by_slug
+                        cat.name = c.get("name") or cat.name
+                        id_map[str(cid_in)] = str(cat.id)
+                        results["updated"] += 1
+                    else:
+                        db.session.add(Category(id=cid_in, name=c.get("name"), slug=_unique_category_slug(desired_slug)))
+                        results["created"] += 1
+            except Exception as ex:
+                db.session.rollback()
+                results["errors"].append(f"category {c.get('id')}: {ex}")
+        _commit_batch(results, "categories")
+    # Segunda pasada para parent_id, con los ids mapeados
+    for block in batches(reader.rows("categories"), batch_size):
+        mapped = {}
+        for c in block:
+            cid = c.get("id")
+            mapped[str(cid)] = id_map.get(str(cid)) or cid
+        existing = _existing(Category, [{"id": v} for v in mapped.values()])
+        for c in block:
+            try:
+                cat = existing.get(_uuid(mapped[str(c.get("id"))]))
+                parent_in = c.get("parent_id")
+                if cat:
+                    cat.parent_id = _uuid(id_map.get(str(parent_in)) or parent_in) if parent_in else None
+            except Exception as ex:
+                results["errors"].append(f"category-parent {c.get('id')}: {ex}")
+        _commit_batch(results, "category-parent")
+
+
+def _apply_brands(reader, results, id_map, batch_size):
+    for block in batches(reader.rows("brands"), batch_size):
+        existing = _existing(Brand, block)
+        for b in block:
+            try:
+                bid_in = _uuid(b.get("id"))
+                brand = existing.get(bid_in)
+                desired_slug = b.get("slug") or slugify(b.get("name") or "")
+                if brand:
+                    brand.name = b.get("name")
+                    if Brand.query.filter(Brand.slug == desired_slug, Brand.id != brand.id).first():
+                        desired_slug = f"{desired_slug}-{str(bid_in)[:8]}"
+                    brand.slug = desired_slug
+                    brand.visible = bool(b.get("visible"))
+                    results["updated"] += 1
+                else:
+                    existing_brand = Brand.query.filter_by(slug=desired_slug).first()
+                    if existing_brand:
+                        existing_brand.name = b.get("name") or existing_brand.name
+                        id_map[str(bid_in)] = str(existing_brand.id)
+                        results["updated"] += 1
+                    else:
+                        db.session.add(Brand(id=bid_in, name=b.get("name"), slug=desired_slug, visible=bool(b.get("visible", True))))
+                        results["created"] += 1
+            except Exception as ex:
+                db.session.rollback()
+                results["errors"].append(f"brand {b.get('id')}: {ex}")
+        _commit_batch(results, "brands")
+
+
+def _apply_products(reader, results, cat_map, brand_map, batch_size):
+    for block in batches(reader.rows("products"), batch_size):
+        existing = _existing(Product, block)
+        for p in block:
+            try:
+                pid = _uuid(p.get("id"))
+                prod = existing.get(pid)
+                cat_in, brand_in = p.get("category_id"), p.get("brand_id")
+                fields = {
+                    "name": p.get("name"),
+                    "sku": p.get("sku"),
+                    "price": p.get("price"),
+                    "in_stock": bool(p.get("in_stock", True)),
+                    "featured": bool(p.get("featured", False)),
+                    "short_desc": p.get("short_desc"),
+                    "long_desc": p.get("long_desc"),
+                    "image_filename": p.get("image_filename"),
+                    "category_id": _uuid(cat_map.get(str(cat_in)) or cat_in) if cat_in else None,
+                    "brand_id": _uuid(brand_map.get(str(brand_in)) or brand_in) if brand_in else None,
+                }
+                if prod:
+                    for key, val in fields.items():
+                        setattr(prod, key, val)
+                    results["updated"] += 1
+                else:
+                    db.session.add(Product(id=pid, **fields))
+                    results["created"] += 1
+            except Exception as ex:
+                db.session.rollback()
+                results["errors"].append(f"product {p.get('id')}: {ex}")
+        _commit_batch(results, "products")
+
+
+def _apply_product_images(reader, results, batch_size):
+    for block in batches(reader.rows("product_images"), batch_size):
+        existing = _existing(ProductImage, block)
+        for i in block:
+            try:
+                iid = _uuid(i.get("id"))
+                pi = existing.get(iid)
+                if pi:
+                    pi.product_id = _uuid(i.get("product_id"))
+                    pi.filename = i.get("filename")
+                    pi.position = int(i.get("position") or 0)
+                    results["updated"] += 1
+                else:
+                    db.session.add(ProductImage(id=iid, product_id=_uuid(i.get("product_id")), filename=i.get("filename"), position=int(i.get("position") or 0)))
+                    results["created"] += 1
+            except Exception as ex:
+                results["errors"].append(f"product_image {i.get('id')}: {ex}")
+        _commit_batch(results, "product_images")
+
+
+def _apply_slides(reader, results, batch_size):
+    for block in batches(reader.rows("slides"), batch_size):
+        existing = _existing(Slide, block)
+        for s in block:
+            try:
+                sid = _uuid(s.get("id"))
+                slide = existing.get(sid)
+                if slide:
+                    slide.image_filename = s.get("image_filename")
+                    slide.order = int(s.get("order") or 0)
+                    slide.visible = bool(s.get("visible"))
+                    results["updated"] += 1
+                else:
+                    db.session.add(Slide(id=sid, image_filename=s.get("image_filename"), order=int(s.get("order") or 0), visible=bool(s.get("visible", True))))
+                    results["created"] += 1
+            except Exception as ex:
+                results["errors"].append(f"slide {s.get('id')}: {ex}")
+        _commit_batch(results, "slides")
+
+
+def _apply_site_info(reader, results):
+    for si in reader.rows("site_info"):
+        try:
+            fields = {
+                "store_name": si.get("store_name"),
+                "address": si.get("address") or "",
+                "hours": si.get("hours") or "",
+                "email": si.get("email"),
+                "phone": si.get("phone"),
+                "instagram": si.get("instagram"),
+                "whatsapp": si.get("whatsapp"),
+                "consultas_enabled": bool(si.get("consultas_enabled", True)),
+            }
+            existing = SiteInfo.query.first()
+            if existing:
+                for key, val in fields.items():
+                    setattr(existing, key, val)
+                results["updated"] += 1
+            else:
+                db.session.add(SiteInfo(id=_uuid(si.get("id")), **fields))
+                results["created"] += 1
+        except Exception as ex:
+            results["errors"].append(f"site_info: {ex}")
+        _commit_batch(results, "site_info")
+
+
+def _apply_deleted(reader, results, id_maps, batch_size):
+    for block in batches(reader.rows("deleted"), batch_size):
+        by_table = {}
+        for d in block:
+            table = d.get("table")
+            rid = d.get("id")
+            rid = _uuid(id_maps.get(table, {}).get(str(rid)) or rid)
+            if table in TOMBSTONE_TABLES and rid is not None:
+                by_table.setdefault(table, set()).add(rid)
+        for table in TOMBSTONE_TABLES:
+            ids = list(by_table.get(table, ()))
+            if not ids:
+                continue
+            model = _MODELS[table]
+            try:
+                if table == "categories":
+                    db.session.execute(update(Product).where(Product.category_id.in_(ids)).values(category_id=None).execution_options(synchronize_session=False))
+                    db.session.execute(update(Category).where(Category.parent_id.in_(ids)).values(parent_id=None).execution_options(synchronize_session=False))
+                elif table == "brands":
+                    db.session.execute(update(Product).where(Product.brand_id.in_(ids)).values(brand_id=None).execution_options(synchronize_session=False))
+                elif table == "products":
+                    # SQLite en desarrollo no aplica el ON DELETE CASCADE
+                    db.session.query(ProductImage).filter(ProductImage.product_id.in_(ids)).delete(synchronize_session=False)
+                results["deleted"] += db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False) or 0
+                db.session.commit()
+            except Exception as ex:
+                db.session.rollback()
+                results["errors"].append(f"deleted {table}: {ex}")
+
+
+def apply_zip(path, results, batch_size=DEFAULT_BATCH_SIZE, with_images=True):
+    """Aplica un ZIP de export (completo o incremental) sobre la base actual, por lotes."""
+    with zipfile.ZipFile(path, "r") as zf:
+        reader = DumpReader(zf)
+        reader.verify()
+        if with_images:
+            images = extract_images(
+                path,
+                os.path.join(current_app.static_folder, "img"),
+                workers=current_app.config.get("DUMP_IMPORT_WORKERS", 4),
+                expected_hashes=reader.manifest.get("images"),
+                hash_cache=_load_hash_cache(),
+            )
+            results["images"] += images["written"]
+            results["images_unchanged"] += images["unchanged"]
+            results["errors"].extend(f"imagen {err}" for err in images["errors"])
+        cat_map, brand_map = {}, {}
+        _apply_categories(reader, results, cat_map, batch_size)
+        _apply_brands(reader, results, brand_map, batch_size)
+        _apply_products(reader, results, cat_map, brand_map, batch_size)
+        _apply_product_images(reader, results, batch_size)
+        _apply_slides(reader, results, batch_size)
+        _apply_site_info(reader, results)
+        _apply_deleted(reader, results, {"categories": cat_map, "brands": brand_map}, batch_size)
+
+
+def _zip_manifest(path):
+    with zipfile.ZipFile(path, "r") as zf:
+        if "manifest.json" not in zf.namelist():
+            return {"kind": "full", "generated_at": None}
+        return json.loads(zf.read("manifest.json").decode("utf-8"))
+
+
+def apply_chain(paths, batch_size=None, with_images=True):
+    """Aplica varios dumps: los completos primero y después los incrementales por fecha.
+    Avisa si un incremental no continúa al anterior. Devuelve el dict de resultados."""
+    batch_size = batch_size or current_app.config.get("DUMP_IMPORT_BATCH", DEFAULT_BATCH_SIZE)
+    results = {"created": 0, "updated": 0, "deleted": 0, "images": 0, "images_unchanged": 0, "applied": 0, "errors": [], "warnings": []}
+    entries = []
+    for path in paths:
+        try:
+            entries.append((_zip_manifest(path), path))
+        except (zipfile.BadZipFile, ValueError) as exc:
+            results["errors"].append(f"{os.path.basename(path)}: {exc}")
+    entries.sort(key=lambda e: (e[0].get("kind") != "full", e[0].get("generated_at") or ""))
+    previous = None
+    for manifest, path in entries:
+        if manifest.get("kind") == "incremental" and previous is not None:
+            base = manifest.get("base_generated_at")
+            if base and base != previous.get("generated_at"):
+                results["warnings"].append(
+                    f"el incremental del {manifest.get('generated_at')} parte de {base}, no del dump anterior ({previous.get('generated_at')})"
+                )
+        try:
+            apply_zip(path, results, batch_size=batch_size, with_images=with_images)
+            results["applied"] += 1
+        except (zipfile.BadZipFile, ValueError) as exc:
+            results["errors"].append(f"{os.path.basename(path)}: {exc}")
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            results["errors"].append(f"{os.path.basename(path)}: {getattr(exc, 'orig', None) or exc}")
+        previous = manifest
+    return results
@@ -0,0 +1,90 @@
+"""Servir archivos del disco (imágenes subidas, estáticos, logo) con el menor trabajo posible.
+
+Un solo stat por pedido, ETag fuerte (mtime + tamaño), 304 y rangos. Según FILE_OFFLOAD:
+  - "none" (default): los bytes los manda el servidor WSGI vía wsgi.file_wrapper
+    (sendfile en gunicorn), sin pasar por Python;
+  - "x-sendfile": respuesta vacía con X-Sendfile (Apache mod_xsendfile, lighttpd);
+  - "x-accel": respuesta vacía con X-Accel-Redirect para nginx; FILE_OFFLOAD_PREFIX es
+    la location interna que apunta a FILE_OFFLOAD_ROOT (default la raíz del proyecto),
+    por ejemplo `location /_files/ { internal; alias /app/; }`.
+Los archivos subidos se guardan con nombre uuid hex y nunca se reescriben, así que se
+sirven con Cache-Control immutable a un año; el resto con STATIC_MAX_AGE.
+"""
+import mimetypes
+import os
+import re
+
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+IMMUTABLE_MAX_AGE = 31536000
+# Nombres que generan los guardados de imágenes (uuid4().hex + extensión)
+_IMMUTABLE_NAME = re.compile(r"^[0-9a-f]{32}\.[A-Za-z0-9]{1,5}$")
+
+
+def is_immutable_name(filename):
+    return bool(_IMMUTABLE_NAME.match(os.path.basename(filename)))
+
+
+def _etag(st):
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def _offload_target(path):
+    """Ruta para X-Accel-Redirect, o None si el archivo queda fuera de FILE_OFFLOAD_ROOT."""
+    root = current_app.config.get("FILE_OFFLOAD_ROOT") or os.path.abspath(os.path.join(current_app.root_path, os.pardir))
+    root = os.path.abspath(root)
+    if not path.startswith(root + os.sep):
+        return None
+    prefix = (current_app.config.get("FILE_OFFLOAD_PREFIX") or "/_files").rstrip("/")
+    return f"{prefix}/{os.path.relpath(path, root).replace(os.sep, '/')}"
+
+
+def serve_file(directory, filename, max_age=None):
+    """Equivalente a send_from_directory con offload opcional y cache por nombre."""
+    path = safe_join(os.path.abspath(directory), filename)
+    if path is None:
+        abort(404)
+    try:
+        st = os.stat(path)
+    except OSError:
+        abort(404)
+    if not os.path.isfile(path):
+        abort(404)
+    if max_age is None:
+        max_age = IMMUTABLE_MAX_AGE if is_immutable_name(filename) else current_app.config.get("STATIC_MAX_AGE", 3600)
+    etag = _etag(st)
+    mode = (current_app.config.get("FILE_OFFLOAD") or "none").lower()
+    target = None
+    if mode == "x-accel":
+        target = _offload_target(path)
+    elif mode == "x-sendfile":
+        target = path
+
+    if target is None:
+        resp = send_file(path, conditional=True, etag=etag, max_age=max_age, last_modified=st.st_mtime)
+    else:
+        # El proxy manda los bytes (y resuelve los rangos); acá solo validación condicional
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        resp = current_app.response_class(mimetype=mimetype)
+        resp.set_etag(etag)
+        resp.last_modified = int(st.st_mtime)
+        resp.headers["X-Accel-Redirect" if mode == "x-accel" else "X-Sendfile"] = target
+        resp = resp.make_conditional(request)
+        if resp.status_code == 304:
+            for header in ("X-Accel-Redirect", "X-Sendfile"):
+                resp.headers.pop(header, None)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max_age
+    if max_age >= IMMUTABLE_MAX_AGE:
+        resp.cache_control.immutable = True
+    return resp
+
+
+def init_app(app):
+    """Reemplaza la vista `static` de Flask por serve_file."""
+
+    def static(filename):
+        return serve_file(app.static_folder, filename)
+
+    app.view_functions["static"] = static
@@ -0,0 +1,157 @@
+"""Cache de fragmentos de plantilla y bytecode de Jinja en disco.
+
+    {% cache 'product_card', p.id, p.updated_at %} ... {% endcache %}
+    {% cache 'nav_categories', fragment_version('categories') %} ... {% endcache %}
+
+El fragmento se renderiza una vez por clave y se reutiliza en cualquier página que use
+la misma clave (la tarjeta de producto sale igual en inicio, categoría, búsqueda y
+marca). La clave la arma la plantilla: (id, updated_at) para una fila, o
+fragment_version(namespace) para lo que depende de un namespace de catalog_versions.
+Lo que cambia por usuario o por request (controles de admin, `request.path`) tiene que
+quedar fuera del bloque.
+
+Las entradas viven en un LRU por proceso acotado en bytes (FRAGMENT_CACHE_BYTES, 0 =
+deshabilitado); las claves viejas no se borran, se caen del LRU.
+
+Además el bytecode compilado de las plantillas se guarda en JINJA_BYTECODE_CACHE_DIR
+(default data/jinja_cache): un worker nuevo no vuelve a parsear ni compilar nada.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from . import catalog_versions
+
+_generations = {}  # namespace -> cambios vistos por este proceso
+
+
+class _FragmentLRU:
+    """LRU clave -> Markup renderizado, acotado en bytes (UTF-8)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, budget):
+        size = len(value.encode("utf-8")) + 64
+        if size > budget // 8:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > budget and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+_cache = _FragmentLRU()
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def fragment_version(*namespaces):
+    """Parte de clave para fragmentos que dependen de namespaces del catálogo: la versión
+    compartida (otro worker) y los cambios commiteados en este proceso."""
+    versions = catalog_versions.current_versions() if has_app_context() else {}
+    return tuple((ns, versions.get(ns), _generations.get(ns, 0)) for ns in namespaces)
+
+
+def _on_catalog_change(namespaces):
+    for ns in namespaces:
+        _generations[ns] = _generations.get(ns, 0) + 1
+
+
+catalog_versions.subscribe(_on_catalog_change)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render", [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        budget = current_app.config.get("FRAGMENT_CACHE_BYTES", 0) if has_app_context() else 0
+        if budget <= 0:
+            return caller()
+        key = _freeze(parts)
+        value = _cache.get(key)
+        if value is None:
+            value = caller()
+            _cache.put(key, value, budget)
+        return value
+
+
+def clear():
+    _cache.clear()
+
+
+def stats():
+    return _cache.stats()
+
+
+def _bytecode_dir(app):
+    path = app.config.get("JINJA_BYTECODE_CACHE_DIR") or os.path.join(
+        os.path.abspath(os.path.join(app.root_path, os.pardir)), "data", "jinja_cache"
+    )
+    if path.lower() == "none":
+        return None
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError as exc:
+        app.logger.warning(f"[jinja] sin cache de bytecode en {path}: {exc}")
+        return None
+    return path
+
+
+def init_app(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.globals["fragment_version"] = fragment_version
+    path = _bytecode_dir(app)
+    if path:
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(path)
@@ -0,0 +1,167 @@
+"""GET condicional (ETag / Last-Modified -> 304) para las páginas públicas del catálogo.
+
+    @bp.route("/c/<slug>")
+    @depends_on("products", "categories", "brands")
+    @conditional_page
+    def category_page(slug): ...
+
+El ETag se arma sin renderizar nada: versiones de catalog_versions de los namespaces de
+la vista (más categorías y SiteInfo, que salen en el menú y el pie de todas las páginas),
+la URL con sus parámetros, si el local figura abierto o cerrado y un token del deploy
+(templates + assets). Sin backend de versiones se usa el max(updated_at) y la cantidad de
+filas de cada tabla, que además da Last-Modified.
+
+No aplica a usuarios logueados (ven controles de admin) ni si hay mensajes flash
+pendientes. Los anónimos reciben Cache-Control público con PAGE_MAX_AGE (0 = revalidar
+siempre, lo que con el 304 ya ahorra el render y el cuerpo).
+"""
+import hashlib
+import os
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import func, select
+
+from . import catalog_versions, db, store_status
+
+# Namespaces que toda página pública usa a través de base.html
+_BASE_DEPS = ("categories", "siteinfo")
+_ENCODING_SUFFIXES = ("-br", "-gzip")
+_deploy = {"token": None}
+
+
+def _deploy_token():
+    """Cambia cuando cambian los templates o los assets (un deploy), igual en todos los workers."""
+    if _deploy["token"] is None:
+        h = hashlib.sha1()
+        roots = [current_app.template_folder, os.path.join(current_app.static_folder, "dist")]
+        for root in roots:
+            for dirpath, _dirs, files in os.walk(root):
+                for fn in sorted(files):
+                    try:
+                        st = os.stat(os.path.join(dirpath, fn))
+                    except OSError:
+                        continue
+                    h.update(f"{os.path.relpath(os.path.join(dirpath, fn), root)}:{st.st_size}:{st.st_mtime_ns};".encode())
+        _deploy["token"] = h.hexdigest()[:12]
+    return _deploy["token"]
+
+
+def _table_stamps(namespaces):
+    """{namespace: (max updated_at, filas)} con una consulta; None si hay algo que no se
+    puede fechar (la selección de portada vive en un JSON)."""
+    from .models import Brand, Category, Product, ProductImage, SiteInfo, Slide
+
+    models = {
+        "products": (Product, ProductImage),
+        "categories": (Category,),
+        "brands": (Brand,),
+        "slides": (Slide,),
+        "siteinfo": (SiteInfo,),
+    }
+    if any(ns not in models for ns in namespaces):
+        return None
+    cols = []
+    for ns in sorted(namespaces):
+        for model in models[ns]:
+            created = getattr(model, "created_at", None)
+            stamp = model.updated_at if created is None else func.coalesce(model.updated_at, created)
+            cols.append(select(func.max(stamp)).scalar_subquery())
+            cols.append(select(func.count()).select_from(model).scalar_subquery())
+    row = iter(db.session.execute(select(*cols)).one())
+    stamps = {}
+    for ns in sorted(namespaces):
+        latest, total = None, 0
+        for _model in models[ns]:
+            ts, n = next(row), next(row)
+            if ts is not None and (latest is None or ts > latest):
+                latest = ts
+            total += n
+        stamps[ns] = (latest, total)
+    return stamps
+
+
+def page_validators(deps):
+    """(etag, last_modified o None) de la página actual."""
+    from .catalog_cache import site_info
+
+    namespaces = set(deps) | set(_BASE_DEPS)
+    versions = catalog_versions.current_versions()
+    last_modified = None
+    if versions:
+        state = [f"{ns}={versions.get(ns)}" for ns in sorted(namespaces)]
+    else:
+        stamps = _table_stamps(namespaces)
+        if stamps is None:
+            return None, None
+        state = [f"{ns}={ts.isoformat() if ts else '-'}/{n}" for ns, (ts, n) in sorted(stamps.items())]
+        dates = [ts for ts, _ in stamps.values() if ts is not None]
+        if dates:
+            last_modified = max(d if d.tzinfo else d.replace(tzinfo=timezone.utc) for d in dates)
+    status = store_status(site_info(), current_app.config.get("STORE_TIMEZONE"))
+    raw = "|".join([request.full_path, status, _deploy_token(), *state])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20], last_modified
+
+
+def _matching_etag(etag, last_modified):
+    """El ETag que el cliente ya tiene (con el sufijo de compresión, si lo trae) o None.
+    If-Modified-Since solo cuenta cuando no vino If-None-Match."""
+    if request.if_none_match:
+        for tag in request.if_none_match.as_set(include_weak=True):
+            base = tag
+            for suffix in _ENCODING_SUFFIXES:
+                if base.endswith(suffix):
+                    base = base[: -len(suffix)]
+                    break
+            if base == etag:
+                return tag
+        return None
+    since = request.if_modified_since
+    if since is not None and last_modified is not None and last_modified.replace(microsecond=0) <= since:
+        return etag
+    return None
+
+
+def _apply_headers(resp, etag, last_modified):
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    resp.cache_control.public = True
+    resp.cache_control.max_age = current_app.config.get("PAGE_MAX_AGE", 0)
+    resp.cache_control.must_revalidate = True
+    return resp
+
+
+def conditional_page(f):
+    """Responde 304 antes de ejecutar la vista si el cliente ya tiene esta versión."""
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if (
+            not current_app.config.get("CONDITIONAL_GET_ENABLED", True)
+            or request.method not in ("GET", "HEAD")
+            or current_user.is_authenticated
+            or session.get("_flashes")
+        ):
+            return f(*args, **kwargs)
+        try:
+            etag, last_modified = page_validators(getattr(g, "catalog_deps", ()))
+        except Exception as exc:
+            current_app.logger.warning(f"[conditional-get] sin validadores: {exc}")
+            db.session.rollback()
+            etag, last_modified = None, None
+        if etag is None:
+            return f(*args, **kwargs)
+        matched = _matching_etag(etag, last_modified)
+        if matched is not None:
+            resp = current_app.response_class(status=304)
+            return _apply_headers(resp, matched, last_modified)
+        resp = make_response(f(*args, **kwargs))
+        if resp.status_code == 200:
+            _apply_headers(resp, etag, last_modified)
+        return resp
+
+    return wrapper
+
@@ -0,0 +1,377 @@
+"""Carga masiva de imágenes de productos desde un ZIP o una carpeta del servidor.
+
+Los archivos se nombran por SKU: `ABC123.jpg` es la primera imagen de ABC123 y
+`ABC123_2.jpg` (o `ABC123-2.jpg`) la segunda. El SKU se compara sin distinguir
+mayúsculas (`abc123.jpg` también es de ABC123). El trabajo corre en segundo plano:
+  1. lista las entradas sin extraerlas,
+  2. resuelve todos los SKU con una sola consulta `lower(sku) IN (...)` y cuenta las imágenes
+     que ya tiene cada producto para respetar MAX_GALLERY_IMAGES,
+  3. copia los archivos a static/img/products en un pool de hilos (cada hilo con su
+     propio ZipFile), con el mismo esquema de nombres que _save_product_image,
+  4. inserta las filas de product_images por lotes y completa image_filename de los
+     productos que no tenían imagen principal.
+El avance queda en image_import_jobs para consultarlo mientras corre.
+"""
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import func, insert, select, update
+
+from . import db
+from .images import ALLOWED_PRODUCT_IMAGE_EXTENSIONS, MAX_GALLERY_IMAGES
+from .models import ImageImportJob, Product, ProductImage
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+_SEQ_RE = re.compile(r"^(?P<base>.+?)[_\-](?P<seq>\d{1,3})$")
+_BATCH = 200
+_REPORT_LIMIT = 200
+_STALE_AFTER = timedelta(minutes=15)
+_COPY_CHUNK = 1024 * 1024
+
+
+class ImageImportError(ValueError):
+    pass
+
+
+def parse_entry_name(path):
+    """(stem, base, seq) del nombre de archivo, o None si no es una imagen admitida.
+    `base` es el SKU sin el sufijo _N (None si no lo tiene)."""
+    name = os.path.basename(path.replace("\\", "/"))
+    if not name or name.startswith(".") or "__MACOSX" in path:
+        return None
+    stem, ext = os.path.splitext(name)
+    if ext.lower() not in ALLOWED_PRODUCT_IMAGE_EXTENSIONS or not stem.strip():
+        return None
+    stem = stem.strip()
+    match = _SEQ_RE.match(stem)
+    if match:
+        return stem, match.group("base").strip(), int(match.group("seq"))
+    return stem, None, 1
+
+
+def _looks_like_image(head):
+    return (
+        head.startswith(b"\xff\xd8\xff")
+        or head.startswith(b"\x89PNG\r\n\x1a\n")
+        or (head[:4] == b"RIFF" and head[8:12] == b"WEBP")
+    )
+
+
+# --- Orígenes ---
+
+class _ZipSource:
+    """Lee entradas de un ZIP; cada hilo abre su propio ZipFile (no es seguro compartirlo)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+    def entries(self):
+        try:
+            with zipfile.ZipFile(self.path) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir():
+                        yield info.filename, info.file_size
+        except zipfile.BadZipFile:
+            raise ImageImportError("El archivo no es un ZIP válido.")
+
+    def open(self, name):
+        zf = getattr(self._local, "zf", None)
+        if zf is None:
+            zf = zipfile.ZipFile(self.path)
+            self._local.zf = zf
+            with self._lock:
+                self._handles.append(zf)
+        return zf.open(name)
+
+    def close(self):
+        for zf in self._handles:
+            zf.close()
+
+
+class _FolderSource:
+    def __init__(self, root):
+        self.root = root
+
+    def entries(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for fn in filenames:
+                full = os.path.join(dirpath, fn)
+                try:
+                    size = os.path.getsize(full)
+                except OSError:
+                    continue
+                yield os.path.relpath(full, self.root), size
+
+    def open(self, name):
+        return open(os.path.join(self.root, name), "rb")
+
+    def close(self):
+        pass
+
+
+def resolve_folder(path):
+    """Carpeta dentro de IMAGE_IMPORT_ROOT; lanza ImageImportError si no está permitida."""
+    root = current_app.config.get("IMAGE_IMPORT_ROOT")
+    if not root:
+        raise ImageImportError("La importación desde carpeta no está habilitada (IMAGE_IMPORT_ROOT).")
+    root = os.path.realpath(root)
+    target = os.path.realpath(os.path.join(root, path or ""))
+    if os.path.commonpath([root, target]) != root or not os.path.isdir(target):
+        raise ImageImportError("La carpeta indicada no existe dentro de la carpeta de importación.")
+    return target
+
+
+# --- Trabajo ---
+
+def _copy_entry(source, name, dest_dir, max_bytes):
+    """Copia una entrada a dest_dir con nombre uuid; escribe a un temporal y renombra."""
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".jpeg":
+        ext = ".jpg"
+    fname = f"{uuid.uuid4().hex}{ext}"
+    final = os.path.join(dest_dir, fname)
+    tmp = os.path.join(dest_dir, f".{fname}.part")
+    written = 0
+    try:
+        with source.open(name) as src, open(tmp, "wb") as dst:
+            head = src.read(16)
+            if not _looks_like_image(head):
+                raise ImageImportError("no es una imagen JPG/PNG/WEBP")
+            dst.write(head)
+            written = len(head)
+            while True:
+                chunk = src.read(_COPY_CHUNK)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ImageImportError(f"supera {max_bytes // (1024 * 1024)} MB")
+                dst.write(chunk)
+        os.replace(tmp, final)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return fname
+
+
+def _plan(entries, report):
+    """Asocia entradas a productos y reparte los lugares libres de cada galería.
+    Devuelve [(product_id, position, entry_name)]."""
+    parsed = []
+    for name, size in entries:
+        info = parse_entry_name(name)
+        if info is None:
+            report["ignored"] += 1
+            continue
+        parsed.append((name, size) + info)
+    if not parsed:
+        return []
+
+    # Sin distinguir mayúsculas: las cámaras y los ZIP de Windows suelen bajar el nombre
+    candidates = {stem.lower() for _, _, stem, _, _ in parsed} | {base.lower() for _, _, _, base, _ in parsed if base}
+    by_sku = {}
+    rows = db.session.execute(
+        select(Product.id, Product.sku)
+        .where(func.lower(Product.sku).in_(list(candidates)))
+        .order_by(Product.created_at)
+    )
+    for pid, sku in rows:
+        by_sku.setdefault(sku.lower(), []).append(pid)
+
+    groups = {}
+    for name, size, stem, base, seq in parsed:
+        sku, order = stem.lower(), 1
+        if sku not in by_sku and base and base.lower() in by_sku:
+            sku, order = base.lower(), seq
+        pids = by_sku.get(sku)
+        if not pids:
+            report["unmatched"] += 1
+            if len(report["unmatched_files"]) < _REPORT_LIMIT:
+                report["unmatched_files"].append(name)
+            continue
+        if len(pids) > 1 and sku not in report["ambiguous_skus"] and len(report["ambiguous_skus"]) < _REPORT_LIMIT:
+            report["ambiguous_skus"].append(sku)  # se usa el producto más antiguo
+        groups.setdefault(pids[0], []).append((order, name))
+
+    existing = {}
+    if groups:
+        for pid, count, max_pos in db.session.execute(
+            select(ProductImage.product_id, func.count(), func.max(ProductImage.position))
+            .where(ProductImage.product_id.in_(list(groups)))
+            .group_by(ProductImage.product_id)
+        ):
+            existing[pid] = (count, max_pos or 0)
+
+    plan = []
+    for pid, files in groups.items():
+        count, max_pos = existing.get(pid, (0, 0))
+        slots = max(0, MAX_GALLERY_IMAGES - count)
+        files.sort()
+        for offset, (_, name) in enumerate(files[:slots], start=1):
+            plan.append((pid, max_pos + offset, name))
+        over = len(files) - slots
+        if over > 0:
+            report["over_limit"] += over
+    return plan
+
+
+def _flush(rows, job, report):
+    if rows:
+        db.session.execute(insert(ProductImage), rows)
+        # Imagen principal para los productos que no tenían
+        pids = list({r["product_id"] for r in rows})
+        first = (
+            select(ProductImage.filename)
+            .where(ProductImage.product_id == Product.id)
+            .order_by(ProductImage.position)
+            .limit(1)
+            .scalar_subquery()
+        )
+        db.session.execute(
+            update(Product)
+            .where(Product.id.in_(pids), Product.image_filename.is_(None))
+            .values(image_filename=first)
+            .execution_options(synchronize_session=False)
+        )
+        rows.clear()
+    job.report = dict(report)
+    db.session.commit()
+
+
+def run_job(app, job_id, kind, path, cleanup=False, workers=None):
+    """Procesa un trabajo de importación (bloqueante). Pensado para correr en un hilo."""
+    with app.app_context():
+        job = db.session.get(ImageImportJob, job_id)
+        if job is None:
+            return
+        report = {
+            "ignored": 0,
+            "unmatched": 0,
+            "over_limit": 0,
+            "unmatched_files": [],
+            "ambiguous_skus": [],
+            "errors": [],
+            "elapsed_ms": 0.0,
+        }
+        t0 = time.perf_counter()
+        source = _ZipSource(path) if kind == "zip" else _FolderSource(path)
+        try:
+            job.status = "running"
+            db.session.commit()
+            plan = _plan(list(source.entries()), report)
+            job.total = len(plan)
+            job.skipped = report["ignored"] + report["unmatched"] + report["over_limit"]
+            job.report = dict(report)
+            db.session.commit()
+
+            dest_dir = os.path.join(app.static_folder, "img", "products")
+            os.makedirs(dest_dir, exist_ok=True)
+            max_bytes = app.config.get("IMAGE_IMPORT_MAX_BYTES", DEFAULT_MAX_BYTES)
+            workers = workers or app.config.get("IMAGE_IMPORT_WORKERS") or min(8, (os.cpu_count() or 2) * 2)
+            pending = []
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    (pid, position, name, pool.submit(_copy_entry, source, name, dest_dir, max_bytes))
+                    for pid, position, name in plan
+                ]
+                for pid, position, name, fut in futures:
+                    try:
+                        fname = fut.result()
+                    except Exception as exc:
+                        job.failed += 1
+                        if len(report["errors"]) < _REPORT_LIMIT:
+                            report["errors"].append(f"{name}: {exc}")
+                    else:
+                        pending.append({"id": uuid.uuid4(), "product_id": pid, "filename": fname, "position": position})
+                        job.attached += 1
+                    job.processed += 1
+                    if len(pending) >= _BATCH or job.processed % _BATCH == 0:
+                        _flush(pending, job, report)
+            report["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            _flush(pending, job, report)
+            job.status = "done"
+            job.finished_at = datetime.now(timezone.utc)
+            db.session.commit()
+            app.logger.info(
+                f"[image-import] {job.attached} imagen(es) agregadas, {job.skipped} omitidas, "
+                f"{job.failed} con error en {report['elapsed_ms']:.0f} ms"
+            )
+        except Exception as exc:
+            db.session.rollback()
+            job = db.session.get(ImageImportJob, job_id)
+            if job is not None:
+                report["errors"].append(str(exc))
+                job.status = "failed"
+                job.report = dict(report)
+                job.finished_at = datetime.now(timezone.utc)
+                db.session.commit()
+            app.logger.warning(f"[image-import] falló el trabajo {job_id}: {exc}")
+        finally:
+            source.close()
+            if cleanup:
+                shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+def running_job():
+    """Trabajo en curso que no quedó colgado (se considera muerto sin avance en 15 min)."""
+    cutoff = datetime.now(timezone.utc) - _STALE_AFTER
+    return (
+        ImageImportJob.query.filter(
+            ImageImportJob.status.in_(("pending", "running")),
+            ImageImportJob.updated_at >= cutoff,
+        )
+        .order_by(ImageImportJob.created_at.desc())
+        .first()
+    )
+
+
+def start_job(kind, path, source_label, user_id=None, cleanup=False, background=True):
+    """Registra el trabajo y lo lanza en un hilo (o lo corre acá si background=False)."""
+    if running_job() is not None:
+        raise ImageImportError("Ya hay una importación de imágenes en curso.")
+    job = ImageImportJob(source=source_label[:300], user_id=user_id, status="pending")
+    db.session.add(job)
+    db.session.commit()
+    app = current_app._get_current_object()
+    if background:
+        threading.Thread(
+            target=run_job,
+            args=(app, job.id, kind, path),
+            kwargs={"cleanup": cleanup},
+            name=f"image-import-{job.id.hex[:8]}",
+            daemon=True,
+        ).start()
+    else:
+        run_job(app, job.id, kind, path, cleanup=cleanup)
+    return job.id
+
+
+def job_status(job):
+    return {
+        "id": str(job.id),
+        "source": job.source,
+        "status": job.status,
+        "total": job.total,
+        "processed": job.processed,
+        "attached": job.attached,
+        "skipped": job.skipped,
+        "failed": job.failed,
+        "report": job.report or {},
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,4 @@
+"""Límites de las imágenes de producto, compartidos por las vistas y las importaciones."""
+
+ALLOWED_PRODUCT_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+MAX_GALLERY_IMAGES = 10
@@ -15,6 +15,7 @@ class Category(db.Model):
     parent_id = db.Column(UUID(as_uuid=True), db.ForeignKey("categories.id"), nullable=True)
     parent = db.relationship("Category", remote_side=[id], backref="children")
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class Product(db.Model):
@@ -43,6 +44,7 @@ class Product(db.Model):
         db.Index("ix_products_name", "name"),
         db.Index("ix_products_sku", "sku"),
         db.Index("ix_products_featured", "featured"),
+        db.Index("ix_products_updated_at", "updated_at"),
     )
 
 
@@ -54,6 +56,7 @@ class ProductImage(db.Model):
     filename = db.Column(db.String(200), nullable=False)
     position = db.Column(db.Integer, nullable=False, default=1)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     product = db.relationship("Product", backref=db.backref("images", cascade="all, delete-orphan", order_by="ProductImage.position"))
 
@@ -66,6 +69,7 @@ class Brand(db.Model):
     slug = db.Column(db.String(160), unique=True, nullable=False)
     visible = db.Column(db.Boolean, nullable=False, default=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class User(UserMixin, db.Model):
@@ -107,6 +111,7 @@ class Slide(db.Model):
     order = db.Column(db.Integer, nullable=False, default=0)
     visible = db.Column(db.Boolean, nullable=False, default=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class Consulta(db.Model):
@@ -127,3 +132,108 @@ class Consulta(db.Model):
         db.Index("ix_consultas_created_at", "created_at"),
         db.Index("ix_consultas_read_at", "read_at"),
     )
+
+
+class CatalogVersion(db.Model):
+    """Contador por espacio de nombres del catálogo; se incrementa en la misma transacción
+    que cada escritura para que los caches de los demás workers sepan que están viejos."""
+    __tablename__ = "catalog_versions"
+
+    namespace = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ProductDraft(db.Model):
+    """Borrador de carga masiva de productos; la sesión solo guarda su id."""
+    __tablename__ = "product_drafts"
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    rows = db.relationship(
+        "ProductDraftRow",
+        backref="draft",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="ProductDraftRow.row_index",
+    )
+
+    __table_args__ = (
+        db.Index("ix_product_drafts_expires_at", "expires_at"),
+    )
+
+
+class ProductDraftRow(db.Model):
+    __tablename__ = "product_draft_rows"
+
+    draft_id = db.Column(UUID(as_uuid=True), db.ForeignKey("product_drafts.id", ondelete="CASCADE"), primary_key=True)
+    row_index = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.JSON, nullable=False)
+
+
+class PriceBatch(db.Model):
+    """Una aplicación de reprecio masivo; guarda el alcance y la operación para poder revertirla."""
+    __tablename__ = "price_batches"
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    scope = db.Column(db.JSON, nullable=False)
+    operation = db.Column(db.String(20), nullable=False)
+    value = db.Column(db.Numeric(12, 4), nullable=False)
+    rounding = db.Column(db.String(20), nullable=False, default="cent")
+    affected = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    reverted_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_price_batches_created_at", "created_at"),
+    )
+
+
+class PriceBatchItem(db.Model):
+    __tablename__ = "price_batch_items"
+
+    batch_id = db.Column(UUID(as_uuid=True), db.ForeignKey("price_batches.id", ondelete="CASCADE"), primary_key=True)
+    product_id = db.Column(UUID(as_uuid=True), db.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    old_price = db.Column(db.Numeric(12, 2), nullable=True)
+    new_price = db.Column(db.Numeric(12, 2), nullable=True)
+
+
+class ImageImportJob(db.Model):
+    """Carga masiva de imágenes por SKU (ZIP o carpeta del servidor) que corre en segundo plano."""
+    __tablename__ = "image_import_jobs"
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    source = db.Column(db.String(300), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    total = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    attached = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    report = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_image_import_jobs_created_at", "created_at"),
+    )
+
+
+class DeletedRecord(db.Model):
+    """Lápida de una fila borrada del catálogo, para que el export incremental la propague."""
+    __tablename__ = "deleted_records"
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True)
+    table_name = db.Column(db.String(40), nullable=False)
+    record_id = db.Column(UUID(as_uuid=True), nullable=False)
+    deleted_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_deleted_records_deleted_at", "deleted_at"),
+    )
@@ -0,0 +1,223 @@
+"""API JSON de productos v2 (/api/v2/products) para la tira de vistos recientemente y
+clientes sin HTML (app móvil, POS).
+
+    /api/v2/products?ids=<uuid>,<uuid>&fields=id,name,price
+    /api/v2/products?category=<slug|id>&brand=<slug|id>&q=taladro&stock=in&page=2&per_page=50
+
+Solo se leen las columnas de los campos pedidos (`fields=`, default DEFAULT_FIELDS). Los
+precios van como string decimal ("1234.50") para no perder centavos en float; los ids
+y fechas como string. Con `ids` se respeta el orden pedido y no hay paginado.
+"""
+import hashlib
+import json
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+from flask import current_app, request, url_for
+from flask_login import current_user
+from sqlalchemy import func, or_, select
+
+from . import db, catalog_cache
+from .models import Product
+
+try:  # opcional: serializa bastante más rápido
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+MAX_IDS = 200
+MAX_PER_PAGE = 100
+DEFAULT_PER_PAGE = 24
+
+# campo -> columnas que necesita
+FIELDS = {
+    "id": (Product.id,),
+    "name": (Product.name,),
+    "sku": (Product.sku,),
+    "price": (Product.price,),
+    "in_stock": (Product.in_stock,),
+    "featured": (Product.featured,),
+    "image": (Product.image_filename,),
+    "image_url": (Product.image_filename,),
+    "short_desc": (Product.short_desc,),
+    "long_desc": (Product.long_desc,),
+    "category_id": (Product.category_id,),
+    "brand_id": (Product.brand_id,),
+    "updated_at": (Product.updated_at,),
+    "url": (Product.id,),
+}
+DEFAULT_FIELDS = ("id", "name", "sku", "price", "image", "featured")
+
+
+class ApiError(ValueError):
+    pass
+
+
+def parse_fields(raw):
+    if not raw:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise ApiError(f"campos desconocidos: {', '.join(unknown)}")
+    return fields or DEFAULT_FIELDS
+
+
+def parse_ids(raw):
+    ids = []
+    for part in (raw or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            ids.append(UUID(part))
+        except ValueError:
+            continue
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_IDS:
+        raise ApiError(f"máximo {MAX_IDS} ids por pedido")
+    return ids
+
+
+def _category_id(value):
+    """Id de categoría a partir de un uuid o un slug (desde el cache del catálogo)."""
+    tree = catalog_cache.category_tree()
+    try:
+        node = tree["by_id"].get(UUID(value))
+    except ValueError:
+        node = tree["by_slug"].get(value)
+    return node.id if node else None
+
+
+def _brand_id(value):
+    for b in catalog_cache.brand_list():
+        if value in (str(b.id), b.slug):
+            return b.id
+    return None
+
+
+def _columns(fields):
+    cols = {}
+    for f in ("id",) + tuple(fields):
+        for col in FIELDS[f]:
+            cols[col.key] = col
+    return list(cols.values())
+
+
+def _value(field, row):
+    if field == "id":
+        return str(row.id)
+    if field == "price":
+        return None if row.price is None else f"{row.price:.2f}"
+    if field == "image":
+        return row.image_filename
+    if field == "image_url":
+        if not row.image_filename:
+            return None
+        return url_for("static", filename=f"img/products/{row.image_filename}")
+    if field == "url":
+        return url_for("main.product_detail", product_id=row.id)
+    value = getattr(row, field)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def serialize(rows, fields):
+    return [{f: _value(f, row) for f in fields} for row in rows]
+
+
+def by_ids(ids, fields):
+    if not ids:
+        return []
+    rows = db.session.execute(select(*_columns(fields)).where(Product.id.in_(ids))).all()
+    found = {row.id: row for row in rows}
+    return [found[i] for i in ids if i in found]
+
+
+def _decimal(value, name):
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except ArithmeticError:
+        raise ApiError(f"{name} inválido (usar punto decimal: 1234.50)")
+
+
+def listing(args, fields):
+    """(filas, total, page, per_page) según los filtros de `args` (los de los listados HTML,
+    con precios en formato 1234.50)."""
+    try:
+        per_page = min(MAX_PER_PAGE, max(1, int(args.get("per_page") or DEFAULT_PER_PAGE)))
+        page = max(1, int(args.get("page") or 1))
+    except ValueError:
+        raise ApiError("page/per_page inválidos")
+    conds = []
+    category = args.get("category") or args.get("category_id")
+    if category:
+        cid = _category_id(category)
+        if cid is None:
+            return [], 0, page, per_page
+        conds.append(Product.category_id.in_(catalog_cache.category_branch_ids(cid)))
+    brand = args.get("brand") or args.get("brand_id")
+    if brand:
+        bid = _brand_id(brand)
+        if bid is None:
+            return [], 0, page, per_page
+        conds.append(Product.brand_id == bid)
+    stock = args.get("stock") or ""
+    if stock == "in":
+        conds.append(Product.in_stock.is_(True))
+    elif stock == "out":
+        conds.append(Product.in_stock.is_(False))
+    if args.get("featured") in ("1", "true"):
+        conds.append(Product.featured.is_(True))
+    pmin = _decimal(args.get("pmin"), "pmin")
+    pmax = _decimal(args.get("pmax"), "pmax")
+    if pmin is not None:
+        conds.append(Product.price >= pmin)
+    if pmax is not None:
+        conds.append(Product.price <= pmax)
+    for tok in (args.get("q") or "").split():
+        like = f"%{tok}%"
+        conds.append(or_(Product.name.ilike(like), Product.short_desc.ilike(like), Product.long_desc.ilike(like), Product.sku.ilike(like)))
+    if args.get("since"):
+        try:
+            conds.append(Product.updated_at > datetime.fromisoformat(args["since"]))
+        except ValueError:
+            raise ApiError("since inválido (ISO 8601)")
+
+    total = db.session.execute(select(func.count()).select_from(Product).where(*conds)).scalar_one()
+    stmt = select(*_columns(fields)).where(*conds).order_by(Product.created_at.desc(), Product.id).offset((page - 1) * per_page).limit(per_page)
+    return db.session.execute(stmt).all(), total, page, per_page
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (UUID, datetime)):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} no serializable")
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def json_response(payload, status=200):
+    """Respuesta JSON compacta con ETag del cuerpo (304 si el cliente ya la tiene). A los
+    anónimos conditional_page les pone además el ETag por versión y Cache-Control público."""
+    body = dumps(payload)
+    resp = current_app.response_class(body, status=status, mimetype="application/json")
+    if status == 200:
+        resp.set_etag(hashlib.sha1(body).hexdigest()[:20])
+        if current_user.is_authenticated:
+            resp.cache_control.private = True
+            resp.cache_control.no_cache = True
+        resp = resp.make_conditional(request)
+    return resp
@@ -0,0 +1,385 @@
+"""Importación de productos desde planillas (CSV / XLSX) hecha en el servidor.
+
+El archivo se lee en streaming (csv.reader, u openpyxl en modo read_only para .xlsx) y
+las filas validadas se guardan por bloques en un borrador (app/drafts.py), sin pasar por
+la sesión ni por el navegador. El preview pagina sobre ese borrador y al publicar se
+recorre por lotes y se inserta con INSERT executemany.
+
+Columnas: si la primera fila tiene encabezados reconocibles (nombre, código/sku, precio,
+stock, categoría, marca) se usan esos; si no, se mantiene el formato histórico
+(columna B = código, columna C = nombre, fila 1 = encabezado).
+"""
+import csv
+import io
+import os
+import unicodedata
+import uuid
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import insert, select
+
+from . import catalog_cache, db, drafts
+from .images import MAX_GALLERY_IMAGES
+from .models import Product, ProductImage
+from .stock_sync import parse_in_stock
+
+ALLOWED_EXTENSIONS = {".csv", ".txt", ".xlsx", ".xlsm"}
+DEFAULT_MAX_ROWS = 50000
+_CHUNK = 1000
+_PUBLISH_BATCH = 500
+_REPORT_LIMIT = 200
+MAX_SKU_CHECK = 50000
+
+_HEADER_ALIASES = {
+    "name": {"nombre", "name", "producto", "articulo", "descripcion"},
+    "sku": {"sku", "codigo", "cod", "code", "cod.", "codigo interno"},
+    "price": {"precio", "price", "pvp", "precio venta", "precio de venta", "precio final"},
+    "in_stock": {"stock", "in_stock", "en stock", "disponible", "existencia"},
+    "category": {"categoria", "category", "rubro", "subcategoria"},
+    "brand": {"marca", "brand", "fabricante"},
+}
+# Formato histórico sin encabezados reconocibles: B = código, C = nombre
+_LEGACY_COLUMNS = {"sku": 1, "name": 2}
+
+
+class ImportFileError(ValueError):
+    pass
+
+
+def _fold(text):
+    """minúsculas y sin acentos, para comparar encabezados y nombres."""
+    text = unicodedata.normalize("NFKD", str(text or "").strip().lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # códigos numéricos que Excel guarda como 1234.0
+    return str(value).strip()
+
+
+def _ar_text(value):
+    """Decimal -> '1.234,50' (lo que espera el preview y _parse_decimal)."""
+    return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+# --- Lectura en streaming ---
+
+def _iter_csv(stream):
+    head = stream.read(64 * 1024)
+    if isinstance(head, str):
+        sample, text_stream = head, _chain(head, stream)
+    else:
+        try:
+            sample, encoding = head.decode("utf-8-sig"), "utf-8-sig"
+        except UnicodeDecodeError:
+            encoding = "cp1252"  # CSV exportado por Excel en Windows
+            sample = head.decode(encoding, errors="replace")
+        stream.seek(0)
+        text_stream = io.TextIOWrapper(stream, encoding=encoding, errors="replace", newline="")
+    try:
+        dialect = csv.Sniffer().sniff(sample[:8192], delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(text_stream, dialect=dialect)
+
+
+def _chain(head, stream):
+    yield from io.StringIO(head)
+    yield from stream
+
+
+def _iter_xlsx(stream):
+    # openpyxl se importa recién acá (~200 ms): el arranque no lo paga si no hay .xlsx
+    try:  # opcional: sin openpyxl solo se aceptan CSV
+        from openpyxl import load_workbook
+    except ImportError:  # pragma: no cover
+        raise ImportFileError("Para leer .xlsx falta instalar openpyxl; subí el archivo como .csv.")
+    try:
+        wb = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ImportFileError(f"No se pudo abrir el Excel: {exc}")
+    try:
+        ws = wb.worksheets[0] if wb.worksheets else None
+        if ws is None:
+            raise ImportFileError("El archivo no contiene hojas.")
+        for row in ws.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        wb.close()
+
+
+def iter_sheet_rows(stream, filename):
+    """Itera filas (listas de celdas) del archivo según su extensión."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        if ext == ".xls":
+            raise ImportFileError("El formato .xls no se soporta; guardá la planilla como .xlsx o .csv.")
+        raise ImportFileError("Formato no soportado. Usá .xlsx o .csv.")
+    if ext in {".xlsx", ".xlsm"}:
+        return _iter_xlsx(stream)
+    return _iter_csv(stream)
+
+
+# --- Mapeo y validación ---
+
+def map_columns(header):
+    """{campo: índice de columna} desde la fila de encabezado, o None si no hay nombre."""
+    mapping = {}
+    for idx, cell in enumerate(header or []):
+        key = _fold(_cell_text(cell))
+        for field, aliases in _HEADER_ALIASES.items():
+            if key in aliases and field not in mapping:
+                mapping[field] = idx
+    return mapping if "name" in mapping else None
+
+
+class _Lookups:
+    """Categorías y marcas por id, slug o nombre, resueltas una vez por importación
+    desde el cache del catálogo."""
+
+    def __init__(self):
+        tree = catalog_cache.category_tree()
+        self.categories = {}
+        for node in tree["by_id"].values():
+            self.categories.setdefault(_fold(node.name), node.id)
+            self.categories[_fold(node.slug)] = node.id
+            self.categories[str(node.id)] = node.id
+        self.brands = {}
+        for b in catalog_cache.brand_list():
+            self.brands.setdefault(_fold(b.name), b.id)
+            self.brands[_fold(b.slug)] = b.id
+            self.brands[str(b.id)] = b.id
+
+    def category(self, text):
+        return self.categories.get(_fold(text)) if text else None
+
+    def brand(self, text):
+        return self.brands.get(_fold(text)) if text else None
+
+
+def build_row(cells, mapping, lookups, parse_price):
+    """Fila del borrador a partir de las celdas, o ValueError si es inválida.
+    Las advertencias (categoría o marca no encontradas) quedan en row["issues"]."""
+    def cell(field):
+        idx = mapping.get(field)
+        if idx is None or idx >= len(cells):
+            return None
+        return cells[idx]
+
+    name = _cell_text(cell("name"))
+    if not name:
+        raise ValueError("falta el nombre")
+    sku = _cell_text(cell("sku"))
+    if len(sku) > 64:
+        raise ValueError(f"SKU demasiado largo ({sku[:20]}…)")
+
+    raw_price = cell("price")
+    price = ""
+    if isinstance(raw_price, (int, float)) and not isinstance(raw_price, bool):
+        if raw_price < 0:
+            raise ValueError(f"precio inválido: {raw_price}")
+        price = _ar_text(raw_price)
+    elif _cell_text(raw_price):
+        parsed = parse_price(_cell_text(raw_price).replace("$", "").replace(" ", ""))
+        if parsed is None or parsed < 0:
+            raise ValueError(f"precio inválido: {_cell_text(raw_price)}")
+        price = _ar_text(parsed)
+
+    in_stock = parse_in_stock(cell("in_stock"))
+    issues = []
+    category_text = _cell_text(cell("category"))
+    category_id = lookups.category(category_text)
+    if category_text and category_id is None:
+        issues.append(f"categoría '{category_text}' no encontrada")
+    brand_text = _cell_text(cell("brand"))
+    brand_id = lookups.brand(brand_text)
+    if brand_text and brand_id is None:
+        issues.append(f"marca '{brand_text}' no encontrada")
+
+    row = {
+        "name": name[:200],
+        "sku": sku,
+        "price": price,
+        "in_stock": True if in_stock is None else in_stock,
+        "category_id": str(category_id) if category_id else "",
+        "brand_id": str(brand_id) if brand_id else "",
+        "image_filename": None,
+        "gallery_images": [],
+    }
+    if issues:
+        row["issues"] = issues
+    return row
+
+
+def stage_file(stream, filename, parse_price, user_id=None, max_rows=None):
+    """Lee el archivo y lo guarda como borrador nuevo. Devuelve (draft_id, reporte)."""
+    if max_rows is None:
+        max_rows = current_app.config.get("IMPORT_MAX_ROWS", DEFAULT_MAX_ROWS)
+    rows = iter_sheet_rows(stream, filename)
+    report = {
+        "rows": 0,
+        "staged": 0,
+        "skipped": 0,
+        "with_issues": 0,
+        "truncated": False,
+        "legacy_columns": False,
+        "errors": [],
+    }
+    header = None
+    for cells in rows:
+        if any(_cell_text(c) for c in cells):
+            header = cells
+            break
+    if header is None:
+        raise ImportFileError("El archivo está vacío.")
+    mapping = map_columns(header)
+    if mapping is None:
+        mapping = dict(_LEGACY_COLUMNS)
+        report["legacy_columns"] = True
+    lookups = _Lookups()
+
+    def valid_rows():
+        line_no = 1
+        for cells in rows:
+            line_no += 1
+            if not any(_cell_text(c) for c in cells):
+                continue
+            if report["rows"] >= max_rows:
+                report["truncated"] = True
+                return
+            report["rows"] += 1
+            try:
+                row = build_row(cells, mapping, lookups, parse_price)
+            except ValueError as exc:
+                report["skipped"] += 1
+                if len(report["errors"]) < _REPORT_LIMIT:
+                    report["errors"].append(f"fila {line_no}: {exc}")
+                continue
+            if row.get("issues"):
+                report["with_issues"] += 1
+            yield row
+
+    draft_id = drafts.create_draft([], user_id=user_id)
+    try:
+        next_index = 0
+        source = valid_rows()
+        while True:
+            block = list(islice(source, _CHUNK))
+            if not block:
+                break
+            next_index = drafts.append_rows(draft_id, block, start_index=next_index)
+            db.session.commit()
+        report["staged"] = next_index
+    except Exception:
+        db.session.rollback()
+        drafts.delete_draft(draft_id)
+        raise
+    return draft_id, report
+
+
+# --- Conflictos de SKU ---
+
+def find_sku_conflicts(skus, exclude_id=None):
+    """SKUs que ya existen en products y SKUs repetidos dentro del lote, con una sola
+    consulta `sku IN (...)` sobre ix_products_sku.
+    Devuelve {"existing": {sku: [{"id", "name"}]}, "duplicates": {sku: veces}}."""
+    counts = {}
+    for sku in skus:
+        sku = (sku or "").strip()
+        if sku:
+            counts[sku] = counts.get(sku, 0) + 1
+    if len(counts) > MAX_SKU_CHECK:
+        raise ValueError(f"Se pueden verificar hasta {MAX_SKU_CHECK} SKUs por vez.")
+    existing = {}
+    if counts:
+        stmt = select(Product.id, Product.sku, Product.name).where(Product.sku.in_(list(counts)))
+        if exclude_id:
+            stmt = stmt.where(Product.id != exclude_id)
+        for row in db.session.execute(stmt):
+            existing.setdefault(row.sku, []).append({"id": str(row.id), "name": row.name})
+    return {
+        "checked": len(counts),
+        "existing": existing,
+        "duplicates": {sku: n for sku, n in counts.items() if n > 1},
+    }
+
+
+def draft_sku_conflicts(draft_id):
+    """Conflictos de SKU de todo el borrador, por fila.
+    Devuelve además {"rows": {row_index: {"sku", "position", "existing", "duplicate"}}},
+    donde position es el orden de la fila dentro del borrador (para ubicar su página)."""
+    positions = {}
+    by_sku = {}
+    for position, (idx, row) in enumerate(drafts.iter_rows(draft_id)):
+        sku = (row.get("sku") or "").strip()
+        if sku:
+            positions[idx] = position
+            by_sku.setdefault(sku, []).append(idx)
+    result = find_sku_conflicts(sku for sku, idxs in by_sku.items() for _ in idxs)
+    rows = {}
+    for sku in set(result["existing"]) | set(result["duplicates"]):
+        for idx in by_sku[sku]:
+            rows[idx] = {
+                "sku": sku,
+                "position": positions[idx],
+                "existing": [p["name"] for p in result["existing"].get(sku, [])],
+                "duplicate": sku in result["duplicates"],
+            }
+    result["rows"] = rows
+    return result
+
+
+# --- Publicación ---
+
+def _uuid_or_none(value):
+    try:
+        return uuid.UUID(str(value)) if value else None
+    except ValueError:
+        return None
+
+
+def publish_draft(draft_id, parse_price):
+    """Crea los productos del borrador con INSERT por lotes, en una sola transacción.
+    Devuelve cuántos se crearon; el llamador maneja IntegrityError."""
+    created = 0
+    products, images = [], []
+
+    def flush():
+        if products:
+            db.session.execute(insert(Product), products)
+        if images:
+            db.session.execute(insert(ProductImage), images)
+        products.clear()
+        images.clear()
+
+    for _idx, row in drafts.iter_rows(draft_id, batch_size=_PUBLISH_BATCH):
+        name = (row.get("name") or "").strip()
+        if not name:
+            continue
+        gallery = list(row.get("gallery_images") or [])
+        if not gallery and row.get("image_filename"):
+            gallery.append(row["image_filename"])
+        gallery = gallery[:MAX_GALLERY_IMAGES]
+        product_id = uuid.uuid4()
+        products.append({
+            "id": product_id,
+            "name": name,
+            "sku": (row.get("sku") or "").strip() or None,
+            "price": parse_price((row.get("price") or "").strip()),
+            "in_stock": bool(row.get("in_stock")),
+            "category_id": _uuid_or_none(row.get("category_id")),
+            "brand_id": _uuid_or_none(row.get("brand_id")),
+            "image_filename": gallery[0] if gallery else None,
+        })
+        for position, filename in enumerate(gallery, start=1):
+            images.append({"id": uuid.uuid4(), "product_id": product_id, "filename": filename, "position": position})
+        created += 1
+        if len(products) >= _PUBLISH_BATCH:
+            flush()
+    flush()
+    db.session.commit()
+    return created
@@ -0,0 +1,224 @@
+"""Reprecio masivo hecho en SQL.
+
+Un alcance (marca, rama de categorías, búsqueda o ids/SKUs explícitos) más una operación
+(porcentaje, suma fija o precio fijo) y una regla de redondeo se traducen a una sola
+expresión SQL. El preview calcula conteos y ejemplos antes/después en la base; al aplicar
+se copia el precio viejo y el nuevo a price_batch_items con un INSERT ... SELECT y se
+actualiza products con un único UPDATE ... FROM, todo en una transacción. El último lote
+se puede revertir sin pisar precios editados después.
+"""
+import re
+from decimal import Decimal
+
+from sqlalchemy import Numeric, and_, case, cast, func, insert, literal, or_, select, update
+
+from . import db
+from .models import PriceBatch, PriceBatchItem, Product
+
+OPERATIONS = {
+    "percent": "Porcentaje (+/-)",
+    "fixed": "Sumar/restar monto",
+    "set": "Fijar precio",
+}
+
+ROUNDINGS = {
+    "cent": "Centavos",
+    "unit": "Al peso",
+    "ten": "A la decena",
+    "hundred": "A la centena",
+    "up_unit": "Hacia arriba, al peso",
+    "up_ten": "Hacia arriba, a la decena",
+    "up_hundred": "Hacia arriba, a la centena",
+}
+
+SCOPES = ("brand", "category", "filter", "ids")
+
+_MAX_PRICE = Decimal("9999999999.99")
+
+
+class RepriceError(ValueError):
+    pass
+
+
+_AR_THOUSANDS = re.compile(r"^\d{1,3}(\.\d{3})+$")
+_PLAIN_NUMBER = re.compile(r"^\d+(\.\d+)?$")
+
+
+def parse_value(raw):
+    """Valor del reprecio en formato AR: 1.234,56 / 1234,5 / -10. Los puntos sin coma
+    solo valen como miles (1.234 = 1234); "1.5" es ambiguo y se rechaza, igual que NaN o
+    Infinity. Lanza RepriceError."""
+    text = str(raw or "").strip().replace("$", "").replace("%", "").replace(" ", "")
+    sign = ""
+    if text[:1] in "+-":
+        sign, text = text[:1], text[1:]
+    if not text:
+        raise RepriceError("Ingresá un valor numérico (formato 1.234,56).")
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    elif "." in text:
+        if not _AR_THOUSANDS.match(text):
+            raise RepriceError(f"Valor ambiguo: {raw}. Usá coma para los decimales (1.234,56).")
+        text = text.replace(".", "")
+    if not _PLAIN_NUMBER.match(text):  # ni exponentes ni NaN/Infinity
+        raise RepriceError(f"Valor inválido: {raw} (formato 1.234,56).")
+    value = Decimal(sign + text)
+    if abs(value) > _MAX_PRICE:
+        raise RepriceError(f"Valor inválido: {raw} (formato 1.234,56).")
+    return value
+
+
+def _num(value, scale=4):
+    return literal(value, Numeric(14, scale))
+
+
+def price_expression(operation, value, rounding):
+    """Expresión SQL del precio nuevo a partir de products.price."""
+    if operation not in OPERATIONS:
+        raise RepriceError("Operación inválida.")
+    if rounding not in ROUNDINGS:
+        raise RepriceError("Redondeo inválido.")
+    price = Product.price
+    if operation == "percent":
+        raw = price * (_num(Decimal(1)) + _num(value) / _num(Decimal(100)))
+    elif operation == "fixed":
+        raw = price + _num(value)
+    else:
+        raw = _num(value)
+
+    step = {"unit": 1, "ten": 10, "hundred": 100, "up_unit": 1, "up_ten": 10, "up_hundred": 100}.get(rounding)
+    if step is None:
+        rounded = func.round(raw, 2)
+    elif rounding.startswith("up_"):
+        rounded = func.ceil(raw / _num(Decimal(step), 0)) * _num(Decimal(step), 0)
+    else:
+        rounded = func.round(raw / _num(Decimal(step), 0)) * _num(Decimal(step), 0)
+    # Nunca negativo ni por encima de lo que entra en Numeric(12,2)
+    clamped = case(
+        (rounded < 0, _num(Decimal(0), 2)),
+        (rounded > _num(_MAX_PRICE, 2), _num(_MAX_PRICE, 2)),
+        else_=rounded,
+    )
+    return cast(clamped, Numeric(12, 2))
+
+
+def scope_condition(scope, category_ids_for=None):
+    """Condición WHERE para el alcance. `category_ids_for(id)` devuelve la rama de ids."""
+    kind = scope.get("type")
+    conds = [Product.price.isnot(None)]
+    if kind == "brand":
+        if not scope.get("brand_id"):
+            raise RepriceError("Elegí una marca.")
+        conds.append(Product.brand_id == scope["brand_id"])
+    elif kind == "category":
+        if not scope.get("category_id"):
+            raise RepriceError("Elegí una categoría.")
+        ids = category_ids_for(scope["category_id"]) if category_ids_for else [scope["category_id"]]
+        conds.append(Product.category_id.in_(ids))
+    elif kind == "filter":
+        tokens = [t for t in (scope.get("q") or "").split() if t]
+        if not tokens and not scope.get("brand_id") and not scope.get("category_id"):
+            raise RepriceError("La búsqueda no puede estar vacía (usaría todo el catálogo).")
+        for tok in tokens:
+            like = f"%{tok}%"
+            conds.append(or_(
+                Product.name.ilike(like),
+                Product.short_desc.ilike(like),
+                Product.long_desc.ilike(like),
+                Product.sku.ilike(like),
+            ))
+        if scope.get("brand_id"):
+            conds.append(Product.brand_id == scope["brand_id"])
+        if scope.get("category_id"):
+            ids = category_ids_for(scope["category_id"]) if category_ids_for else [scope["category_id"]]
+            conds.append(Product.category_id.in_(ids))
+    elif kind == "ids":
+        ids = scope.get("ids") or []
+        skus = scope.get("skus") or []
+        if not ids and not skus:
+            raise RepriceError("No se indicaron productos.")
+        parts = []
+        if ids:
+            parts.append(Product.id.in_(ids))
+        if skus:
+            parts.append(Product.sku.in_(skus))
+        conds.append(or_(*parts))
+    else:
+        raise RepriceError("Alcance inválido.")
+    return and_(*conds)
+
+
+def preview(where, new_price, sample=15):
+    """Conteos y ejemplos antes/después calculados en la base."""
+    changed = new_price != Product.price
+    totals = db.session.execute(
+        select(
+            func.count(),
+            func.count().filter(changed),
+            func.coalesce(func.sum(Product.price), 0),
+            func.coalesce(func.sum(new_price), 0),
+        ).where(where)
+    ).one()
+    samples = db.session.execute(
+        select(Product.id, Product.name, Product.sku, Product.price, new_price.label("new_price"))
+        .where(where, changed)
+        .order_by(Product.name)
+        .limit(sample)
+    ).all()
+    return {
+        "matched": totals[0],
+        "changed": totals[1],
+        "sum_before": totals[2],
+        "sum_after": totals[3],
+        "samples": samples,
+    }
+
+
+def apply(where, new_price, scope, operation, value, rounding, user_id=None):
+    """Aplica el reprecio en una transacción y devuelve el PriceBatch creado."""
+    batch = PriceBatch(scope=scope, operation=operation, value=value, rounding=rounding, user_id=user_id)
+    db.session.add(batch)
+    db.session.flush()
+    db.session.execute(
+        insert(PriceBatchItem).from_select(
+            ["batch_id", "product_id", "old_price", "new_price"],
+            select(literal(batch.id, PriceBatchItem.batch_id.type), Product.id, Product.price, new_price)
+            .where(where, new_price != Product.price),
+        )
+    )
+    result = db.session.execute(
+        update(Product)
+        .where(Product.id == PriceBatchItem.product_id, PriceBatchItem.batch_id == batch.id)
+        .values(price=PriceBatchItem.new_price, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    batch.affected = result.rowcount or 0
+    db.session.commit()
+    return batch
+
+
+def last_batch():
+    return (
+        PriceBatch.query.filter(PriceBatch.reverted_at.is_(None))
+        .order_by(PriceBatch.created_at.desc())
+        .first()
+    )
+
+
+def revert(batch):
+    """Vuelve al precio anterior los productos del lote que no se tocaron desde entonces.
+    Devuelve (revertidos, omitidos)."""
+    result = db.session.execute(
+        update(Product)
+        .where(
+            Product.id == PriceBatchItem.product_id,
+            PriceBatchItem.batch_id == batch.id,
+            Product.price == PriceBatchItem.new_price,
+        )
+        .values(price=PriceBatchItem.old_price, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    reverted = result.rowcount or 0
+    batch.reverted_at = func.now()
+    db.session.commit()
+    return reverted, max(0, (batch.affected or 0) - reverted)
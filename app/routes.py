@@ -13,35 +13,69 @@ from urllib.parse import urlparse
 from urllib.request import Request, urlopen
 import zipfile
 import tempfile
-from datetime import datetime
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, current_app, abort, Response, session, jsonify
+import shutil
+from datetime import datetime, timezone
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, current_app, abort, Response, session, jsonify, g, make_response
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.datastructures import FileStorage
-from .models import Category, Product, User, Brand, SiteInfo, Slide, Consulta, ProductImage
+from .models import Category, Product, User, Brand, SiteInfo, Slide, Consulta, ProductImage, ImageImportJob
 from sqlalchemy.exc import ProgrammingError, OperationalError, IntegrityError
-from sqlalchemy import or_, func
-from . import db, slugify
+from sqlalchemy import or_, update as sa_update
+from . import db, slugify, catalog_cache, drafts, product_import, image_import, dump, file_serving, surrogate, product_api, suggest, catalog_engine
+from .catalog_versions import depends_on, bump as bump_catalog_version
+from .http_cache import conditional_page
+from .images import ALLOWED_PRODUCT_IMAGE_EXTENSIONS, MAX_GALLERY_IMAGES
 
 bp = Blueprint("main", __name__)
 
-ALLOWED_PRODUCT_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
 MAX_REMOTE_IMAGE_SIZE = 5 * 1024 * 1024  # 5 MB
-MAX_GALLERY_IMAGES = 10
+BULK_PREVIEW_PAGE_SIZE = 50
 
 
-def _get_bulk_preview_rows():
-    return list(session.get("bulk_preview_rows") or [])
+# Borrador de carga masiva: las filas viven en product_draft_rows, la sesión solo guarda el id
+def _bulk_draft_id():
+    return _coerce_uuid(session.get("bulk_draft_id"))
+
+
+def _get_bulk_preview_page(page):
+    """(filas [(row_index, dict)], total, páginas) de la página `page` del borrador."""
+    draft_id = _bulk_draft_id()
+    total = drafts.count_rows(draft_id) if draft_id else 0
+    if not total:
+        return [], 0, 1
+    pages = (total + BULK_PREVIEW_PAGE_SIZE - 1) // BULK_PREVIEW_PAGE_SIZE
+    page = min(max(1, page), pages)
+    rows = drafts.get_page(draft_id, (page - 1) * BULK_PREVIEW_PAGE_SIZE, BULK_PREVIEW_PAGE_SIZE)
+    return rows, total, pages
 
 
 def _set_bulk_preview_rows(rows):
-    session["bulk_preview_rows"] = rows
+    """Reemplaza el borrador completo por `rows` (nuevo preview)."""
+    old_id = _bulk_draft_id()
+    user_id = getattr(current_user, "id", None) if current_user.is_authenticated else None
+    session["bulk_draft_id"] = str(drafts.create_draft(rows, user_id=user_id))
+    session.pop("bulk_preview_rows", None)  # formato viejo en cookie
     session.modified = True
+    if old_id:
+        drafts.delete_draft(old_id)
+
+
+def _get_bulk_preview_row(row_index):
+    return drafts.get_row(_bulk_draft_id(), row_index)
+
+
+def _set_bulk_preview_row(row_index, row):
+    return drafts.put_row(_bulk_draft_id(), row_index, row)
 
 
 def _clear_bulk_preview_rows():
-    if "bulk_preview_rows" in session:
+    old_id = _bulk_draft_id()
+    if "bulk_draft_id" in session or "bulk_preview_rows" in session:
+        session.pop("bulk_draft_id", None)
         session.pop("bulk_preview_rows", None)
         session.modified = True
+    if old_id:
+        drafts.delete_draft(old_id)
 
 
 def _coerce_uuid(value):
@@ -80,56 +114,58 @@ def _save_homepage_categories(slugs):
         json.dump(slugs, f, ensure_ascii=False, indent=2)
 
 
+def _render_listing(template, **context):
+    """Página de listado completa o, con ?fragment=1, solo la columna de resultados
+    (_<template>_results.html: grilla + paginador) para los filtros/paginado por fetch
+    de main.js. El fragmento no pasa por base.html ni por sus context processors."""
+    if request.args.get("fragment") != "1":
+        return render_template(template, **context)
+    g.fragment_render = True
+    resp = make_response(render_template(f"_{template[:-len('.html')]}_results.html", **context))
+    resp.headers["X-Robots-Tag"] = "noindex"
+    return resp
+
+
+def _listing_page(qry, page, per_page, **filters):
+    """(productos, total, pages, page) de un listado público: desde catalog_engine si está
+    activo y puede resolver los filtros, si no con count + offset sobre `qry`."""
+    hit = catalog_engine.listing(page=page, per_page=per_page, **filters) if catalog_engine.enabled() else None
+    if hit is not None:
+        products, total, page = hit
+    else:
+        total = qry.count()
+        page = min(page, max(1, (total + per_page - 1) // per_page))
+        products = qry.offset((page - 1) * per_page).limit(per_page).all()
+    pages = max(1, (total + per_page - 1) // per_page)
+    return products, total, pages, page
+
+
 @bp.route("/")
+@depends_on("products", "categories", "slides", "homepage", "siteinfo")
+@conditional_page
 def index():
-    categories = Category.query.order_by(Category.name).all()
-    products = Product.query.order_by(Product.created_at.desc()).limit(10).all()
+    # Portada desde el cache del catálogo (se arma antes del fork con gunicorn --preload)
     try:
-        featured_products = (
-            Product.query.filter_by(featured=True)
-            .order_by(Product.updated_at.desc(), Product.created_at.desc())
-            .limit(12)
-            .all()
-        )
+        snap = catalog_cache.homepage_snapshot(_load_homepage_categories())
     except (ProgrammingError, OperationalError):
         # La columna puede no existir aún si falta correr la migración
-        featured_products = []
+        db.session.rollback()
+        snap = {"products": [], "featured_products": [], "slides": [], "homepage_categories": []}
     site_info = SiteInfo.query.first()
-    slides = (
-        Slide.query.filter_by(visible=True)
-        .order_by(Slide.order.asc(), Slide.created_at.desc())
-        .limit(15)
-        .all()
-    )
-    # Load homepage categories selection and pick random products per category
-    homepage_slugs = _load_homepage_categories()
-    homepage_categories = []
-    if homepage_slugs:
-        for slug in homepage_slugs[:10]:
-            cat = Category.query.filter_by(slug=slug).first()
-            if not cat:
-                continue
-            # include descendant ids
-            try:
-                ids = _collect_category_ids(cat)
-            except Exception:
-                ids = [cat.id]
-            prods = (
-                Product.query.filter(Product.category_id.in_(ids))
-                .order_by(func.random())
-                .limit(10)
-                .all()
-            )
-            homepage_categories.append({"category": cat, "products": prods})
-
+    surrogate.tag("homepage")
+    surrogate.tag_products(snap["products"])
+    surrogate.tag_products(snap["featured_products"])
+    for block in snap["homepage_categories"]:
+        surrogate.tag(f"category:{block['category'].id}")
+        surrogate.tag_products(block["products"])
     return render_template(
         "index.html",
-        categories=categories,
-        products=products,
-        featured_products=featured_products,
+        categories=list(catalog_cache.category_tree()["by_id"].values()),
+        products=snap["products"],
+        featured_products=snap["featured_products"],
         site_info=site_info,
-        slides=slides,
-        homepage_categories=homepage_categories,
+        slides=snap["slides"],
+        homepage_categories=snap["homepage_categories"],
     )
 
 
@@ -137,10 +173,7 @@ def index():
 def logo_file():
     # Sirve el logo que está en la carpeta raíz del proyecto (un nivel arriba del paquete app)
     project_root = os.path.abspath(os.path.join(current_app.root_path, os.pardir))
-    logo_path = os.path.join(project_root, "logoferreteria.png")
-    if not os.path.exists(logo_path):
-        abort(404)
-    return send_from_directory(project_root, "logoferreteria.png")
+    return file_serving.serve_file(project_root, "logoferreteria.png")
 
 
 @bp.route("/brand-pattern.svg")
@@ -233,6 +266,8 @@ def brand_pattern_svg():
 
 
 @bp.route("/productos/<uuid:product_id>")
+@depends_on("products", "categories", "brands")
+@conditional_page
 def product_detail(product_id):
     product = Product.query.get_or_404(product_id)
     gallery_images = []
@@ -246,6 +281,8 @@ def product_detail(product_id):
             seen.add(filename)
             unique_images.append(filename)
     primary_image = unique_images[0] if unique_images else None
+    suggest.record_view(product.id)
+    surrogate.tag(f"product:{product.id}", f"category:{product.category_id}" if product.category_id else None, f"brand:{product.brand_id}" if product.brand_id else None)
     return render_template(
         "product_detail.html",
         product=product,
@@ -300,6 +337,8 @@ def site_info_update():
 
 
 @bp.route("/c/<slug>")
+@depends_on("products", "categories", "brands")
+@conditional_page
 def category_page(slug):
     cat = Category.query.filter_by(slug=slug).first_or_404()
 
@@ -379,13 +418,10 @@ def category_page(slug):
 
     qry = qry.order_by(Product.created_at.desc())
 
-    total = qry.count()
-    pages = (total + per_page - 1) // per_page if total else 1
-    if pages == 0:
-        pages = 1
-    if page > pages:
-        page = pages
-    products = qry.offset((page - 1) * per_page).limit(per_page).all()
+    products, total, pages, page = _listing_page(
+        qry, page, per_page,
+        category_ids=tree_ids, brand_id=_safe_uuid(brand_id_raw), stock=stock, pmin=pmin, pmax=pmax, q=q,
+    )
 
     # Subcategorías disponibles dentro de la rama (para el select)
     # Incluimos la propia categoría principal y todos sus descendientes inmediatos (se puede profundizar si hay nietos)
@@ -404,14 +440,18 @@ def category_page(slug):
     subcategory_options = [n for n in all_nodes if n.id in tree_ids]
 
     # Marcas disponibles en la rama
-    brands = (
-        Brand.query
-        .join(Product, Product.brand_id == Brand.id)
-        .filter(Product.category_id.in_(tree_ids))
-        .distinct()
-        .order_by(Brand.name)
-        .all()
-    )
+    brand_ids = catalog_engine.facet_ids("brand", category_ids=tree_ids) if catalog_engine.enabled() else None
+    if brand_ids is not None:
+        brands = sorted((b for b in catalog_cache.brand_list() if b.id in brand_ids), key=lambda b: b.name)
+    else:
+        brands = (
+            Brand.query
+            .join(Product, Product.brand_id == Brand.id)
+            .filter(Product.category_id.in_(tree_ids))
+            .distinct()
+            .order_by(Brand.name)
+            .all()
+        )
 
     # Breadcrumbs: Inicio > ... > Categoría actual
     crumbs = [("Inicio", url_for('main.index'))]
@@ -427,7 +467,10 @@ def category_page(slug):
     # Actual sin link
     crumbs.append((cat.name, None))
 
-    return render_template(
+    # La página lista toda la rama: un producto nuevo en una subcategoría también la cambia
+    surrogate.tag(*(f"category:{cid}" for cid in catalog_cache.category_branch_ids(cat.id)))
+    surrogate.tag_products(products)
+    return _render_listing(
         "category.html",
         category=cat,
         products=products,
@@ -506,6 +549,8 @@ def consultas():
 
 
 @bp.route("/search")
+@depends_on("products", "categories", "brands")
+@conditional_page
 def search():
     q = (request.args.get("q") or "").strip()
     code = (request.args.get("code") or "").strip()
@@ -532,6 +577,7 @@ def search():
     qry = Product.query
 
     # Filtro por categoría (incluye descendientes)
+    category_ids = None
     if category_id_raw:
         try:
             sel_id = uuid.UUID(category_id_raw)
@@ -539,8 +585,8 @@ def search():
         except Exception:
             cat = None
         if cat:
-            ids = _collect_category_ids(cat)
-            qry = qry.filter(Product.category_id.in_(ids))
+            category_ids = _collect_category_ids(cat)
+            qry = qry.filter(Product.category_id.in_(category_ids))
 
     # Filtro por marca
     if brand_id_raw:
@@ -585,19 +631,18 @@ def search():
 
     qry = qry.order_by(Product.created_at.desc())
 
-    total = qry.count()
-    pages = (total + per_page - 1) // per_page if total else 1
-    if pages == 0:
-        pages = 1
-    if page > pages:
-        page = pages
-    items = qry.offset((page - 1) * per_page).limit(per_page).all()
+    items, total, pages, page = _listing_page(
+        qry, page, per_page,
+        category_ids=category_ids, brand_id=_safe_uuid(brand_id_raw), code=code, stock=stock, pmin=pmin, pmax=pmax, q=q,
+    )
 
-    roots = _category_roots_with_children()
-    brands = Brand.query.order_by(Brand.name).all()
+    roots = catalog_cache.nav_categories()
+    brands = catalog_cache.brand_list()
     breadcrumbs = [("Inicio", url_for('main.index')), ("Buscar", None)]
 
-    return render_template(
+    surrogate.tag("search")
+    surrogate.tag_products(items)
+    return _render_listing(
         "search.html",
         q=q,
         code=code,
@@ -777,6 +822,8 @@ def admin_homepage_categories():
             if Category.query.filter_by(slug=s).first():
                 valid.append(s)
         _save_homepage_categories(valid)
+        bump_catalog_version("homepage")
+        surrogate.purge({"homepage"})
         flash("Selección guardada.", "success")
         return redirect(url_for("main.admin_homepage_categories"))
     # GET: list categories with counts
@@ -789,323 +836,67 @@ def admin_homepage_categories():
     return render_template("admin/homepage_categories.html", categories=rows, selected=selected)
 
 
-@bp.route("/admin/db/export")
+@bp.route("/admin/db/export", methods=["GET", "POST"])
 @admin_required
 def admin_db_export():
-    # Build dump
-    dump = {}
-    # Categories
-    cats = Category.query.order_by(Category.created_at).all()
-    dump["categories"] = [
-        {
-            "id": str(c.id),
-            "name": c.name,
-            "slug": c.slug,
-            "parent_id": str(c.parent_id) if c.parent_id else None,
-            "created_at": c.created_at.isoformat() if c.created_at else None,
-        }
-        for c in cats
-    ]
-    # Brands
-    brands = Brand.query.order_by(Brand.created_at).all()
-    dump["brands"] = [
-        {"id": str(b.id), "name": b.name, "slug": b.slug, "visible": b.visible, "created_at": b.created_at.isoformat() if b.created_at else None}
-        for b in brands
-    ]
-    # Products
-    prods = Product.query.order_by(Product.created_at).all()
-    def dec_to_str(v):
+    """Export completo, o incremental si llega `since` (ISO) o el manifest/ZIP de un export anterior."""
+    since = (request.values.get("since") or "").strip() or None
+    base_manifest = None
+    base_file = request.files.get("base_file")
+    if base_file and base_file.filename:
         try:
-            return str(v) if v is not None else None
-        except Exception:
-            return None
-
-    dump["products"] = [
-        {
-            "id": str(p.id),
-            "name": p.name,
-            "sku": p.sku,
-            "price": dec_to_str(p.price),
-            "in_stock": bool(p.in_stock),
-            "featured": bool(p.featured),
-            "short_desc": p.short_desc,
-            "long_desc": p.long_desc,
-            "image_filename": p.image_filename,
-            "category_id": str(p.category_id) if p.category_id else None,
-            "brand_id": str(p.brand_id) if p.brand_id else None,
-            "created_at": p.created_at.isoformat() if p.created_at else None,
-            "updated_at": p.updated_at.isoformat() if p.updated_at else None,
-        }
-        for p in prods
-    ]
-    # Product images
-    imgs = ProductImage.query.order_by(ProductImage.created_at).all()
-    dump["product_images"] = [
-        {"id": str(i.id), "product_id": str(i.product_id), "filename": i.filename, "position": i.position, "created_at": i.created_at.isoformat() if i.created_at else None}
-        for i in imgs
-    ]
-    # Slides
-    slides = Slide.query.order_by(Slide.order.asc()).all()
-    dump["slides"] = [
-        {"id": str(s.id), "image_filename": s.image_filename, "order": s.order, "visible": s.visible}
-        for s in slides
-    ]
-    # Site info (single)
-    si = SiteInfo.query.first()
-    dump["site_info"] = None
-    if si:
-        dump["site_info"] = {"id": str(si.id), "store_name": si.store_name, "address": si.address, "hours": si.hours, "email": si.email, "phone": si.phone, "instagram": si.instagram, "whatsapp": si.whatsapp, "consultas_enabled": bool(si.consultas_enabled)}
-
-    # Collect image filenames to package
-    image_files = set()
-    for p in dump.get("products", []):
-        if p.get("image_filename"):
-            image_files.add(("products", p["image_filename"]))
-    for pi in dump.get("product_images", []):
-        if pi.get("filename"):
-            image_files.add(("products", pi["filename"]))
-    for s in dump.get("slides", []):
-        if s.get("image_filename"):
-            image_files.add(("slides", s["image_filename"]))
-
-    # Create zip in memory
-    bio = BytesIO()
-    with zipfile.ZipFile(bio, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        # dump.json
-        zf.writestr("dump.json", json.dumps(dump, ensure_ascii=False, indent=2))
-        # images
-        for folder, fname in image_files:
-            # try standard paths
-            src = os.path.join(current_app.static_folder, "img", folder, fname)
-            if os.path.exists(src):
-                arcname = os.path.join("images", folder, fname)
-                zf.write(src, arcname)
-    bio.seek(0)
+            base_manifest = dump.read_manifest(base_file.read())
+        except (ValueError, zipfile.BadZipFile) as exc:
+            flash(f"No se pudo leer el export base: {exc}", "danger")
+            return redirect(url_for("main.admin_db"))
+    # El ZIP se arma en disco pasado cierto tamaño, no entero en memoria
+    out = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    try:
+        manifest = dump.write_export(out, since=since, base_manifest=base_manifest)
+    except ValueError:
+        out.close()
+        flash("Fecha 'desde' inválida (usá AAAA-MM-DD o AAAA-MM-DDTHH:MM).", "danger")
+        return redirect(url_for("main.admin_db"))
+    out.seek(0)
     ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    filename = f"ferreteria_export_{ts}.zip"
-    return Response(bio.getvalue(), mimetype="application/zip", headers={"Content-Disposition": f"attachment; filename=\"{filename}\""})
+    suffix = "_incremental" if manifest["kind"] == "incremental" else ""
+    filename = f"ferreteria_export_{ts}{suffix}.zip"
+    current_app.logger.info(f"[db-export] {manifest['kind']} since={manifest['since']} counts={manifest['counts']}")
+    return send_file(out, mimetype="application/zip", as_attachment=True, download_name=filename)
 
 
 @bp.route("/admin/db/import", methods=["POST"]) 
 @admin_required
 def admin_db_import():
-    f = request.files.get("dump_file")
-    if not f:
+    files = [f for f in request.files.getlist("dump_file") if f and f.filename]
+    if not files:
         flash("No file uploaded", "danger")
         return redirect(url_for("main.admin_db"))
     # Save to temp
-    tmp = tempfile.NamedTemporaryFile(delete=False)
+    tmp_paths = []
     try:
-        f.save(tmp.name)
-        results = {"created": 0, "updated": 0, "errors": []}
-        with zipfile.ZipFile(tmp.name, "r") as zf:
-            if "dump.json" not in zf.namelist():
-                flash("El archivo no contiene dump.json", "danger")
-                return redirect(url_for("main.admin_db"))
-            dump = json.loads(zf.read("dump.json").decode("utf-8"))
-            # Extract images to static folder
-            for member in zf.namelist():
-                if member.startswith("images/"):
-                    parts = member.split('/')
-                    # images/<folder>/<filename>
-                    if len(parts) >= 3:
-                        folder = parts[1]
-                        fname = '/'.join(parts[2:])
-                        outdir = os.path.join(current_app.static_folder, "img", folder)
-                        os.makedirs(outdir, exist_ok=True)
-                        outpath = os.path.join(outdir, fname)
-                        with zf.open(member) as srcf, open(outpath, "wb") as outf:
-                            outf.write(srcf.read())
-            # Import categories (create or update without parent)
-            cat_id_map = {}
-            cats = dump.get("categories", [])
-            for c in cats:
-                try:
-                    cid_in = _coerce_uuid(c.get("id"))
-                    cat = Category.query.get(cid_in)
-                    if cat:
-                        # update existing by id
-                        cat.name = c.get("name")
-                        # if slug conflicts with another row, ensure uniqueness
-                        desired_slug = c.get("slug") or slugify(c.get("name") or "")
-                        if Category.query.filter(Category.slug == desired_slug, Category.id != cat.id).first():
-                            desired_slug = _unique_category_slug(desired_slug)
-                        cat.slug = desired_slug
-                        results["updated"] += 1
-                        actual_id = cat.id
-                    else:
-                        # check if slug already exists for a different category
-                        desired_slug = c.get("slug") or slugify(c.get("name") or "")
-                        existing_by_slug = Category.query.filter_by(slug=desired_slug).first()
-                        if existing_by_slug:
-                            # map incoming id to existing category
-                            cat = existing_by_slug
-                            # optionally update name
-                            cat.name = c.get("name") or cat.name
-                            results["updated"] += 1
-                            actual_id = cat.id
-                        else:
-                            # create new category with incoming id
-                            # ensure slug is unique
-                            unique_slug = _unique_category_slug(desired_slug)
-                            cat = Category(id=cid_in, name=c.get("name"), slug=unique_slug)
-                            db.session.add(cat)
-                            results["created"] += 1
-                            actual_id = cid_in
-                    cat_id_map[str(cid_in)] = str(actual_id)
-                except Exception as ex:
-                    db.session.rollback()
-                    results["errors"].append(f"category {c.get('id')}: {ex}")
-            db.session.commit()
-            # Second pass to set parent_id (use mapped ids)
-            for c in cats:
-                try:
-                    cid_in = c.get("id")
-                    mapped_id = cat_id_map.get(str(cid_in))
-                    parent_in = c.get("parent_id")
-                    mapped_parent = cat_id_map.get(str(parent_in)) if parent_in else None
-                    if mapped_id:
-                        cat = Category.query.get(_coerce_uuid(mapped_id))
-                        if cat:
-                            cat.parent_id = _coerce_uuid(mapped_parent) if mapped_parent else None
-                except Exception as ex:
-                    results["errors"].append(f"category-parent {c.get('id')}: {ex}")
-            db.session.commit()
-
-            # Brands
-            brand_id_map = {}
-            brands = dump.get("brands", [])
-            for b in brands:
-                try:
-                    bid_in = _coerce_uuid(b.get("id"))
-                    brand = Brand.query.get(bid_in)
-                    if brand:
-                        brand.name = b.get("name")
-                        desired_slug = b.get("slug") or slugify(b.get("name") or "")
-                        if Brand.query.filter(Brand.slug == desired_slug, Brand.id != brand.id).first():
-                            desired_slug = f"{desired_slug}-{str(bid_in)[:8]}"
-                        brand.slug = desired_slug
-                        brand.visible = bool(b.get("visible"))
-                        results["updated"] += 1
-                        actual_bid = brand.id
-                    else:
-                        desired_slug = b.get("slug") or slugify(b.get("name") or "")
-                        existing_brand = Brand.query.filter_by(slug=desired_slug).first()
-                        if existing_brand:
-                            brand = existing_brand
-                            brand.name = b.get("name") or brand.name
-                            results["updated"] += 1
-                            actual_bid = brand.id
-                        else:
-                            brand = Brand(id=bid_in, name=b.get("name"), slug=desired_slug, visible=bool(b.get("visible", True)))
-                            db.session.add(brand)
-                            results["created"] += 1
-                            actual_bid = bid_in
-                    brand_id_map[str(bid_in)] = str(actual_bid)
-                except Exception as ex:
-                    db.session.rollback()
-                    results["errors"].append(f"brand {b.get('id')}: {ex}")
-            db.session.commit()
-
-            # Products
-            products = dump.get("products", [])
-            for p in products:
-                try:
-                    pid = _coerce_uuid(p.get("id"))
-                    prod = Product.query.get(pid)
-                    # map category and brand ids via maps
-                    cat_in = p.get("category_id")
-                    brand_in = p.get("brand_id")
-                    mapped_cat = _coerce_uuid(cat_id_map.get(str(cat_in))) if cat_in and cat_id_map.get(str(cat_in)) else _coerce_uuid(cat_in)
-                    mapped_brand = _coerce_uuid(brand_id_map.get(str(brand_in))) if brand_in and brand_id_map.get(str(brand_in)) else _coerce_uuid(brand_in)
-                    if prod:
-                        prod.name = p.get("name")
-                        prod.sku = p.get("sku")
-                        prod.price = p.get("price")
-                        prod.in_stock = bool(p.get("in_stock"))
-                        prod.featured = bool(p.get("featured"))
-                        prod.short_desc = p.get("short_desc")
-                        prod.long_desc = p.get("long_desc")
-                        prod.image_filename = p.get("image_filename")
-                        prod.category_id = mapped_cat
-                        prod.brand_id = mapped_brand
-                        results["updated"] += 1
-                    else:
-                        prod = Product(id=pid, name=p.get("name"), sku=p.get("sku"), price=p.get("price"), in_stock=bool(p.get("in_stock", True)), featured=bool(p.get("featured", False)), short_desc=p.get("short_desc"), long_desc=p.get("long_desc"), image_filename=p.get("image_filename"), category_id=mapped_cat, brand_id=mapped_brand)
-                        db.session.add(prod)
-                        results["created"] += 1
-                except Exception as ex:
-                    db.session.rollback()
-                    results["errors"].append(f"product {p.get('id')}: {ex}")
-            db.session.commit()
-
-            # Product images
-            pim = dump.get("product_images", [])
-            for i in pim:
-                try:
-                    iid = _coerce_uuid(i.get("id"))
-                    pi = ProductImage.query.get(iid)
-                    if pi:
-                        pi.product_id = _coerce_uuid(i.get("product_id"))
-                        pi.filename = i.get("filename")
-                        pi.position = int(i.get("position") or 0)
-                        results["updated"] += 1
-                    else:
-                        pi = ProductImage(id=iid, product_id=_coerce_uuid(i.get("product_id")), filename=i.get("filename"), position=int(i.get("position") or 0))
-                        db.session.add(pi)
-                        results["created"] += 1
-                except Exception as ex:
-                    results["errors"].append(f"product_image {i.get('id')}: {ex}")
-            db.session.commit()
-
-            # Slides
-            sls = dump.get("slides", [])
-            for s in sls:
-                try:
-                    sid = _coerce_uuid(s.get("id"))
-                    slide = Slide.query.get(sid)
-                    if slide:
-                        slide.image_filename = s.get("image_filename")
-                        slide.order = int(s.get("order") or 0)
-                        slide.visible = bool(s.get("visible"))
-                        results["updated"] += 1
-                    else:
-                        slide = Slide(id=sid, image_filename=s.get("image_filename"), order=int(s.get("order") or 0), visible=bool(s.get("visible", True)))
-                        db.session.add(slide)
-                        results["created"] += 1
-                except Exception as ex:
-                    results["errors"].append(f"slide {s.get('id')}: {ex}")
-            db.session.commit()
-
-            # Site info
-            si = dump.get("site_info")
-            if si:
-                try:
-                    existing = SiteInfo.query.first()
-                    if existing:
-                        existing.store_name = si.get("store_name")
-                        existing.address = si.get("address")
-                        existing.hours = si.get("hours")
-                        existing.email = si.get("email")
-                        existing.phone = si.get("phone")
-                        existing.instagram = si.get("instagram")
-                        existing.whatsapp = si.get("whatsapp")
-                        existing.consultas_enabled = bool(si.get("consultas_enabled", True))
-                        results["updated"] += 1
-                    else:
-                        newsi = SiteInfo(id=_coerce_uuid(si.get("id")), store_name=si.get("store_name"), address=si.get("address") or "", hours=si.get("hours") or "", email=si.get("email"), phone=si.get("phone"), instagram=si.get("instagram"), whatsapp=si.get("whatsapp"), consultas_enabled=bool(si.get("consultas_enabled", True)))
-                        db.session.add(newsi)
-                        results["created"] += 1
-                except Exception as ex:
-                    results["errors"].append(f"site_info: {ex}")
-            db.session.commit()
-
-        flash(f"Import terminado: {results['created']} creados, {results['updated']} actualizados. Errores: {len(results['errors'])}", "success" if not results['errors'] else "warning")
+        for f in files:
+            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
+            tmp.close()
+            f.save(tmp.name)
+            tmp_paths.append(tmp.name)
+        results = dump.apply_chain(tmp_paths)
+        for warning in results["warnings"]:
+            flash(f"Atención: {warning}", "warning")
+        for err in results["errors"][:10]:
+            flash(err, "danger")
+        flash(
+            f"Import terminado ({results['applied']} archivo(s)): {results['created']} creados, {results['updated']} actualizados, "
+            f"{results['deleted']} borrados, {results['images']} imágenes copiadas ({results['images_unchanged']} sin cambios). "
+            f"Errores: {len(results['errors'])}",
+            "success" if not results["errors"] else "warning",
+        )
     finally:
-        try:
-            os.unlink(tmp.name)
-        except Exception:
-            pass
+        for path in tmp_paths:
+            try:
+                os.unlink(path)
+            except Exception:
+                pass
     return redirect(url_for("main.admin_db"))
 
 
@@ -1115,10 +906,14 @@ def admin_db_import():
 def products_admin_list():
     roots = _category_roots_with_children()
     brands = Brand.query.order_by(Brand.name).all()
-    preview_rows = _get_bulk_preview_rows()
     if request.method == "GET" and request.args.get("clear_preview") == "1":
         _clear_bulk_preview_rows()
-        preview_rows = []
+    try:
+        bulk_page = int(request.args.get("bulk_page") or "1")
+    except ValueError:
+        bulk_page = 1
+    preview_page, preview_total, preview_pages = _get_bulk_preview_page(bulk_page)
+    bulk_page = min(max(1, bulk_page), preview_pages)
 
     # Búsqueda y filtros para la sección "Buscar y Editar Productos"
     q = (request.args.get("q") or "").strip()
@@ -1220,127 +1015,65 @@ def products_admin_list():
                     "gallery_images": [],
                 })
             _set_bulk_preview_rows(preview_rows)
-            # Render sin redirigir, misma página con la tabla editable
-            return render_template(
-                "admin/products_list.html",
-                roots=roots,
-                brands=brands,
-                preview_rows=preview_rows,
-                products=[],
-                q=q,
-                category_id=category_id_raw,
-                brand_id=brand_id_raw,
-                per_page=per_page,
-                page=page,
-                pages=pages,
-                total=0,
-            )
-        elif action == "excel_preview":
-            payload = request.form.get("excel_payload") or "[]"
-            try:
-                rows = json.loads(payload)
-            except Exception:
-                rows = []
-            preview_rows = []
-            for row in rows:
-                name = (row.get("name") or "").strip()
-                if not name:
-                    continue
-                sku = (row.get("sku") or "").strip() or None
-                preview_rows.append({
-                    "name": name,
-                    "sku": sku,
-                    "price": (row.get("price") or "").strip(),
-                    "in_stock": bool(row.get("in_stock", True)),
-                    "category_id": row.get("category_id") or "",
-                    "brand_id": row.get("brand_id") or "",
-                    "image_filename": None,
-                    "gallery_images": [],
-                })
-            if not preview_rows:
-                flash("No se encontraron productos válidos en el Excel subido.", "warning")
-                return redirect(url_for("main.products_admin_list"))
-            _set_bulk_preview_rows(preview_rows)
-            return render_template(
-                "admin/products_list.html",
-                roots=roots,
-                brands=brands,
-                preview_rows=preview_rows,
-                products=[],
-                q=q,
-                category_id=category_id_raw,
-                brand_id=brand_id_raw,
-                per_page=per_page,
-                page=page,
-                pages=1,
-                total=0,
-            )
+            return redirect(url_for("main.products_admin_list"))
         elif action == "save":
-            # Paso 2: recibir items[i][field] y guardarlos
+            # Paso 2: la página visible trae items[i][campo] (i = índice de fila en el borrador);
+            # primero se vuelcan esas ediciones al borrador y después se publica el borrador entero.
             delete_mode = request.form.get("delete_mode")  # 'selected', 'all' o None
-            try:
-                count = int(request.form.get("items_count", "0"))
-            except ValueError:
-                count = 0
+            draft_id = _bulk_draft_id()
 
             # Si el usuario eligió "Eliminar todo", no creamos nada
             if delete_mode == "all":
                 flash("Se descartaron todos los productos del listado a crear.", "info")
                 _clear_bulk_preview_rows()
                 return redirect(url_for("main.products_admin_list"))
+            if not draft_id:
+                flash("El listado a crear venció o ya se publicó.", "warning")
+                return redirect(url_for("main.products_admin_list"))
 
-            created = 0
-            for i in range(count):
-                # Si se eligió "Eliminar seleccionados" y este ítem está tildado, saltarlo
-                if delete_mode == "selected" and request.form.get(f"items[{i}][delete]"):
-                    continue
-
-                name = (request.form.get(f"items[{i}][name]") or "").strip()
-                if not name:
+            marked = []
+            edits = {}
+            for raw_index in request.form.getlist("item_index"):
+                try:
+                    i = int(raw_index)
+                except ValueError:
                     continue
-                sku = (request.form.get(f"items[{i}][sku]") or "").strip() or None
-                price_raw = (request.form.get(f"items[{i}][price]") or "").strip()
-                in_stock = bool(request.form.get(f"items[{i}][in_stock]"))
-                cat_id_raw = request.form.get(f"items[{i}][category_id]") or None
-                category_id = uuid.UUID(cat_id_raw) if cat_id_raw else None
-                price = None
-                if price_raw:
-                    # Parse formato argentino (miles punto, decimal coma)
-                    price_clean = price_raw.replace('.', '').replace(',', '.')
-                    try:
-                        price = Decimal(price_clean)
-                    except (InvalidOperation, AttributeError):
-                        price = None
-                brand_id_raw = request.form.get(f"items[{i}][brand_id]") or None
-                brand_id = uuid.UUID(brand_id_raw) if brand_id_raw else None
-                row_meta = preview_rows[i] if preview_rows and i < len(preview_rows) else {}
-                gallery_filenames = list(row_meta.get("gallery_images") or [])
-                if not gallery_filenames and row_meta and row_meta.get("image_filename"):
-                    gallery_filenames.append(row_meta.get("image_filename"))
-                if gallery_filenames:
-                    gallery_filenames = gallery_filenames[:MAX_GALLERY_IMAGES]
-                primary_image = gallery_filenames[0] if gallery_filenames else (row_meta.get("image_filename") if row_meta else None)
-                p = Product(
-                    name=name,
-                    sku=sku,
-                    price=price,
-                    in_stock=in_stock,
-                    category_id=category_id,
-                    brand_id=brand_id,
-                    image_filename=primary_image,
-                )
-                db.session.add(p)
-                if gallery_filenames:
-                    for position, filename in enumerate(gallery_filenames, start=1):
-                        db.session.add(ProductImage(product=p, filename=filename, position=position))
-                created += 1
-            if not created:
-                flash("No se crearon productos. Revisá los datos.", "warning")
-                _clear_bulk_preview_rows()
-                return redirect(url_for("main.products_admin_list"))
+                if request.form.get(f"items[{i}][delete]"):
+                    marked.append(i)
+                edits[i] = {
+                    "name": (request.form.get(f"items[{i}][name]") or "").strip(),
+                    "sku": (request.form.get(f"items[{i}][sku]") or "").strip(),
+                    "price": (request.form.get(f"items[{i}][price]") or "").strip(),
+                    "in_stock": bool(request.form.get(f"items[{i}][in_stock]")),
+                    "category_id": request.form.get(f"items[{i}][category_id]") or "",
+                    "brand_id": request.form.get(f"items[{i}][brand_id]") or "",
+                }
+            # Toda la página en una transacción
+            drafts.patch_rows(draft_id, edits)
+
+            goto_page = request.form.get("goto_page")
+            if goto_page:
+                return redirect(url_for("main.products_admin_list", bulk_page=goto_page))
+            if delete_mode == "selected":
+                removed = drafts.delete_rows(draft_id, marked)
+                flash(f"Se quitaron {removed} fila(s) del listado a crear." if removed else "No había filas seleccionadas.", "info")
+                return redirect(url_for("main.products_admin_list", bulk_page=request.form.get("bulk_page") or 1))
+
+            if not request.form.get("allow_sku_conflicts"):
+                conflicts = product_import.draft_sku_conflicts(draft_id)
+                if conflicts["rows"]:
+                    first = min(conflicts["rows"].values(), key=lambda info: info["position"])
+                    skus = sorted(set(conflicts["existing"]) | set(conflicts["duplicates"]))
+                    preview = ", ".join(skus[:5]) + (f" y {len(skus) - 5} más" if len(skus) > 5 else "")
+                    flash(
+                        f"{len(conflicts['rows'])} fila(s) tienen SKU que ya existe o se repite en el listado ({preview}). "
+                        "Corregilas o marcá \"Permitir SKU repetidos\" para publicar igual.",
+                        "danger",
+                    )
+                    return redirect(url_for("main.products_admin_list", bulk_page=first["position"] // BULK_PREVIEW_PAGE_SIZE + 1))
 
             try:
-                db.session.commit()
+                created = product_import.publish_draft(draft_id, _parse_decimal)
             except IntegrityError as exc:
                 db.session.rollback()
                 detail = ""
@@ -1361,6 +1094,11 @@ def products_admin_list():
                     flash("No se pudieron crear los productos: algunos SKU ya existen o están repetidos.", "danger")
                 return redirect(url_for("main.products_admin_list"))
 
+            if not created:
+                flash("No se crearon productos. Revisá los datos.", "warning")
+                _clear_bulk_preview_rows()
+                return redirect(url_for("main.products_admin_list"))
+
             flash(f"{created} producto(s) creados", "success")
             _clear_bulk_preview_rows()
         # Tras guardar, recargar búsqueda actualizada (primer página)
@@ -1372,7 +1110,11 @@ def products_admin_list():
         roots=roots,
         brands=brands,
         products=products_page,
-        preview_rows=preview_rows,
+        preview_page=preview_page,
+        preview_total=preview_total,
+        preview_pages=preview_pages,
+        bulk_page=bulk_page,
+        bulk_page_size=BULK_PREVIEW_PAGE_SIZE,
         q=q,
         category_id=category_id_raw,
         brand_id=brand_id_raw,
@@ -1383,15 +1125,112 @@ def products_admin_list():
     )
 
 
+@bp.route("/admin/products/import", methods=["POST"])
+@admin_required
+def products_admin_import():
+    """Sube una planilla (CSV/XLSX) y la deja como borrador paginado para revisar."""
+    upload = request.files.get("import_file")
+    if not upload or not upload.filename:
+        flash("Seleccioná un archivo .xlsx o .csv.", "warning")
+        return redirect(url_for("main.products_admin_list"))
+    user_id = getattr(current_user, "id", None) if current_user.is_authenticated else None
+    try:
+        draft_id, report = product_import.stage_file(upload.stream, upload.filename, _parse_decimal, user_id=user_id)
+    except product_import.ImportFileError as exc:
+        flash(str(exc), "danger")
+        return redirect(url_for("main.products_admin_list"))
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.exception(f"[import] falló la importación de {upload.filename}: {exc}")
+        flash("No se pudo leer el archivo. Revisá que sea una planilla válida.", "danger")
+        return redirect(url_for("main.products_admin_list"))
+
+    if not report["staged"]:
+        drafts.delete_draft(draft_id)
+        flash("No se encontraron productos válidos en el archivo subido.", "warning")
+        for err in report["errors"][:5]:
+            flash(err, "warning")
+        return redirect(url_for("main.products_admin_list"))
+
+    old_id = _bulk_draft_id()
+    session["bulk_draft_id"] = str(draft_id)
+    session.pop("bulk_preview_rows", None)
+    session.modified = True
+    if old_id:
+        drafts.delete_draft(old_id)
+
+    msg = f"{report['staged']} producto(s) listos para revisar"
+    if report["skipped"]:
+        msg += f", {report['skipped']} fila(s) omitidas"
+    if report["with_issues"]:
+        msg += f", {report['with_issues']} con categoría o marca sin resolver"
+    flash(msg + ".", "success" if not report["skipped"] else "warning")
+    for err in report["errors"][:5]:
+        flash(err, "warning")
+    if report["truncated"]:
+        flash(f"Se importaron solo las primeras {report['rows']} filas.", "warning")
+    current_app.logger.info(
+        f"[import] {upload.filename}: {report['rows']} filas, {report['staged']} al borrador, {report['skipped']} omitidas"
+    )
+    return redirect(url_for("main.products_admin_list"))
+
+
+@bp.route("/admin/products/images/import", methods=["GET", "POST"])
+@admin_required
+def products_admin_image_import():
+    """Imágenes en masa desde un ZIP subido o una carpeta del servidor, por SKU."""
+    if request.method == "POST":
+        user_id = getattr(current_user, "id", None) if current_user.is_authenticated else None
+        upload = request.files.get("zip_file")
+        folder = (request.form.get("folder") or "").strip()
+        tmp_dir = None
+        try:
+            if upload and upload.filename:
+                if not upload.filename.lower().endswith(".zip"):
+                    raise image_import.ImageImportError("Subí un archivo .zip.")
+                tmp_dir = tempfile.mkdtemp(prefix="image-import-")
+                zip_path = os.path.join(tmp_dir, "upload.zip")
+                upload.save(zip_path)
+                job_id = image_import.start_job("zip", zip_path, upload.filename, user_id=user_id, cleanup=True)
+            elif folder:
+                job_id = image_import.start_job("folder", image_import.resolve_folder(folder), f"carpeta: {folder}", user_id=user_id)
+            else:
+                raise image_import.ImageImportError("Elegí un ZIP o indicá una carpeta.")
+        except image_import.ImageImportError as exc:
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            flash(str(exc), "warning")
+            return redirect(url_for("main.products_admin_image_import"))
+        flash("Importación iniciada; el avance se actualiza solo.", "info")
+        return redirect(url_for("main.products_admin_image_import", job=job_id))
+
+    jobs = ImageImportJob.query.order_by(ImageImportJob.created_at.desc()).limit(10).all()
+    return render_template(
+        "admin/image_import.html",
+        jobs=jobs,
+        active_job=request.args.get("job") or "",
+        folder_enabled=bool(current_app.config.get("IMAGE_IMPORT_ROOT")),
+        max_gallery_images=MAX_GALLERY_IMAGES,
+    )
+
+
+@bp.route("/admin/products/images/import/<uuid:job_id>")
+@admin_required
+def products_admin_image_import_status(job_id):
+    job = db.session.get(ImageImportJob, job_id)
+    if job is None:
+        return jsonify(success=False, message="No existe el trabajo."), 404
+    return jsonify(success=True, job=image_import.job_status(job))
+
+
 @bp.route("/admin/products/bulk/preview/<int:row_index>/edit", methods=["GET", "POST"])
 @admin_required
 def products_admin_preview_edit(row_index):
-    rows = _get_bulk_preview_rows()
-    if not rows or row_index < 0 or row_index >= len(rows):
+    current = _get_bulk_preview_row(row_index) if row_index >= 0 else None
+    if current is None:
         flash("No se encontró la fila a editar.", "warning")
         return redirect(url_for("main.products_admin_list"))
 
-    current = rows[row_index]
     if request.method == "POST":
         remove_token = request.form.get("remove_gallery_token")
         clear_gallery = request.form.get("clear_gallery")
@@ -1418,8 +1257,7 @@ def products_admin_preview_edit(row_index):
             limited_gallery = gallery_list[:MAX_GALLERY_IMAGES]
             current["gallery_images"] = limited_gallery
             current["image_filename"] = limited_gallery[0] if limited_gallery else None
-            rows[row_index] = current
-            _set_bulk_preview_rows(rows)
+            _set_bulk_preview_row(row_index, current)
             return redirect(request.url)
         name = (request.form.get("name") or "").strip()
         if not name:
@@ -1481,8 +1319,7 @@ def products_admin_preview_edit(row_index):
         limited_gallery = existing_gallery[:MAX_GALLERY_IMAGES]
         updated_row["gallery_images"] = limited_gallery
         updated_row["image_filename"] = limited_gallery[0] if limited_gallery else current.get("image_filename")
-        rows[row_index] = updated_row
-        _set_bulk_preview_rows(rows)
+        _set_bulk_preview_row(row_index, updated_row)
         flash("Borrador actualizado.", "success")
         return redirect(url_for("main.products_admin_list"))
 
@@ -1535,8 +1372,8 @@ def products_admin_preview_edit(row_index):
 @bp.route("/admin/products/bulk/preview/<int:row_index>/gallery-reorder", methods=["POST"])
 @admin_required
 def products_preview_gallery_reorder(row_index):
-    rows = _get_bulk_preview_rows()
-    if not rows or row_index < 0 or row_index >= len(rows):
+    row = _get_bulk_preview_row(row_index) if row_index >= 0 else None
+    if row is None:
         return jsonify(success=False, message="Borrador no encontrado."), 404
 
     data = request.get_json(silent=True) or {}
@@ -1544,7 +1381,6 @@ def products_preview_gallery_reorder(row_index):
     if not isinstance(order, list) or not order:
         return jsonify(success=False, message="Orden inválido."), 400
 
-    row = rows[row_index]
     gallery_list = list(row.get("gallery_images") or [])
     if not gallery_list and row.get("image_filename"):
         gallery_list.append(row.get("image_filename"))
@@ -1564,8 +1400,7 @@ def products_preview_gallery_reorder(row_index):
 
     row["gallery_images"] = new_gallery[:MAX_GALLERY_IMAGES]
     row["image_filename"] = row["gallery_images"][0] if row["gallery_images"] else None
-    rows[row_index] = row
-    _set_bulk_preview_rows(rows)
+    _set_bulk_preview_row(row_index, row)
     return jsonify(success=True, message="Orden actualizado."), 200
 
 
@@ -1656,7 +1491,8 @@ def products_admin_bulk_delete():
 @bp.route("/admin/products/inline-update", methods=["POST"])
 @admin_required
 def products_admin_inline_update():
-    # Actualiza varios productos desde la tabla editable sin salir de la página
+    """Agrega a la galería las imágenes elegidas en la grilla. Los demás campos se guardan
+    por fila con el PATCH de products_admin_inline_patch, que controla la versión."""
     q = (request.form.get("q") or "").strip()
     category_id_raw = request.form.get("category_id") or None
     brand_id_raw = request.form.get("brand_id") or None
@@ -1674,102 +1510,41 @@ def products_admin_inline_update():
     except ValueError:
         page = 1
 
-    updated = 0
-
-    # Implementación: iterar por productos visibles en la página
-    search_q = Product.query
-    if category_id_raw:
-        try:
-            cid = uuid.UUID(category_id_raw)
-            search_q = search_q.filter(Product.category_id == cid)
-        except Exception:
-            pass
-    if brand_id_raw:
-        try:
-            bid = uuid.UUID(brand_id_raw)
-            search_q = search_q.filter(Product.brand_id == bid)
-        except Exception:
-            pass
-    if q:
-        tokens = [t for t in q.split() if t]
-        for tok in tokens:
-            like = f"%{tok}%"
-            search_q = search_q.filter(
-                or_(
-                    Product.name.ilike(like),
-                    Product.short_desc.ilike(like),
-                    Product.long_desc.ilike(like),
-                    Product.sku.ilike(like),
-                )
-            )
-
-    search_q = search_q.order_by(Product.created_at.desc())
-    page_products = search_q.offset((page - 1) * per_page).limit(per_page).all()
-
-    for p in page_products:
-        prefix = f"items[{p.id}]"
-        name = (request.form.get(f"{prefix}[name]") or "").strip()
-        sku = (request.form.get(f"{prefix}[sku]") or "").strip() or None
-        price_raw = (request.form.get(f"{prefix}[price]") or "").strip()
-        in_stock = bool(request.form.get(f"{prefix}[in_stock]"))
-        brand_raw = request.form.get(f"{prefix}[brand_id]") or None
-        category_raw = request.form.get(f"{prefix}[category_id]") or None
-        new_images = request.files.getlist(f"images_{p.id}[]")
-
-        if not name:
+    # Solo los productos que traen archivos: images_<uuid>[]
+    uploads = {}
+    for key in request.files:
+        if not (key.startswith("images_") and key.endswith("[]")):
             continue
+        pid = _safe_uuid(key[len("images_"):-2])
+        files = [f for f in request.files.getlist(key) if f and f.filename]
+        if pid is not None and files:
+            uploads[pid] = files
 
-        p.name = name
-        p.sku = sku
-
-        if price_raw:
-            price_clean = price_raw.replace('.', '').replace(',', '.')
-            try:
-                p.price = Decimal(price_clean)
-            except (InvalidOperation, AttributeError):
-                p.price = None
-        else:
-            p.price = None
-
-        p.in_stock = in_stock
-
-        try:
-            p.brand_id = uuid.UUID(brand_raw) if brand_raw else None
-        except Exception:
-            p.brand_id = None
-        try:
-            p.category_id = uuid.UUID(category_raw) if category_raw else None
-        except Exception:
-            p.category_id = None
-
-        # Agregar nuevas imágenes hasta un máximo de 10 por producto
-        existing_count = 0
-        if p.image_filename:
-            existing_count += 1
-        existing_count += len(p.images)
-
-        next_position = (p.images[-1].position + 1) if p.images else 1
-
-        for image_file in new_images:
-            if not image_file or not image_file.filename:
-                continue
-            if existing_count >= 10:
-                break
-            filename = _save_product_image(image_file)
-            if not filename:
-                continue
-            pi = ProductImage(product_id=p.id, filename=filename, position=next_position)
-            db.session.add(pi)
-            existing_count += 1
-            next_position += 1
-
-        updated += 1
+    updated = 0
+    if uploads:
+        for p in Product.query.filter(Product.id.in_(list(uploads))).all():
+            # Hasta MAX_GALLERY_IMAGES por producto, contando la principal
+            existing_count = (1 if p.image_filename else 0) + len(p.images)
+            next_position = (p.images[-1].position + 1) if p.images else 1
+            added = 0
+            for image_file in uploads[p.id]:
+                if existing_count >= MAX_GALLERY_IMAGES:
+                    break
+                filename = _save_product_image(image_file)
+                if not filename:
+                    continue
+                db.session.add(ProductImage(product_id=p.id, filename=filename, position=next_position))
+                existing_count += 1
+                next_position += 1
+                added += 1
+            if added:
+                updated += 1
 
     if updated:
         db.session.commit()
-        flash(f"Se actualizaron {updated} producto(s)", "success")
+        flash(f"Se agregaron imágenes a {updated} producto(s)", "success")
     else:
-        flash("No se aplicaron cambios.", "info")
+        flash("No se eligieron imágenes.", "info")
 
     return redirect(url_for(
         "main.products_admin_list",
@@ -1781,6 +1556,207 @@ def products_admin_inline_update():
     ))
 
 
+# Campos editables desde la grilla y su validación (valor crudo -> valor de columna)
+_INLINE_PATCH_FIELDS = ("name", "sku", "price", "in_stock", "brand_id", "category_id")
+
+
+def _clean_inline_field(field, raw):
+    """Devuelve (valor, error). Los strings vacíos en campos opcionales quedan en None."""
+    if field == "name":
+        val = str(raw or "").strip()
+        if not val:
+            return None, "El nombre es obligatorio."
+        if len(val) > 200:
+            return None, "El nombre supera los 200 caracteres."
+        return val, None
+    if field == "sku":
+        val = str(raw or "").strip() or None
+        if val and len(val) > 64:
+            return None, "El SKU supera los 64 caracteres."
+        return val, None
+    if field == "price":
+        raw_s = str(raw if raw is not None else "").strip()
+        if not raw_s:
+            return None, None
+        val = _parse_decimal(raw_s)
+        if val is None or val < 0 or val >= Decimal("10000000000"):
+            return None, "Precio inválido."
+        return val.quantize(Decimal("0.01")), None
+    if field == "in_stock":
+        if isinstance(raw, bool):
+            return raw, None
+        return str(raw).strip().lower() in {"1", "true", "on", "si", "sí"}, None
+    if field in ("brand_id", "category_id"):
+        if raw in (None, ""):
+            return None, None
+        val = _safe_uuid(str(raw))
+        if val is None:
+            return None, "Identificador inválido."
+        return val, None
+    return None, "Campo no editable."
+
+
+def _version_token(dt):
+    return dt.isoformat() if dt else ""
+
+
+def _same_version(token, dt):
+    """Compara la versión enviada por el cliente con updated_at (por instante, no por texto)."""
+    if not token or dt is None:
+        return not token and dt is None
+    try:
+        sent = datetime.fromisoformat(str(token))
+    except ValueError:
+        return False
+    if sent.tzinfo is None:
+        sent = sent.replace(tzinfo=timezone.utc)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return sent == dt
+
+
+@bp.route("/admin/products/sku-check", methods=["POST"])
+@admin_required
+def products_admin_sku_check():
+    """Verifica SKUs antes de crear productos, con una sola consulta indexada.
+
+    Body: {"skus": [...], "exclude_id": uuid opcional} o {"draft": true} para revisar el
+    borrador de carga masiva completo. Responde los SKUs que ya existen, los repetidos
+    dentro del lote y, para el borrador, las filas en conflicto con su página."""
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get("draft"):
+            draft_id = _bulk_draft_id()
+            if not draft_id:
+                return jsonify(success=False, message="No hay borrador activo."), 404
+            result = product_import.draft_sku_conflicts(draft_id)
+            rows = {}
+            for idx, info in result.pop("rows").items():
+                info["page"] = info.pop("position") // BULK_PREVIEW_PAGE_SIZE + 1
+                rows[str(idx)] = info
+            result["rows"] = rows
+            result["pages"] = sorted({info["page"] for info in rows.values()})
+        else:
+            skus = data.get("skus")
+            if not isinstance(skus, list):
+                return jsonify(success=False, message="Falta la lista de SKUs."), 400
+            result = product_import.find_sku_conflicts(
+                [str(s) for s in skus if s is not None], exclude_id=_safe_uuid(str(data.get("exclude_id") or ""))
+            )
+    except ValueError as exc:
+        return jsonify(success=False, message=str(exc)), 400
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.warning(f"[sku-check] falló la verificación: {exc}")
+        return jsonify(success=False, message="No se pudo verificar los SKUs."), 500
+    return jsonify(success=True, **result)
+
+
+@bp.route("/admin/products/inline-patch", methods=["PATCH", "POST"])
+@admin_required
+def products_admin_inline_patch():
+    """Aplica solo los campos modificados en la grilla.
+
+    Body: {"changes": [{"id": uuid, "version": updated_at iso, "fields": {campo: valor}}]}.
+    Los productos cuya versión no coincide no se tocan y vuelven en "conflicts" con sus
+    valores actuales; el resto se actualiza en una transacción con un UPDATE por lote
+    (executemany) por cada combinación de campos."""
+
+    data = request.get_json(silent=True) or {}
+    changes = data.get("changes")
+    if not isinstance(changes, list) or not changes:
+        return jsonify(success=False, message="No hay cambios para aplicar."), 400
+    if len(changes) > 500:
+        return jsonify(success=False, message="Demasiados cambios en un solo envío."), 400
+
+    errors = []
+    wanted = {}
+    for change in changes:
+        pid = _safe_uuid(str((change or {}).get("id") or ""))
+        fields = (change or {}).get("fields")
+        if pid is None or not isinstance(fields, dict) or not fields:
+            errors.append({"id": (change or {}).get("id"), "field": None, "message": "Cambio inválido."})
+            continue
+        cleaned = {}
+        for field, raw in fields.items():
+            if field not in _INLINE_PATCH_FIELDS:
+                errors.append({"id": str(pid), "field": field, "message": "Campo no editable."})
+                continue
+            val, err = _clean_inline_field(field, raw)
+            if err:
+                errors.append({"id": str(pid), "field": field, "message": err})
+                continue
+            cleaned[field] = val
+        if cleaned:
+            wanted[pid] = {"version": change.get("version"), "fields": cleaned}
+
+    # Marcas y categorías referenciadas: una consulta por tabla
+    brand_ids = {c["fields"]["brand_id"] for c in wanted.values() if c["fields"].get("brand_id")}
+    cat_ids = {c["fields"]["category_id"] for c in wanted.values() if c["fields"].get("category_id")}
+    known_brands = {r[0] for r in db.session.query(Brand.id).filter(Brand.id.in_(brand_ids))} if brand_ids else set()
+    known_cats = {r[0] for r in db.session.query(Category.id).filter(Category.id.in_(cat_ids))} if cat_ids else set()
+    for pid, change in list(wanted.items()):
+        f = change["fields"]
+        for field, known in (("brand_id", known_brands), ("category_id", known_cats)):
+            if f.get(field) and f[field] not in known:
+                errors.append({"id": str(pid), "field": field, "message": "No existe."})
+                f.pop(field)
+        if not f:
+            wanted.pop(pid)
+
+    updated, conflicts = [], []
+    if wanted:
+        try:
+            current = {
+                row.id: row
+                for row in db.session.query(
+                    Product.id, Product.updated_at, Product.name, Product.sku, Product.price,
+                    Product.in_stock, Product.brand_id, Product.category_id,
+                )
+                .filter(Product.id.in_(list(wanted.keys())))
+                .with_for_update()
+            }
+            now = datetime.now(timezone.utc)
+            groups = {}
+            for pid, change in wanted.items():
+                row = current.get(pid)
+                if row is None:
+                    errors.append({"id": str(pid), "field": None, "message": "Producto no encontrado."})
+                    continue
+                if not _same_version(change["version"], row.updated_at):
+                    conflicts.append({
+                        "id": str(pid),
+                        "version": _version_token(row.updated_at),
+                        "current": {
+                            "name": row.name,
+                            "sku": row.sku or "",
+                            # Mismo formato que muestra la grilla (1.234,50): vuelve tal cual en el próximo PATCH
+                            "price": current_app.jinja_env.filters["ar_number"](row.price) if row.price is not None else "",
+                            "in_stock": bool(row.in_stock),
+                            "brand_id": str(row.brand_id) if row.brand_id else "",
+                            "category_id": str(row.category_id) if row.category_id else "",
+                        },
+                    })
+                    continue
+                # Solo lo que realmente cambia respecto de la base
+                delta = {k: v for k, v in change["fields"].items() if getattr(row, k) != v}
+                if not delta:
+                    updated.append({"id": str(pid), "version": _version_token(row.updated_at), "fields": []})
+                    continue
+                groups.setdefault(tuple(sorted(delta)), []).append({"id": pid, "updated_at": now, **delta})
+                updated.append({"id": str(pid), "version": _version_token(now), "fields": sorted(delta)})
+            for params in groups.values():
+                db.session.execute(sa_update(Product), params)
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            current_app.logger.warning(f"[inline-patch] fallo aplicando cambios: {exc}")
+            return jsonify(success=False, message="No se pudieron guardar los cambios."), 500
+
+    status = 409 if conflicts and not any(u["fields"] for u in updated) else 200
+    return jsonify(success=not errors and not conflicts, updated=updated, conflicts=conflicts, errors=errors), status
+
+
 def _category_roots_with_children():
     return Category.query.filter_by(parent_id=None).order_by(Category.name).all()
 
@@ -1818,11 +1794,15 @@ def _safe_uuid(val):
         return None
 
 @bp.route('/brands')
+@depends_on("brands")
+@conditional_page
 def brands_public_list():
-    brands = Brand.query.filter_by(visible=True).order_by(Brand.name).all()
+    brands = catalog_cache.brand_list(visible_only=True)
     return render_template('brands_list_public.html', brands=brands)
 
 @bp.route('/marca/<slug>')
+@depends_on("products", "categories", "brands")
+@conditional_page
 def brand_page(slug):
     brand = Brand.query.filter_by(slug=slug, visible=True).first_or_404()
     # filtros similares a categoría pero solo dentro de esta marca
@@ -1845,12 +1825,18 @@ def brand_page(slug):
         page = 1
     qry = Product.query.filter(Product.brand_id==brand.id)
     # Limit categories list to those used by this brand
-    brand_category_ids = [row[0] for row in db.session.query(Product.category_id).filter(Product.brand_id==brand.id, Product.category_id.isnot(None)).distinct().all()]
+    brand_category_ids = catalog_engine.facet_ids("category", brand_id=brand.id) if catalog_engine.enabled() else None
+    if brand_category_ids is not None:
+        brand_category_ids = list(brand_category_ids)
+    else:
+        brand_category_ids = [row[0] for row in db.session.query(Product.category_id).filter(Product.brand_id==brand.id, Product.category_id.isnot(None)).distinct().all()]
+    category_ids = None
     if category_id_raw:
         try:
             cid = uuid.UUID(category_id_raw)
             if cid in brand_category_ids:
                 qry = qry.filter(Product.category_id==cid)
+                category_ids = [cid]
         except Exception:
             pass
     # Stock filter
@@ -1871,15 +1857,18 @@ def brand_page(slug):
             like = f"%{tok}%"
             qry = qry.filter(or_(Product.name.ilike(like), Product.short_desc.ilike(like), Product.long_desc.ilike(like), Product.sku.ilike(like)))
     qry = qry.order_by(Product.created_at.desc())
-    total = qry.count()
-    pages = (total + per_page - 1)//per_page if total else 1
-    if page>pages: page=pages
-    products = qry.offset((page-1)*per_page).limit(per_page).all()
+    products, total, pages, page = _listing_page(
+        qry, page, per_page,
+        category_ids=category_ids, brand_id=brand.id, stock=stock, pmin=pmin, pmax=pmax, q=q,
+    )
     categories = Category.query.filter(Category.id.in_(brand_category_ids)).order_by(Category.name).all()
     breadcrumbs = [("Inicio", url_for('main.index')), ("Marcas", url_for('main.brands_public_list')), (brand.name, None)]
-    return render_template('brand.html', brand=brand, products=products, q=q, category_id=category_id_raw, per_page=per_page, page=page, pages=pages, total=total, categories=categories, stock=stock, pmin=pmin_raw, pmax=pmax_raw, breadcrumbs=breadcrumbs)
+    surrogate.tag(f"brand:{brand.id}")
+    surrogate.tag_products(products)
+    return _render_listing('brand.html', brand=brand, products=products, q=q, category_id=category_id_raw, per_page=per_page, page=page, pages=pages, total=total, categories=categories, stock=stock, pmin=pmin_raw, pmax=pmax_raw, breadcrumbs=breadcrumbs)
 
 @bp.route('/api/products')
+@depends_on("products")
 def api_products_by_ids():
     ids_raw = request.args.get('ids') or ''
     parts = [p for p in ids_raw.split(',') if p]
@@ -1911,6 +1900,111 @@ def api_products_by_ids():
 
     return {"items": [serialize(p) for p in ordered]}
 
+
+@bp.route('/api/v2/products')
+@depends_on("products", "categories", "brands")
+@conditional_page
+def api_products_v2():
+    """Productos en JSON con proyección de campos: por lista de ids (orden respetado) o
+    paginados con los filtros de los listados. Ver product_api."""
+    args = request.args
+    try:
+        fields = product_api.parse_fields(args.get("fields"))
+        if "ids" in args:
+            ids = product_api.parse_ids(args.get("ids"))
+            rows = product_api.by_ids(ids, fields)
+            payload = {"items": product_api.serialize(rows, fields)}
+        else:
+            rows, total, page, per_page = product_api.listing(args, fields)
+            payload = {
+                "items": product_api.serialize(rows, fields),
+                "total": total,
+                "page": page,
+                "per_page": per_page,
+                "pages": max(1, (total + per_page - 1) // per_page),
+            }
+    except product_api.ApiError as exc:
+        return product_api.json_response({"error": str(exc)}, status=400)
+    surrogate.tag_products(rows)
+    return product_api.json_response(payload)
+
+
+@bp.route('/api/suggest')
+@depends_on("products", "categories", "brands")
+def api_suggest():
+    """Autocompletado: productos (nombre/SKU), marcas y categorías que empiezan con lo tipeado."""
+    q = (request.args.get("q") or "").strip()[:100]
+    try:
+        limit = int(request.args.get("limit") or 8)
+    except ValueError:
+        limit = 8
+    resp = product_api.json_response({"q": q, "items": suggest.suggest(q, limit)})
+    if resp.status_code in (200, 304) and not current_user.is_authenticated:
+        resp.cache_control.public = True
+        resp.cache_control.max_age = current_app.config.get("SUGGEST_MAX_AGE", 60)
+    return resp
+
+
+def _token_or_admin(config_key, header):
+    """True si el request trae el token configurado en `config_key` en el header `header` o hay un admin logueado.
+    No se acepta en la query string: quedaría en los logs de acceso y de los proxies."""
+    import hmac
+
+    expected = current_app.config.get(config_key) or ""
+    given = request.headers.get(header) or ""
+    if expected and hmac.compare_digest(given, expected):
+        return True
+    return bool(current_user.is_authenticated and getattr(current_user, "is_admin", False))
+
+
+@bp.route('/_warmup', methods=['GET', 'POST'])
+def internal_warmup():
+    """Precalienta este worker. Requiere WARMUP_TOKEN (header X-Warmup-Token) o sesión admin."""
+    from .warmup import warm_up
+
+    if not _token_or_admin("WARMUP_TOKEN", "X-Warmup-Token"):
+        abort(404)
+    budget = request.args.get("budget_ms", type=float)
+    top_n = request.args.get("top", type=int)
+    report = warm_up(current_app._get_current_object(), budget_ms=budget, top_n=top_n)
+    return jsonify(report)
+
+
+@bp.route('/admin/products/stock-sync', methods=['POST'])
+def products_stock_sync():
+    """Feed de stock/precios por SKU desde el sistema de caja.
+
+    Acepta el cuerpo crudo (text/csv o application/x-ndjson) o un archivo en el campo
+    `file`. Parámetros: format=csv|ndjson, insert=1 (crear SKU desconocidos con nombre),
+    names=1 (actualizar nombres), dry_run=1, chunk. Requiere STOCK_SYNC_TOKEN
+    (header X-Sync-Token) o sesión admin."""
+    from .stock_sync import sync_stream, DEFAULT_CHUNK_SIZE
+
+    if not _token_or_admin("STOCK_SYNC_TOKEN", "X-Sync-Token"):
+        abort(403)
+    upload = request.files.get("file")
+    if upload and upload.filename:
+        stream = upload.stream
+        fmt_guess = "ndjson" if upload.filename.lower().endswith((".ndjson", ".jsonl")) else "csv"
+    else:
+        stream = request.stream
+        fmt_guess = "ndjson" if "ndjson" in (request.mimetype or "") or "jsonl" in (request.mimetype or "") else "csv"
+    fmt = request.args.get("format") or fmt_guess
+    if fmt not in ("csv", "ndjson"):
+        return jsonify(success=False, message="Formato inválido (csv o ndjson)."), 400
+    truthy = {"1", "true", "si", "yes"}
+    report = sync_stream(
+        stream,
+        fmt=fmt,
+        chunk_size=request.args.get("chunk", type=int) or current_app.config.get("STOCK_SYNC_CHUNK", DEFAULT_CHUNK_SIZE),
+        insert_missing=(request.args.get("insert") or "").lower() in truthy,
+        update_names=(request.args.get("names") or "").lower() in truthy,
+        dry_run=(request.args.get("dry_run") or "").lower() in truthy,
+        logger=current_app.logger,
+    )
+    return jsonify(success=not report["errors"], **report)
+
+
 def _send_consulta_email(dest: str, nombre: str, email: str, telefono: str | None, consulta: str, attachments: list[str] | None = None) -> bool:
     """Envía la consulta por SMTP. Devuelve True si se envió, False si falló."""
     import smtplib
@@ -2187,6 +2281,18 @@ def products_admin_new():
                 flash("Precio inválido", "danger")
                 return redirect(url_for("main.products_admin_new"))
 
+        if sku and not request.form.get("allow_sku_conflicts"):
+            existing = product_import.find_sku_conflicts([sku])["existing"].get(sku)
+            if existing:
+                flash(f"El SKU '{sku}' ya lo usa «{existing[0]['name']}». Cambialo o marcá \"Permitir SKU repetido\".", "danger")
+                return redirect(url_for(
+                    "main.products_admin_new",
+                    name=name, sku=sku, price=price_raw,
+                    category_id=request.form.get("category_id") or "",
+                    brand_id=request.form.get("brand_id") or "",
+                    in_stock="1" if in_stock else "0",
+                ))
+
         gallery_files = request.files.getlist("gallery_images")
         gallery_urls = [u.strip() for u in request.form.getlist("gallery_image_urls[]") if u.strip()]
 
@@ -2281,6 +2387,7 @@ def products_admin_new():
         product=prefill,
         form_action=url_for("main.products_admin_new"),
         title="Nuevo producto",
+        allow_sku_override=True,
         max_gallery_images=MAX_GALLERY_IMAGES,
         gallery_context="none",
         gallery_context_id="",
@@ -2627,6 +2734,104 @@ def products_admin_delete(product_id):
     flash("Producto eliminado", "success")
     return redirect(url_for("main.products_admin_list"))
 
+def _reprice_form_state(form):
+    """Lee alcance/operación/redondeo del formulario de reprecio. Devuelve (estado, scope)."""
+    scope_type = form.get("scope_type") or "brand"
+    state = {
+        "scope_type": scope_type,
+        "brand_id": form.get("brand_id") or "",
+        "category_id": form.get("category_id") or "",
+        "q": (form.get("q") or "").strip(),
+        "ids": (form.get("ids") or "").strip(),
+        "operation": form.get("operation") or "percent",
+        "value": (form.get("value") or "").strip(),
+        "rounding": form.get("rounding") or "cent",
+    }
+    scope = {"type": scope_type}
+    if scope_type in ("brand", "filter") and state["brand_id"]:
+        scope["brand_id"] = _safe_uuid(state["brand_id"])
+    if scope_type in ("category", "filter") and state["category_id"]:
+        scope["category_id"] = _safe_uuid(state["category_id"])
+    if scope_type == "filter":
+        scope["q"] = state["q"]
+    if scope_type == "ids":
+        ids, skus = [], []
+        for tok in re.split(r"[\s,;]+", state["ids"]):
+            if not tok:
+                continue
+            as_uuid = _safe_uuid(tok)
+            (ids if as_uuid else skus).append(as_uuid or tok)
+        scope["ids"], scope["skus"] = ids, skus
+    return state, scope
+
+
+def _scope_to_json(scope):
+    return {k: ([str(x) for x in v] if isinstance(v, list) else (str(v) if isinstance(v, uuid.UUID) else v)) for k, v in scope.items()}
+
+
+@bp.route("/admin/products/reprice", methods=["GET", "POST"])
+@admin_required
+def products_admin_reprice():
+    """Reprecio masivo por marca, rama de categorías, búsqueda o lista de productos."""
+    from . import repricing
+
+    state, scope = _reprice_form_state(request.form if request.method == "POST" else request.args)
+    result = None
+    if request.method == "POST":
+        action = request.form.get("action") or "preview"
+        try:
+            value = repricing.parse_value(state["value"])
+            where = repricing.scope_condition(scope, category_ids_for=catalog_cache.category_branch_ids)
+            new_price = repricing.price_expression(state["operation"], value, state["rounding"])
+            if action == "apply":
+                batch = repricing.apply(
+                    where, new_price, _scope_to_json(scope), state["operation"], value, state["rounding"],
+                    user_id=getattr(current_user, "id", None),
+                )
+                flash(f"Se actualizaron {batch.affected} precio(s). Podés revertir este lote.", "success")
+                return redirect(url_for("main.products_admin_reprice"))
+            result = repricing.preview(where, new_price)
+        except repricing.RepriceError as exc:
+            flash(str(exc), "warning")
+        except Exception as exc:
+            db.session.rollback()
+            current_app.logger.warning(f"[reprice] fallo: {exc}")
+            flash("No se pudo calcular el reprecio.", "danger")
+    return render_template(
+        "admin/reprice.html",
+        roots=catalog_cache.nav_categories(),
+        brands=catalog_cache.brand_list(),
+        state=state,
+        result=result,
+        operations=repricing.OPERATIONS,
+        roundings=repricing.ROUNDINGS,
+        last_batch=repricing.last_batch(),
+    )
+
+
+@bp.route("/admin/products/reprice/revert", methods=["POST"])
+@admin_required
+def products_admin_reprice_revert():
+    from . import repricing
+
+    batch = repricing.last_batch()
+    if not batch:
+        flash("No hay lotes de reprecio para revertir.", "info")
+        return redirect(url_for("main.products_admin_reprice"))
+    try:
+        reverted, skipped = repricing.revert(batch)
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.warning(f"[reprice] fallo revirtiendo: {exc}")
+        flash("No se pudo revertir el lote.", "danger")
+        return redirect(url_for("main.products_admin_reprice"))
+    msg = f"Se revirtieron {reverted} precio(s)."
+    if skipped:
+        msg += f" {skipped} se omitieron porque su precio cambió después del lote."
+    flash(msg, "success")
+    return redirect(url_for("main.products_admin_reprice"))
+
+
 @bp.route("/admin/products/<uuid:product_id>/feature", methods=["POST"])
 @admin_required
 def products_admin_feature_toggle(product_id):
@@ -2760,10 +2965,9 @@ def products_gallery_url_upload():
             row_index = int(data.get("row_index", -1))
         except (TypeError, ValueError):
             row_index = -1
-        rows = _get_bulk_preview_rows()
-        if not rows or row_index < 0 or row_index >= len(rows):
+        row = _get_bulk_preview_row(row_index) if row_index >= 0 else None
+        if row is None:
             return jsonify(success=False, message="Borrador no encontrado."), 404
-        row = rows[row_index]
         gallery = list(row.get("gallery_images") or [])
         if not gallery and row.get("image_filename"):
             gallery.append(row.get("image_filename"))
@@ -2779,8 +2983,7 @@ def products_gallery_url_upload():
         gallery = gallery[:MAX_GALLERY_IMAGES]
         row["gallery_images"] = gallery
         row["image_filename"] = gallery[0]
-        rows[row_index] = row
-        _set_bulk_preview_rows(rows)
+        _set_bulk_preview_row(row_index, row)
         remaining = MAX_GALLERY_IMAGES - len(gallery)
         remove_token = _make_gallery_remove_token("session", filename)
         return _build_thumb_response(filename, remaining, "Imagen agregada al borrador.", remove_token)
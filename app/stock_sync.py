@@ -0,0 +1,252 @@
+"""Sincronización de stock y precios desde el sistema de caja, por SKU.
+
+Entrada: CSV con encabezado o NDJSON (un objeto por línea) con sku, price, in_stock y
+opcionalmente name. Se procesa en bloques: por bloque hay una sola consulta
+`WHERE sku IN (...)` (resuelta por ix_products_sku), se comparan los valores y solo se
+actualizan las filas que cambian, con un UPDATE executemany por combinación de campos.
+Cada bloque es una transacción. Los SKU desconocidos se informan y, si se pide, se
+crean como productos nuevos cuando traen nombre.
+
+Como sku no es único (d4e5f6a7b8c9_remove_unique_sku), un SKU repetido en la base
+actualiza todas sus filas y se informa como ambiguo.
+"""
+import csv
+import io
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from sqlalchemy import insert, select, update
+
+from . import db
+from .models import Product
+
+DEFAULT_CHUNK_SIZE = 1000
+_REPORT_SKU_LIMIT = 500
+_TRUE = {"1", "true", "t", "si", "sí", "s", "yes", "y", "x"}
+_FALSE = {"0", "false", "f", "no", "n", ""}
+
+
+def parse_price(raw):
+    """Acepta 1234.5, 1234,50 y 1.234,56. Devuelve Decimal(2) o None si viene vacío.
+    Lanza ValueError si no es un número."""
+    if raw is None:
+        return None
+    if isinstance(raw, (int, float, Decimal)):
+        val = Decimal(str(raw))
+    else:
+        text = str(raw).strip().replace("$", "").replace(" ", "")
+        if not text:
+            return None
+        if "," in text:
+            text = text.replace(".", "").replace(",", ".")
+        try:
+            val = Decimal(text)
+        except InvalidOperation:
+            raise ValueError(f"precio inválido: {raw!r}")
+    if val < 0:
+        raise ValueError(f"precio negativo: {raw!r}")
+    return val.quantize(Decimal("0.01"))
+
+
+def parse_in_stock(raw):
+    """Booleano desde sí/no/1/0 o una cantidad (>0 = en stock). None si no viene."""
+    if raw is None:
+        return None
+    if isinstance(raw, bool):
+        return raw
+    if isinstance(raw, (int, float, Decimal)):
+        return raw > 0
+    text = str(raw).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    try:
+        return Decimal(text.replace(",", ".")) > 0
+    except InvalidOperation:
+        raise ValueError(f"stock inválido: {raw!r}")
+
+
+def iter_records(stream, fmt="csv"):
+    """Itera dicts crudos desde un stream de texto o bytes (CSV o NDJSON)."""
+    if isinstance(stream, (io.BufferedIOBase, io.RawIOBase)) or hasattr(stream, "readinto"):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "ndjson":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+        return
+    sample = stream.read(4096)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    if stream.seekable():
+        stream.seek(0)
+        lines = stream
+    else:
+        # La muestra suele cortar una línea a la mitad: se completa antes de encadenar
+        if sample and not sample.endswith(("\n", "\r")):
+            sample += stream.readline()
+        lines = _chain_text(sample, stream)
+    reader = csv.DictReader(lines, dialect=dialect)
+    for row in reader:
+        yield {(k or "").strip().lower(): v for k, v in row.items()}
+
+
+def _chain_text(head, stream):
+    yield from io.StringIO(head, newline="")
+    yield from stream
+
+
+def normalize(record):
+    """(sku, {campo: valor}) con solo los campos presentes. Lanza ValueError si es inválido."""
+    sku = str(record.get("sku") or record.get("codigo") or "").strip()
+    if not sku:
+        raise ValueError("falta sku")
+    if len(sku) > 64:
+        raise ValueError(f"sku demasiado largo: {sku[:20]}…")
+    fields = {}
+    price = parse_price(record.get("price", record.get("precio")))
+    if price is not None:  # vacío = sin cambios de precio
+        fields["price"] = price
+    in_stock = parse_in_stock(record.get("in_stock", record.get("stock")))
+    if in_stock is not None:
+        fields["in_stock"] = in_stock
+    name = str(record.get("name") or record.get("nombre") or "").strip()
+    if name:
+        fields["name"] = name[:200]
+    return sku, fields
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        block = list(islice(it, size))
+        if not block:
+            return
+        yield block
+
+
+def _apply_chunk(block, report, insert_missing, update_names, dry_run):
+    # Último valor gana si el mismo SKU aparece dos veces en el bloque
+    wanted = {}
+    for sku, fields in block:
+        wanted.setdefault(sku, {}).update(fields)
+
+    rows = db.session.execute(
+        select(Product.id, Product.sku, Product.name, Product.price, Product.in_stock)
+        .where(Product.sku.in_(list(wanted)))
+    ).all()
+    by_sku = {}
+    for row in rows:
+        by_sku.setdefault(row.sku, []).append(row)
+
+    now = datetime.now(timezone.utc)
+    groups = {}
+    to_insert = []
+    for sku, fields in wanted.items():
+        matches = by_sku.get(sku)
+        if not matches:
+            if insert_missing and fields.get("name"):
+                to_insert.append({
+                    "id": uuid.uuid4(),
+                    "sku": sku,
+                    "name": fields["name"],
+                    "price": fields.get("price"),
+                    "in_stock": fields.get("in_stock", True),
+                    "created_at": now,
+                    "updated_at": now,
+                })
+            else:
+                report["unmatched"] += 1
+                if len(report["unmatched_skus"]) < _REPORT_SKU_LIMIT:
+                    report["unmatched_skus"].append(sku)
+            continue
+        if len(matches) > 1 and len(report["ambiguous_skus"]) < _REPORT_SKU_LIMIT:
+            report["ambiguous_skus"].append(sku)
+        report["matched"] += len(matches)
+        for row in matches:
+            delta = {}
+            for key, val in fields.items():
+                if key == "name" and not update_names:
+                    continue
+                if getattr(row, key) != val:
+                    delta[key] = val
+            if not delta:
+                report["unchanged"] += 1
+                continue
+            groups.setdefault(tuple(sorted(delta)), []).append({"id": row.id, "updated_at": now, **delta})
+
+    if dry_run:
+        report["updated"] += sum(len(v) for v in groups.values())
+        report["inserted"] += len(to_insert)
+        db.session.rollback()
+        return
+    for params in groups.values():
+        db.session.execute(update(Product), params)
+        report["updated"] += len(params)
+    if to_insert:
+        db.session.execute(insert(Product), to_insert)
+        report["inserted"] += len(to_insert)
+    db.session.commit()
+
+
+def sync_records(records, chunk_size=DEFAULT_CHUNK_SIZE, insert_missing=False, update_names=False, dry_run=False, logger=None):
+    """Aplica registros crudos (dicts) por bloques y devuelve un reporte dict."""
+    report = {
+        "dry_run": dry_run,
+        "rows": 0,
+        "chunks": 0,
+        "matched": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "inserted": 0,
+        "unmatched": 0,
+        "invalid": 0,
+        "unmatched_skus": [],
+        "ambiguous_skus": [],
+        "errors": [],
+        "elapsed_ms": 0.0,
+        "rows_per_s": 0.0,
+    }
+    t0 = time.perf_counter()
+
+    def normalized():
+        for line_no, record in enumerate(records, start=1):
+            report["rows"] += 1
+            try:
+                yield normalize(record)
+            except (ValueError, TypeError, AttributeError) as exc:
+                report["invalid"] += 1
+                if len(report["errors"]) < _REPORT_SKU_LIMIT:
+                    report["errors"].append(f"fila {line_no}: {exc}")
+
+    for block in _chunks(normalized(), max(1, chunk_size)):
+        report["chunks"] += 1
+        try:
+            _apply_chunk(block, report, insert_missing, update_names, dry_run)
+        except Exception as exc:
+            db.session.rollback()
+            report["errors"].append(f"bloque {report['chunks']}: {exc}")
+            if logger:
+                logger.warning(f"[stock-sync] bloque {report['chunks']} falló: {exc}")
+
+    elapsed = time.perf_counter() - t0
+    report["elapsed_ms"] = round(elapsed * 1000, 1)
+    report["rows_per_s"] = round(report["rows"] / elapsed, 1) if elapsed > 0 else 0.0
+    if logger:
+        logger.info(
+            f"[stock-sync] {report['rows']} filas, {report['updated']} actualizadas, {report['inserted']} nuevas, "
+            f"{report['unchanged']} sin cambios, {report['unmatched']} SKU desconocidos en {report['elapsed_ms']:.0f} ms"
+        )
+    return report
+
+
+def sync_stream(stream, fmt="csv", **kwargs):
+    return sync_records(iter_records(stream, fmt), **kwargs)
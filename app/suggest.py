@@ -0,0 +1,261 @@
+"""Índice de prefijos por worker para el autocompletado (/api/suggest?q=).
+
+Indexa nombre y SKU de productos, nombres de marcas y de categorías, sin acentos y en
+minúsculas. Es un arreglo ordenado de términos (interned) con las postings en un
+array('I') de índices de documento; una consulta es un bisect por el rango de prefijos
+del último token y la intersección con los demás.
+
+Se arma con una consulta de columnas (sin long_desc ni ORM). Cuando catalog_versions
+avisa un cambio de productos se traen solo las filas con updated_at posterior a la
+última vista, menos CATALOG_REFRESH_LOOKBACK_SECONDS, y las lápidas de deleted_records;
+se reordena en memoria. Releer es idempotente y el margen cubre a quien sella
+updated_at al empezar la transacción y commitea después del refresco. Marcas y
+categorías salen de catalog_cache. El orden es por popularidad: vistas de la ficha
+contadas en este worker, más destacados y con stock primero.
+"""
+import heapq
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import timedelta
+
+from flask import current_app, url_for
+from sqlalchemy import inspect as sa_inspect, select
+
+from . import db, catalog_cache, catalog_versions
+
+MIN_CHARS = 2
+MAX_LIMIT = 20
+# Términos del rango de un prefijo que se recorren como máximo (prefijos de 2 letras)
+MAX_PREFIX_TERMS = 4000
+_KIND_BONUS = {"category": 6.0, "brand": 4.0, "product": 0.0}
+
+_lock = threading.Lock()
+_views = Counter()
+_state = {
+    "docs": {},  # (kind, id) -> (label, términos, puntaje base)
+    "index": None,  # (términos, offsets, postings, claves de docs, docs)
+    "watermark": None,  # max(updated_at) de productos ya indexados
+    "deleted_watermark": None,
+    "dirty": set(),
+}
+
+
+def fold(text):
+    """Minúsculas sin acentos, con todo lo que no es letra o dígito como espacio."""
+    text = unicodedata.normalize("NFKD", text or "")
+    out = []
+    for ch in text:
+        if unicodedata.combining(ch):
+            continue
+        out.append(ch.lower() if ch.isalnum() else " ")
+    return "".join(out)
+
+
+def _terms(*texts):
+    terms = set()
+    for text in texts:
+        folded = fold(text)
+        words = folded.split()
+        terms.update(words)
+        if len(words) > 1:
+            # "abc-123" también se encuentra como "abc123"
+            terms.add("".join(words))
+    return tuple(sys.intern(t) for t in sorted(terms))
+
+
+def _product_doc(row):
+    score = (2.0 if row.featured else 0.0) + (1.0 if row.in_stock else 0.0)
+    return sys.intern(row.name or ""), _terms(row.name, row.sku), score
+
+
+# --- Construcción -------------------------------------------------------------------
+
+def _lookback(mark):
+    """Marca de agua menos el margen de relectura (None = desde el principio)."""
+    if mark is None:
+        return None
+    return mark - timedelta(seconds=current_app.config.get("CATALOG_REFRESH_LOOKBACK_SECONDS", 300))
+
+
+def _product_rows(since=None):
+    from .models import Product
+
+    stmt = select(Product.id, Product.name, Product.sku, Product.featured, Product.in_stock, Product.updated_at)
+    if since is not None:
+        stmt = stmt.where(Product.updated_at >= since)
+    return db.session.execute(stmt).all()
+
+
+def _load_products(docs, rows):
+    latest = _state["watermark"]
+    for row in rows:
+        docs[("product", row.id)] = _product_doc(row)
+        if row.updated_at is not None and (latest is None or row.updated_at > latest):
+            latest = row.updated_at
+    _state["watermark"] = latest
+
+
+def _drop_deleted(docs, touched):
+    """Quita los productos con lápida posterior a la última vista (con el margen), salvo
+    los que volvieron a escribirse después (touched: id -> updated_at de las filas recién
+    leídas). False si no hay tabla."""
+    from .models import DeletedRecord
+
+    if not sa_inspect(db.engine).has_table(DeletedRecord.__tablename__):
+        return False
+    stmt = select(DeletedRecord.record_id, DeletedRecord.deleted_at).where(DeletedRecord.table_name == "products")
+    since = _state["deleted_watermark"]
+    if since is not None:
+        stmt = stmt.where(DeletedRecord.deleted_at >= _lookback(since))
+    for record_id, deleted_at in db.session.execute(stmt):
+        written = touched.get(record_id)
+        if written is None or written < deleted_at:
+            docs.pop(("product", record_id), None)
+        if since is None or deleted_at > since:
+            since = deleted_at
+    _state["deleted_watermark"] = since
+    return True
+
+
+def _load_taxonomy(docs):
+    for key in [k for k in docs if k[0] != "product"]:
+        del docs[key]
+    for node in catalog_cache.category_tree()["by_id"].values():
+        docs[("category", node.id)] = (sys.intern(node.name), _terms(node.name), 0.0)
+    for b in catalog_cache.brand_list(visible_only=True):
+        docs[("brand", b.id)] = (sys.intern(b.name), _terms(b.name), 0.0)
+
+
+def _compile(docs):
+    keys = list(docs)
+    postings = {}
+    for i, key in enumerate(keys):
+        for term in docs[key][1]:
+            postings.setdefault(term, []).append(i)
+    terms = sorted(postings)
+    offsets = array("I", [0])
+    flat = array("I")
+    for term in terms:
+        flat.extend(postings[term])
+        offsets.append(len(flat))
+    return terms, offsets, flat, keys, docs
+
+
+def _refresh():
+    """Arma el índice la primera vez y después aplica solo lo que cambió."""
+    with _lock:
+        dirty = _state["dirty"]
+        if _state["index"] is not None and not dirty:
+            return
+        _state["dirty"] = set()
+        docs = dict(_state["docs"])
+        t0 = time.perf_counter()
+        try:
+            full = _state["index"] is None
+            if full:
+                docs = {}
+                _state["watermark"] = _state["deleted_watermark"] = None
+                rows = _product_rows()
+                _load_products(docs, rows)
+                _drop_deleted(docs, {r.id: r.updated_at for r in rows})  # fija la marca de agua
+                _load_taxonomy(docs)
+            else:
+                if "products" in dirty:
+                    rows = _product_rows(since=_lookback(_state["watermark"]))
+                    _load_products(docs, rows)
+                    if not _drop_deleted(docs, {r.id: r.updated_at for r in rows}):
+                        # Sin lápidas no hay forma de ver los borrados: se rearma
+                        docs = {}
+                        _state["watermark"] = None
+                        _load_products(docs, _product_rows())
+                if dirty & {"categories", "brands"}:
+                    _load_taxonomy(docs)
+        except Exception as exc:
+            current_app.logger.warning(f"[suggest] no se pudo actualizar el índice: {exc}")
+            db.session.rollback()
+            if _state["index"] is None:
+                raise
+            _state["dirty"] |= dirty
+            return
+        _state["docs"] = docs
+        _state["index"] = _compile(docs)
+        current_app.logger.debug(
+            f"[suggest] índice {'completo' if full else 'incremental'}: {len(docs)} docs en {(time.perf_counter() - t0) * 1000:.0f} ms"
+        )
+
+
+def warm():
+    """Arma el índice ya (precarga en el master de gunicorn)."""
+    _refresh()
+
+
+def _on_catalog_change(namespaces):
+    _state["dirty"] |= set(namespaces) & {"products", "categories", "brands"}
+
+
+catalog_versions.subscribe(_on_catalog_change)
+
+
+def record_view(product_id):
+    """Cuenta una vista de la ficha para el orden de las sugerencias."""
+    _views[product_id] += 1
+    if len(_views) > 50000:
+        top = _views.most_common(25000)
+        _views.clear()
+        _views.update(dict(top))
+
+
+# --- Consulta -----------------------------------------------------------------------
+
+def _matches(terms, offsets, postings, prefix):
+    lo = bisect_left(terms, prefix)
+    hi = bisect_left(terms, prefix + "\uffff", lo)
+    found = set()
+    for i in range(lo, min(hi, lo + MAX_PREFIX_TERMS)):
+        found.update(postings[offsets[i]:offsets[i + 1]])
+    return found
+
+
+def suggest(q, limit=8):
+    """[{type, id, label, url}] para el texto `q` (cada palabra como prefijo)."""
+    tokens = fold(q).split()
+    if not tokens or len("".join(tokens)) < MIN_CHARS:
+        return []
+    _refresh()
+    terms, offsets, postings, keys, docs = _state["index"]
+    found = None
+    # La palabra más larga primero: es la que menos candidatos trae
+    for token in sorted(set(tokens), key=len, reverse=True):
+        hits = _matches(terms, offsets, postings, token)
+        found = hits if found is None else found & hits
+        if not found:
+            return []
+
+    def rank(i):
+        kind, obj_id = keys[i]
+        label, _, score = docs[keys[i]]
+        return (-(score + _KIND_BONUS[kind] + _views.get(obj_id, 0)), len(label), label)
+
+    out = []
+    for i in heapq.nsmallest(max(1, min(limit, MAX_LIMIT)), found, key=rank):
+        kind, obj_id = keys[i]
+        label = docs[keys[i]][0]
+        out.append({"type": kind, "id": str(obj_id), "label": label, "url": _url(kind, obj_id)})
+    return out
+
+
+def _url(kind, obj_id):
+    if kind == "product":
+        return url_for("main.product_detail", product_id=obj_id)
+    if kind == "category":
+        node = catalog_cache.category_tree()["by_id"].get(obj_id)
+        return url_for("main.category_page", slug=node.slug) if node else None
+    for b in catalog_cache.brand_list():
+        if b.id == obj_id:
+            return url_for("main.brand_page", slug=b.slug)
+    return None
@@ -0,0 +1,286 @@
+"""Surrogate keys para un proxy con cache delante de la app (Fastly, Varnish xkey, etc.).
+
+Cada respuesta pública lleva en SURROGATE_KEY_HEADER las claves de lo que muestra:
+los namespaces de catalog_versions de la vista (products, categories, brands, slides,
+siteinfo, homepage) y claves por entidad que agrega la vista (product:<id>,
+category:<id>, brand:<id>, search).
+
+Al commitear cambios del catálogo se arma la lista de claves afectadas y se la pasa al
+purgador configurado en SURROGATE_PURGER:
+  - "none" (default) no hace nada;
+  - "log" la escribe en el log;
+  - "file" agrega una línea JSON a SURROGATE_PURGE_FILE (pruebas / un proceso que la lea);
+  - "http" manda PURGE a SURROGATE_PURGE_URL con las claves en SURROGATE_PURGE_HEADER.
+Otros se registran con register_purger(nombre, fn(keys, config)).
+"""
+import json
+import os
+import threading
+import time
+import urllib.request
+
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import event, inspect as sa_inspect, select
+from sqlalchemy.orm import Session
+
+from .models import Brand, Category, Product, ProductImage, SiteInfo, Slide
+
+# Máximo de ids que se leen para purgar por producto un UPDATE/DELETE masivo; por encima
+# se purga la clave "products" entera
+BULK_ID_LIMIT = 500
+# Los proxies limitan el tamaño del header (Fastly: 16 KB)
+MAX_HEADER_BYTES = 16000
+_PURGE_BATCH = 200
+_SEARCH_FIELDS = {"name", "sku", "short_desc", "long_desc", "price", "in_stock", "category_id", "brand_id"}
+
+_purgers = {}
+
+
+# --- Etiquetado de respuestas -------------------------------------------------------
+
+def tag(*keys):
+    """Agrega claves a la respuesta actual."""
+    if has_request_context():
+        g.setdefault("surrogate_keys", set()).update(k for k in keys if k)
+
+
+def tag_products(products):
+    tag(*(f"product:{p.id}" for p in products or ()))
+
+
+def _header_value(keys):
+    value = " ".join(sorted(keys))
+    if len(value) > MAX_HEADER_BYTES:
+        # Sin las claves por producto; "products" sigue cubriendo la página
+        value = " ".join(sorted(k for k in keys if not k.startswith("product:")))
+    return value
+
+
+def add_surrogate_keys(response):
+    if not current_app.config.get("SURROGATE_KEYS_ENABLED", True):
+        return response
+    keys = set(g.get("surrogate_keys") or ())
+    deps = g.get("catalog_deps")
+    if deps:
+        # Menú de categorías y pie (SiteInfo) salen en todas las páginas públicas
+        keys.update(deps)
+        keys.update(("categories", "siteinfo"))
+    if keys and response.status_code == 200:
+        response.headers[current_app.config.get("SURROGATE_KEY_HEADER", "Surrogate-Key")] = _header_value(keys)
+        # TTL solo para el proxy, y solo en lo que ya es público (anónimos, ver http_cache)
+        max_age = current_app.config.get("SURROGATE_MAX_AGE", 0)
+        if max_age and response.cache_control.public:
+            response.headers["Surrogate-Control"] = f"max-age={max_age}"
+    return response
+
+
+# --- Purgadores ---------------------------------------------------------------------
+
+def register_purger(name, fn):
+    _purgers[name] = fn
+
+
+def _purge_log(keys, config):
+    current_app.logger.info(f"[purge] {' '.join(sorted(keys))}")
+
+
+def _purge_file(keys, config):
+    path = config.get("SURROGATE_PURGE_FILE") or os.path.join(
+        os.path.abspath(os.path.join(current_app.root_path, os.pardir)), "data", "purge.log"
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"at": time.time(), "keys": sorted(keys)}) + "\n")
+
+
+def _purge_http(keys, config):
+    url = config.get("SURROGATE_PURGE_URL")
+    if not url:
+        current_app.logger.warning("[purge] SURROGATE_PURGER=http sin SURROGATE_PURGE_URL")
+        return
+    header = config.get("SURROGATE_PURGE_HEADER", "Surrogate-Key")
+    token = config.get("SURROGATE_PURGE_TOKEN")
+    logger = current_app.logger
+    keys = sorted(keys)
+
+    def send():
+        # En un hilo: el commit del admin no espera al proxy
+        for i in range(0, len(keys), _PURGE_BATCH):
+            batch = " ".join(keys[i:i + _PURGE_BATCH])
+            req = urllib.request.Request(url, method="PURGE", headers={header: batch})
+            if token:
+                req.add_header("Authorization", f"Bearer {token}")
+            try:
+                with urllib.request.urlopen(req, timeout=5) as resp:
+                    resp.read()
+            except Exception as exc:
+                logger.warning(f"[purge] falló PURGE {url} ({len(batch.split())} claves): {exc}")
+
+    threading.Thread(target=send, name="surrogate-purge", daemon=True).start()
+
+
+register_purger("log", _purge_log)
+register_purger("file", _purge_file)
+register_purger("http", _purge_http)
+
+
+def purge(keys):
+    """Manda las claves al purgador configurado."""
+    keys = {k for k in keys if k}
+    if not keys or not has_app_context():
+        return
+    config = current_app.config
+    fn = _purgers.get((config.get("SURROGATE_PURGER") or "none").lower())
+    if fn is None:
+        return
+    try:
+        fn(keys, config)
+    except Exception as exc:
+        current_app.logger.warning(f"[purge] {exc}")
+
+
+# --- Claves afectadas por escrituras ------------------------------------------------
+
+def _old_and_new(state, attr):
+    hist = state.attrs[attr].history
+    values = set(hist.added or ()) | set(hist.deleted or ()) | set(hist.unchanged or ())
+    return {v for v in values if v is not None}
+
+
+def _keys_for(obj, kind):
+    state = sa_inspect(obj)
+    if isinstance(obj, Product):
+        keys = {f"product:{obj.id}"}
+        keys.update(f"category:{cid}" for cid in _old_and_new(state, "category_id"))
+        keys.update(f"brand:{bid}" for bid in _old_and_new(state, "brand_id"))
+        changed = {a.key for a in state.attrs if a.history.has_changes()}
+        if kind != "update" or changed & _SEARCH_FIELDS:
+            keys.add("search")
+        if kind != "update" or "featured" in changed:
+            keys.add("homepage")
+        return keys
+    if isinstance(obj, ProductImage):
+        return {f"product:{pid}" for pid in _old_and_new(state, "product_id")}
+    if isinstance(obj, Category):
+        return {f"category:{obj.id}", "categories"}
+    if isinstance(obj, Brand):
+        return {f"brand:{obj.id}", "brands"}
+    if isinstance(obj, Slide):
+        return {"slides"}
+    if isinstance(obj, SiteInfo):
+        return {"siteinfo"}
+    return set()
+
+
+def _pending(session):
+    return session.info.setdefault("surrogate_purge", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_after_flush(session, flush_context):
+    keys = _pending(session)
+    for kind, objs in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objs:
+            if kind == "update" and not session.is_modified(obj):
+                continue
+            keys.update(_keys_for(obj, kind))
+
+
+def _param_values(orm_execute_state, key):
+    """Valores de `key` en los parámetros de un executemany (UPDATE por PK / INSERT masivo)."""
+    params = orm_execute_state.parameters
+    if isinstance(params, (list, tuple)) and params and all(isinstance(p, dict) and key in p for p in params):
+        return {p[key] for p in params if p[key] is not None}
+    return None
+
+
+def _set_values(orm_execute_state):
+    """{columna: valores nuevos o None si no se conocen} de un UPDATE masivo: de los
+    parámetros de un executemany o de los .values() literales de la sentencia."""
+    params = orm_execute_state.parameters
+    if isinstance(params, (list, tuple)) and params and all(isinstance(p, dict) for p in params):
+        return {key: _param_values(orm_execute_state, key) for key in set().union(*params)}
+    out = {}
+    for col, value in (getattr(orm_execute_state.statement, "_values", None) or {}).items():
+        key = getattr(col, "key", col)
+        literal = getattr(value, "value", None)
+        out[key] = {literal} - {None} if getattr(value, "__visit_name__", None) == "bindparam" else None
+    return out
+
+
+def _moved_keys(orm_execute_state, ids):
+    """category:/brand: de los valores viejos y nuevos cuando un UPDATE/DELETE masivo por
+    id cambia (o borra) la categoría o la marca. Si no se conocen los nuevos, la clave
+    entera del namespace."""
+    keys = set()
+    changes = {} if orm_execute_state.is_delete else _set_values(orm_execute_state)
+    for column, prefix, namespace in (("category_id", "category", "categories"), ("brand_id", "brand", "brands")):
+        if not orm_execute_state.is_delete and column not in changes:
+            continue
+        if ids:
+            attr = getattr(Product, column)
+            old = orm_execute_state.session.connection().execute(
+                select(attr).distinct().where(Product.id.in_(list(ids)), attr.isnot(None))
+            ).scalars()
+            keys.update(f"{prefix}:{v}" for v in old)
+        new = changes.get(column, set())
+        if new is None:
+            keys.add(namespace)
+        else:
+            keys.update(f"{prefix}:{v}" for v in new)
+    return keys
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    table = getattr(getattr(mapper, "local_table", None), "name", None)
+    if table not in ("products", "product_images", "categories", "brands", "slides", "site_info"):
+        return
+    keys = _pending(orm_execute_state.session)
+    if table == "products":
+        if orm_execute_state.is_insert:
+            keys.update(("products", "search", "homepage"))
+            return
+        ids = _param_values(orm_execute_state, "id")
+        if ids is None:
+            stmt = orm_execute_state.statement
+            ids_stmt = select(Product.id).limit(BULK_ID_LIMIT + 1)
+            if stmt.whereclause is not None:
+                ids_stmt = ids_stmt.where(stmt.whereclause)
+            ids = list(orm_execute_state.session.connection().execute(ids_stmt).scalars())
+        if len(ids) > BULK_ID_LIMIT:
+            keys.add("products")
+        else:
+            keys.update(f"product:{pid}" for pid in ids)
+            keys.add("search")
+            # Las páginas de categoría y marca solo llevan category:/brand: <id>
+            keys.update(_moved_keys(orm_execute_state, ids))
+    elif table == "product_images":
+        product_ids = _param_values(orm_execute_state, "product_id")
+        if product_ids is not None and len(product_ids) <= BULK_ID_LIMIT:
+            keys.update(f"product:{pid}" for pid in product_ids)
+        else:
+            keys.add("products")
+    elif table == "site_info":
+        keys.add("siteinfo")
+    else:
+        keys.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _purge_after_commit(session):
+    keys = session.info.pop("surrogate_purge", None)
+    if keys:
+        purge(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("surrogate_purge", None)
+
+
+def init_app(app):
+    app.after_request(add_surrogate_keys)
@@ -0,0 +1,221 @@
+"""Sincronización incremental entre static/img/<subdir> y el volumen persistente.
+
+En lugar de copiar todo en cada arranque, se guarda un manifiesto por subcarpeta
+(nombre -> tamaño y mtime de origen) en el volumen y solo se copian archivos nuevos
+o modificados según ese registro (con verify_hash se confirma por sha256). Las copias corren en paralelo y escriben primero a
+un temporal para que nunca se sirva una imagen a medio copiar. Un lock de archivo
+evita que dos procesos sincronicen a la vez.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .file_serving import is_immutable_name
+
+MANIFEST_NAME = ".sync_manifest.json"
+LOCK_NAME = ".sync.lock"
+_HASH_CHUNK = 1024 * 1024
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan_dir(path):
+    """Devuelve {nombre: (size, mtime_ns)} de los archivos regulares de `path` (no recursivo)."""
+    entries = {}
+    if not os.path.isdir(path):
+        return entries
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                continue
+            st = entry.stat(follow_symlinks=False)
+            entries[entry.name] = (st.st_size, st.st_mtime_ns)
+    return entries
+
+
+def load_manifest(upload_root):
+    path = os.path.join(upload_root, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            if isinstance(data, dict):
+                return data
+    except Exception:
+        pass
+    return {}
+
+
+def save_manifest(upload_root, manifest):
+    path = os.path.join(upload_root, MANIFEST_NAME)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def plan_subdir(src_dir, dst_dir, manifest_entry, verify_hash=False):
+    """Calcula qué archivos de src_dir hay que copiar a dst_dir.
+
+    Con el destino del mismo tamaño, un archivo se saltea si el manifiesto registra el
+    mismo (size, mtime) de origen. Si el registro difiere se copia, salvo que el nombre sea
+    de contenido inmutable (uuid4().hex) o que verify_hash confirme el mismo sha256. Sin
+    registro (volumen anterior al manifiesto) alcanza el mismo tamaño."""
+    src = scan_dir(src_dir)
+    dst = scan_dir(dst_dir)
+    to_copy = []
+    unchanged = 0
+    for name, (size, mtime_ns) in src.items():
+        rec = manifest_entry.get(name)
+        dst_meta = dst.get(name)
+        if dst_meta is not None and dst_meta[0] == size:
+            if rec and rec[0] == size and rec[1] == mtime_ns:
+                unchanged += 1
+                continue
+            # Nombres uuid (contenido inmutable): mismo tamaño alcanza aunque el checkout de
+            # cada deploy cambie los mtime. Logo, slides o imágenes de seed se decide por el registro.
+            if not verify_hash and (rec is None or is_immutable_name(name)):
+                unchanged += 1
+                continue
+            if verify_hash and _file_sha256(os.path.join(src_dir, name)) == _file_sha256(os.path.join(dst_dir, name)):
+                unchanged += 1
+                continue
+        to_copy.append((name, size, mtime_ns))
+    return {"src": src, "to_copy": to_copy, "unchanged": unchanged}
+
+
+def _copy_atomic(src_path, dst_path):
+    tmp = f"{dst_path}.part{os.getpid()}"
+    try:
+        shutil.copy2(src_path, tmp)
+        os.replace(tmp, dst_path)
+    finally:
+        if os.path.exists(tmp):
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+class _SyncLock:
+    """Lock exclusivo no bloqueante sobre <upload_root>/.sync.lock."""
+
+    def __init__(self, upload_root):
+        self.path = os.path.join(upload_root, LOCK_NAME)
+        self.fd = None
+        self._excl = False
+
+    def acquire(self):
+        try:
+            import fcntl
+        except ImportError:  # Windows (desarrollo local): archivo exclusivo
+            try:
+                self.fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                self._excl = True
+                return True
+            except FileExistsError:
+                return False
+        self.fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            os.close(self.fd)
+            self.fd = None
+            return False
+
+    def release(self):
+        if self.fd is None:
+            return
+        os.close(self.fd)
+        self.fd = None
+        if self._excl:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def sync_to_volume(src_root, upload_root, subdirs, dry_run=False, workers=None, verify_hash=False, logger=None):
+    """Copia a upload_root/<subdir> solo lo nuevo o modificado de src_root/<subdir>.
+
+    Devuelve un reporte dict con archivos/bytes copiados por subcarpeta. Si otro proceso
+    tiene el lock, no hace nada y devuelve locked=True."""
+    report = {"dry_run": dry_run, "locked": False, "files": 0, "bytes": 0, "unchanged": 0, "errors": [], "subdirs": {}, "elapsed_ms": 0.0}
+    t0 = time.perf_counter()
+    os.makedirs(upload_root, exist_ok=True)
+    lock = _SyncLock(upload_root)
+    if not dry_run and not lock.acquire():
+        report["locked"] = True
+        if logger:
+            logger.info("[uploads-sync] otro proceso está sincronizando; se omite")
+        return report
+    try:
+        manifest = load_manifest(upload_root)
+        workers = workers or min(8, (os.cpu_count() or 2) * 2)
+        for name in subdirs:
+            src_dir = os.path.join(src_root, name)
+            dst_dir = os.path.join(upload_root, name)
+            # Si src ya es el symlink al volumen no hay nada que copiar
+            if not os.path.isdir(src_dir) or os.path.realpath(src_dir) == os.path.realpath(dst_dir):
+                continue
+            entry = manifest.get(name) or {}
+            plan = plan_subdir(src_dir, dst_dir, entry, verify_hash=verify_hash)
+            sub = {
+                "files": len(plan["to_copy"]),
+                "bytes": sum(size for _, size, _ in plan["to_copy"]),
+                "unchanged": plan["unchanged"],
+                "plan": [fn for fn, _, _ in plan["to_copy"]],
+                "errors": 0,
+            }
+            report["subdirs"][name] = sub
+            report["unchanged"] += plan["unchanged"]
+            if dry_run:
+                report["files"] += sub["files"]
+                report["bytes"] += sub["bytes"]
+                continue
+            os.makedirs(dst_dir, exist_ok=True)
+            copied = []
+
+            def _copy(item):
+                fn, size, mtime_ns = item
+                _copy_atomic(os.path.join(src_dir, fn), os.path.join(dst_dir, fn))
+                return fn, size, mtime_ns
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_copy, item) for item in plan["to_copy"]]
+                for fut in futures:
+                    try:
+                        copied.append(fut.result())
+                    except Exception as exc:
+                        sub["errors"] += 1
+                        report["errors"].append(f"{name}: {exc}")
+            for fn, size, mtime_ns in copied:
+                entry[fn] = [size, mtime_ns]
+                report["files"] += 1
+                report["bytes"] += size
+            # Registrar también lo que ya estaba igual, para no re-evaluarlo
+            pending = {fn for fn, _, _ in plan["to_copy"]}
+            for fn, (size, mtime_ns) in plan["src"].items():
+                if fn not in pending:
+                    entry[fn] = [size, mtime_ns]
+            manifest[name] = entry
+        if not dry_run:
+            save_manifest(upload_root, manifest)
+    finally:
+        lock.release()
+    report["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+    if logger:
+        logger.info(
+            f"[uploads-sync] {'plan' if dry_run else 'copiados'} {report['files']} archivo(s), "
+            f"{report['bytes']} bytes; sin cambios {report['unchanged']}; {report['elapsed_ms']:.0f} ms"
+        )
+    return report
@@ -0,0 +1,123 @@
+"""Precalentamiento de un worker recién arrancado.
+
+Abre las conexiones base del pool, compila las plantillas, llena el cache del catálogo y
+renderiza la portada y las categorías con más productos, para que los primeros
+visitantes después de un deploy no paguen todo eso. Corre dentro de un presupuesto de
+tiempo (WARMUP_BUDGET_MS) y devuelve un reporte de lo que alcanzó a hacer. El
+presupuesto se revisa entre pasos (cada cache de prime y cada página): un paso lento ya
+empezado puede pasarse.
+
+Se dispara desde gunicorn (`post_worker_init`) o con GET /_warmup.
+"""
+import time
+
+from sqlalchemy import func, text
+
+from . import db
+
+
+def _open_pool_connections(app, wanted):
+    """Abre `wanted` conexiones a la vez y las devuelve al pool, que las mantiene abiertas."""
+    engine = db.engine
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        wanted = min(wanted, size())
+    conns = []
+    try:
+        for _ in range(max(1, wanted)):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            conns.append(conn)
+    finally:
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
+
+def _top_category_slugs(limit):
+    """Categorías con más productos (no hay métricas de tráfico; es el mejor proxy)."""
+    from .models import Category, Product
+
+    rows = (
+        db.session.query(Category.slug, func.count(Product.id).label("n"))
+        .join(Product, Product.category_id == Category.id)
+        .group_by(Category.slug)
+        .order_by(func.count(Product.id).desc())
+        .limit(limit)
+        .all()
+    )
+    return [r.slug for r in rows]
+
+
+def warm_up(app, budget_ms=None, top_n=None, connections=None):
+    """Ejecuta los pasos en orden hasta agotar el presupuesto. Nunca lanza."""
+    from flask import url_for
+    from .catalog_cache import prime
+
+    cfg = app.config
+    budget_ms = budget_ms if budget_ms is not None else cfg.get("WARMUP_BUDGET_MS", 3000)
+    top_n = top_n if top_n is not None else cfg.get("WARMUP_TOP_CATEGORIES", 5)
+    connections = connections if connections is not None else cfg.get("WARMUP_POOL_CONNECTIONS", 3)
+    t0 = time.perf_counter()
+    report = {
+        "budget_ms": budget_ms,
+        "connections": 0,
+        "templates": 0,
+        "caches": [],
+        "pages": [],
+        "skipped": [],
+        "errors": [],
+        "timed_out": False,
+    }
+
+    deadline = t0 + budget_ms / 1000
+
+    def remaining():
+        return budget_ms - (time.perf_counter() - t0) * 1000
+
+    with app.app_context():
+        try:
+            report["connections"] = _open_pool_connections(app, connections)
+        except Exception as exc:
+            report["errors"].append(f"pool: {exc}")
+
+        primed = prime(app, deadline=deadline)
+        report["templates"] = primed["templates"]
+        report["caches"] = primed["caches"]
+        report["errors"] += primed["errors"]
+        if primed["skipped"]:
+            report["timed_out"] = True
+            report["skipped"] += primed["skipped"]
+
+        paths = []
+        try:
+            with app.test_request_context():
+                paths.append(url_for("main.index"))
+                for slug in _top_category_slugs(top_n):
+                    paths.append(url_for("main.category_page", slug=slug))
+        except Exception as exc:
+            db.session.rollback()
+            report["errors"].append(f"categorías: {exc}")
+        finally:
+            db.session.remove()
+
+    client = app.test_client()
+    for path in paths:
+        if remaining() <= 0:
+            report["timed_out"] = True
+            report["skipped"].append(path)
+            continue
+        t_page = time.perf_counter()
+        try:
+            resp = client.get(path, headers={"X-Warmup": "1"})
+            report["pages"].append({"path": path, "status": resp.status_code, "ms": round((time.perf_counter() - t_page) * 1000, 1)})
+        except Exception as exc:
+            report["errors"].append(f"{path}: {exc}")
+
+    report["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    app.logger.info(
+        f"[warmup] {report['connections']} conexiones, {report['templates']} plantillas, "
+        f"{len(report['pages'])} páginas en {report['elapsed_ms']:.0f} ms"
+        + (f" (presupuesto agotado, omitidas {len(report['skipped'])})" if report["timed_out"] else "")
+    )
+    return report
@@ -0,0 +1,85 @@
+"""Configuración de gunicorn (`gunicorn -c gunicorn.conf.py ferreteria_web:app`).
+
+Con GUNICORN_PRELOAD=true (default) la app se importa una sola vez en el master, que
+además precarga el cache del catálogo y compila las plantillas; los workers las heredan
+copy-on-write. El pool de conexiones de SQLAlchemy nunca se comparte entre procesos:
+el master lo cierra antes del fork y cada worker lo descarta al arrancar. Antes de
+aceptar tráfico cada worker corre app.warmup (WARMUP_ON_BOOT) para abrir sus conexiones
+y renderizar las páginas más visitadas.
+
+Variables: PORT, WEB_CONCURRENCY (workers), GUNICORN_MAX_WORKERS, GUNICORN_THREADS,
+GUNICORN_PRELOAD, GUNICORN_TIMEOUT.
+"""
+import gc
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+_cpus = multiprocessing.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "gthread"
+# 2*CPU+1 acotado: en contenedores chicos cpu_count suele mentir hacia arriba
+workers = _env_int("WEB_CONCURRENCY", max(2, min(_cpus * 2 + 1, _env_int("GUNICORN_MAX_WORKERS", 4))))
+threads = _env_int("GUNICORN_THREADS", 4)
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = _env_int("GUNICORN_TIMEOUT", 60)
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def _dispose_engine(flask_app, close):
+    from app import db
+
+    with flask_app.app_context():
+        db.engine.dispose(close=close)
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    flask_app = server.app.wsgi()  # ya importada por preload
+    try:
+        from app.catalog_cache import prime
+
+        prime(flask_app)
+    except Exception as exc:
+        server.log.warning(f"[gunicorn] precarga omitida: {exc}")
+    # Que ningún socket abierto en el master llegue a los hijos
+    try:
+        _dispose_engine(flask_app, close=True)
+    except Exception as exc:
+        server.log.warning(f"[gunicorn] no se pudo cerrar el pool del master: {exc}")
+    # Congelar lo construido hasta acá: el GC no vuelve a tocar esas páginas y no se copian
+    gc.freeze()
+    server.log.info(f"[gunicorn] preload listo: workers={workers} threads={threads}")
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    # Descartar conexiones heredadas sin cerrarlas (pertenecen al proceso padre)
+    try:
+        _dispose_engine(server.app.wsgi(), close=False)
+    except Exception as exc:
+        worker.log.warning(f"[gunicorn] dispose post_fork falló: {exc}")
+
+
+def post_worker_init(worker):
+    flask_app = worker.wsgi
+    if not flask_app.config.get("WARMUP_ON_BOOT", True):
+        return
+    try:
+        from app.warmup import warm_up
+
+        warm_up(flask_app)
+    except Exception as exc:
+        worker.log.warning(f"[gunicorn] warm-up falló: {exc}")
@@ -0,0 +1,31 @@
+"""add catalog_versions table
+
+Revision ID: a7b8c9d0e1f2
+Revises: merge_ab12_d4e5f6_heads
+Create Date: 2026-01-12 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7b8c9d0e1f2'
+down_revision = 'merge_ab12_d4e5f6_heads'
+branch_labels = None
+depends_on = None
+
+NAMESPACES = ['products', 'categories', 'brands', 'slides', 'siteinfo', 'homepage']
+
+
+def upgrade() -> None:
+    table = op.create_table(
+        'catalog_versions',
+        sa.Column('namespace', sa.String(length=40), primary_key=True, nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=True),
+    )
+    op.bulk_insert(table, [{'namespace': ns, 'version': 0} for ns in NAMESPACES])
+
+
+def downgrade() -> None:
+    op.drop_table('catalog_versions')
@@ -0,0 +1,39 @@
+"""add product_drafts and product_draft_rows tables
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-01-19 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'b8c9d0e1f2a3'
+down_revision = 'a7b8c9d0e1f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'product_drafts',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_product_drafts_expires_at', 'product_drafts', ['expires_at'])
+    op.create_table(
+        'product_draft_rows',
+        sa.Column('draft_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('product_drafts.id', ondelete='CASCADE'), primary_key=True, nullable=False),
+        sa.Column('row_index', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('data', sa.JSON(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('product_draft_rows')
+    op.drop_index('ix_product_drafts_expires_at', table_name='product_drafts')
+    op.drop_table('product_drafts')
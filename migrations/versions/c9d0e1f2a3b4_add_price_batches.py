@@ -0,0 +1,45 @@
+"""add price_batches and price_batch_items tables
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-01-26 09:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c9d0e1f2a3b4'
+down_revision = 'b8c9d0e1f2a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'price_batches',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('scope', sa.JSON(), nullable=False),
+        sa.Column('operation', sa.String(length=20), nullable=False),
+        sa.Column('value', sa.Numeric(12, 4), nullable=False),
+        sa.Column('rounding', sa.String(length=20), nullable=False, server_default='cent'),
+        sa.Column('affected', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=True),
+        sa.Column('reverted_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_price_batches_created_at', 'price_batches', ['created_at'])
+    op.create_table(
+        'price_batch_items',
+        sa.Column('batch_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('price_batches.id', ondelete='CASCADE'), primary_key=True, nullable=False),
+        sa.Column('product_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True, nullable=False),
+        sa.Column('old_price', sa.Numeric(12, 2), nullable=True),
+        sa.Column('new_price', sa.Numeric(12, 2), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('price_batch_items')
+    op.drop_index('ix_price_batches_created_at', table_name='price_batches')
+    op.drop_table('price_batches')
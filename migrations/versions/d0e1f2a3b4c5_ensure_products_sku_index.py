@@ -0,0 +1,27 @@
+"""ensure non-unique index on products.sku
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-02-02 10:00:00.000000
+
+The stock sync feed resolves SKUs with `WHERE sku IN (...)`. The initial migration
+created ix_products_sku, but databases that were created while sku was unique only had
+products_sku_key, which d4e5f6a7b8c9 dropped without a replacement.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd0e1f2a3b4c5'
+down_revision = 'c9d0e1f2a3b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_products_sku ON products (sku);")
+
+
+def downgrade() -> None:
+    # El índice pertenece a la migración inicial; no se elimina aquí.
+    pass
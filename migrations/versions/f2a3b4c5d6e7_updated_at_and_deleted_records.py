@@ -0,0 +1,44 @@
+"""updated_at on categories, brands, slides and product_images; deleted_records tombstones
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-02-09 11:20:00.000000
+
+The incremental export selects rows by updated_at, so every exported table needs one.
+Existing rows are backfilled with created_at. deleted_records keeps the ids removed from
+the catalog so an incremental dump can carry the deletions.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'f2a3b4c5d6e7'
+down_revision = 'e1f2a3b4c5d6'
+branch_labels = None
+depends_on = None
+
+_TABLES = ('categories', 'brands', 'slides', 'product_images')
+
+
+def upgrade() -> None:
+    for table in _TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = created_at WHERE created_at IS NOT NULL")
+    op.create_index('ix_products_updated_at', 'products', ['updated_at'])
+    op.create_table(
+        'deleted_records',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column('table_name', sa.String(length=40), nullable=False),
+        sa.Column('record_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+    )
+    op.create_index('ix_deleted_records_deleted_at', 'deleted_records', ['deleted_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deleted_records_deleted_at', table_name='deleted_records')
+    op.drop_table('deleted_records')
+    op.drop_index('ix_products_updated_at', table_name='products')
+    for table in reversed(_TABLES):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the in-memory listing engine (app/catalog_engine.py) against the SQL path.
+Usage:
+  python scripts/bench_catalog_engine.py [--queries 300] [--per-page 20] [--seed 42]
+
+Runs against the products already in the database (load a dump or use
+scripts/bench_stock_sync.py --keep first). Builds the engine snapshot, then runs the same
+random listings (category branch, brand, stock, price range, 0-2 words from product
+names, page 1-3) through both paths: count + offset/limit like the views, and
+catalog_engine.listing(). Prints latency percentiles for each and how many results
+differ in total or page ids (should be 0 unless created_at has ties).
+Requires numpy.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+# Ensure project root is on sys.path so `from app import ...` works when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import func, or_, select
+
+from app import create_app, db, catalog_cache, catalog_engine
+from app.models import Product
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--queries", type=int, default=300)
+parser.add_argument("--per-page", type=int, default=20)
+parser.add_argument("--seed", type=int, default=42)
+args = parser.parse_args()
+
+rng = random.Random(args.seed)
+
+
+def sql_listing(page, per_page, category_ids=None, brand_id=None, stock="", pmin=None, pmax=None, q=""):
+    qry = Product.query
+    if category_ids is not None:
+        qry = qry.filter(Product.category_id.in_(category_ids))
+    if brand_id is not None:
+        qry = qry.filter(Product.brand_id == brand_id)
+    if stock == "in":
+        qry = qry.filter(Product.in_stock.is_(True))
+    elif stock == "out":
+        qry = qry.filter(Product.in_stock.is_(False))
+    if pmin is not None:
+        qry = qry.filter(Product.price.isnot(None), Product.price >= pmin)
+    if pmax is not None:
+        qry = qry.filter(Product.price.isnot(None), Product.price <= pmax)
+    for tok in q.split():
+        like = f"%{tok}%"
+        qry = qry.filter(or_(Product.name.ilike(like), Product.short_desc.ilike(like), Product.long_desc.ilike(like), Product.sku.ilike(like)))
+    qry = qry.order_by(Product.created_at.desc())
+    total = qry.count()
+    page = min(page, max(1, (total + per_page - 1) // per_page))
+    return qry.offset((page - 1) * per_page).limit(per_page).all(), total, page
+
+
+def random_specs(n):
+    tree = catalog_cache.category_tree()
+    categories = list(tree["by_id"])
+    brands = [b.id for b in catalog_cache.brand_list()]
+    names = db.session.execute(select(Product.name).order_by(func.random()).limit(500)).scalars().all()
+    words = [w for name in names for w in (name or "").split() if len(w) > 2 and not any(c in w for c in "%_\\")]
+    prices = [p for p in db.session.execute(select(Product.price).where(Product.price.isnot(None)).limit(2000)).scalars()]
+    specs = []
+    for _ in range(n):
+        spec = {"page": rng.choice([1, 1, 2, 3])}
+        if categories and rng.random() < 0.5:
+            spec["category_ids"] = catalog_cache.category_branch_ids(rng.choice(categories))
+        if brands and rng.random() < 0.3:
+            spec["brand_id"] = rng.choice(brands)
+        if rng.random() < 0.3:
+            spec["stock"] = rng.choice(["in", "out"])
+        if prices and rng.random() < 0.3:
+            lo, hi = sorted(rng.sample(prices, 2)) if len(prices) > 1 else (prices[0], prices[0])
+            spec["pmin"], spec["pmax"] = Decimal(lo), Decimal(hi)
+        if words and rng.random() < 0.6:
+            spec["q"] = " ".join(rng.sample(words, rng.choice([1, 1, 2])))
+        specs.append(spec)
+    return specs
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+app = create_app(lean=True)
+app.config["CATALOG_ENGINE_ENABLED"] = True
+with app.app_context():
+    if not catalog_engine.enabled():
+        sys.exit("numpy no está instalado")
+    total_products = db.session.execute(select(func.count()).select_from(Product)).scalar_one()
+    t0 = time.perf_counter()
+    catalog_engine.warm()
+    print(f"foto: {total_products} productos en {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    specs = random_specs(args.queries)
+    sql_times, engine_times, mismatches = [], [], 0
+    for spec in specs:
+        page = spec.pop("page")
+        t0 = time.perf_counter()
+        sql_items, sql_total, _ = sql_listing(page, args.per_page, **spec)
+        sql_times.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        hit = catalog_engine.listing(page=page, per_page=args.per_page, **spec)
+        engine_times.append(time.perf_counter() - t0)
+        if hit is None:
+            mismatches += 1
+            continue
+        items, total, _ = hit
+        if total != sql_total or [p.id for p in items] != [p.id for p in sql_items]:
+            mismatches += 1
+        db.session.expunge_all()
+
+    for label, times in (("sql", sql_times), ("motor", engine_times)):
+        print(
+            f"{label:>5}: media {statistics.mean(times) * 1000:.2f} ms, p50 {pct(times, 0.5):.2f} ms, "
+            f"p95 {pct(times, 0.95):.2f} ms, p99 {pct(times, 0.99):.2f} ms"
+        )
+    print(f"aceleración (media): x{statistics.mean(sql_times) / max(statistics.mean(engine_times), 1e-9):.1f}")
+    print(f"diferencias: {mismatches} de {len(specs)}")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the SKU stock/price sync (app/stock_sync.py).
+Usage:
+  python scripts/bench_stock_sync.py [--rows 100000] [--chunk-size 1000] [--change-ratio 0.2] [--unknown-ratio 0.01] [--keep]
+
+Creates --rows products with SKU prefix BENCH-, generates an in-memory CSV feed where
+--change-ratio of the rows carry a new price/stock and --unknown-ratio are SKUs that do
+not exist, runs the sync twice (first pass applies changes, second pass must find
+nothing to change) and prints rows/s. Before syncing it checks that the feed (well over
+the 4 KB sniffer sample) parses back row for row. The BENCH- products are deleted at the end unless
+--keep is given.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# Ensure project root is on sys.path so `from app import ...` works when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import delete, insert
+
+from app import create_app, db
+from app.models import Product
+from app.stock_sync import iter_records, sync_stream
+
+PREFIX = "BENCH-"
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=100_000)
+parser.add_argument("--chunk-size", type=int, default=1000)
+parser.add_argument("--change-ratio", type=float, default=0.2)
+parser.add_argument("--unknown-ratio", type=float, default=0.01)
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--keep", action="store_true", help="No borrar los productos BENCH- al terminar")
+args = parser.parse_args()
+
+rng = random.Random(args.seed)
+
+
+def seed_products(n):
+    now = datetime.now(timezone.utc)
+    prices = {}
+    batch = []
+    for i in range(n):
+        sku = f"{PREFIX}{i:07d}"
+        price = Decimal(rng.randint(100, 500_000)) / 100
+        prices[sku] = price
+        batch.append({"id": uuid.uuid4(), "name": f"Producto bench {i}", "sku": sku, "price": price, "in_stock": True, "created_at": now, "updated_at": now})
+        if len(batch) >= 5000:
+            db.session.execute(insert(Product), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Product), batch)
+    db.session.commit()
+    return prices
+
+
+def build_feed(prices):
+    out = io.StringIO()
+    out.write("sku,price,in_stock\n")
+    for sku, price in prices.items():
+        if rng.random() < args.change_ratio:
+            price = (price * Decimal("1.10")).quantize(Decimal("0.01"))
+            stock = rng.choice(["0", "1", "12"])
+        else:
+            stock = "1"
+        out.write(f"{sku},{price},{stock}\n")
+    unknown = int(len(prices) * args.unknown_ratio)
+    for i in range(unknown):
+        out.write(f"{PREFIX}X{i:07d},100.00,1\n")
+    return out.getvalue().encode("utf-8")
+
+
+def check_feed(feed):
+    """Cada fila del feed tiene que volver entera, también las que cruzan la muestra."""
+    expected = [line.split(",") for line in feed.decode("utf-8").splitlines()[1:]]
+    for stream in (io.BytesIO(feed), io.StringIO(feed.decode("utf-8"), newline="")):
+        got = [[r["sku"], r["price"], r["in_stock"]] for r in iter_records(stream)]
+        if got != expected:
+            bad = next((i for i, (a, b) in enumerate(zip(got, expected)) if a != b), min(len(got), len(expected)))
+            sys.exit(f"feed mal leído en la fila {bad + 2}: {got[bad:bad + 1]} != {expected[bad:bad + 1]} ({len(got)}/{len(expected)} filas)")
+
+
+def run(label, feed):
+    t0 = time.perf_counter()
+    report = sync_stream(io.BytesIO(feed), fmt="csv", chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - t0
+    print(
+        f"{label}: {report['rows']} filas en {elapsed:.2f} s ({report['rows'] / elapsed:,.0f} filas/s) — "
+        f"actualizadas {report['updated']}, sin cambios {report['unchanged']}, desconocidos {report['unmatched']}, "
+        f"errores {len(report['errors'])}"
+    )
+    return report
+
+
+app = create_app(lean=True)
+with app.app_context():
+    t0 = time.perf_counter()
+    prices = seed_products(args.rows)
+    print(f"seed: {args.rows} productos en {time.perf_counter() - t0:.2f} s")
+    feed = build_feed(prices)
+    print(f"feed: {len(feed) / 1024 / 1024:.1f} MB, chunk={args.chunk_size}")
+    check_feed(feed)
+    try:
+        run("pasada 1 (con cambios)", feed)
+        second = run("pasada 2 (idempotente)", feed)
+        if second["updated"]:
+            print(f"ATENCIÓN: la segunda pasada actualizó {second['updated']} filas; debería ser 0")
+    finally:
+        if not args.keep:
+            db.session.execute(delete(Product).where(Product.sku.like(f"{PREFIX}%")))
+            db.session.commit()
+            print("productos BENCH- eliminados")
@@ -0,0 +1,154 @@
+// Borrador: marcar antes de publicar las filas cuyo SKU ya existe o se repite en el listado
+document.addEventListener('DOMContentLoaded', () => {
+  const summary = document.getElementById('skuConflictSummary');
+  if (!summary) return;
+  const endpoint = summary.dataset.endpoint;
+  const post = (body) => fetch(endpoint, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+    body: JSON.stringify(body),
+  }).then(r => r.json());
+
+  const mark = (input, message) => {
+    input.classList.toggle('is-invalid', !!message);
+    const feedback = input.nextElementSibling;
+    if (feedback) feedback.textContent = message || '';
+  };
+  const describe = (info) => {
+    const parts = [];
+    if (info.existing && info.existing.length) parts.push(`ya existe (${info.existing.slice(0, 2).join(', ')})`);
+    if (info.duplicate) parts.push('repetido en el listado');
+    return parts.join(' y ');
+  };
+
+  post({ draft: true }).then(data => {
+    if (!data.success) return;
+    document.querySelectorAll('[data-sku-row]').forEach(input => {
+      const info = data.rows[input.dataset.skuRow];
+      mark(input, info ? describe(info) : '');
+    });
+    const count = Object.keys(data.rows).length;
+    if (!count) return;
+    const pages = data.pages.length > 1 ? ` (páginas ${data.pages.slice(0, 10).join(', ')}${data.pages.length > 10 ? '…' : ''})` : '';
+    summary.textContent = `${count} fila(s) con SKU en conflicto${pages}. Corregilas antes de publicar.`;
+    summary.classList.remove('d-none');
+  }).catch(() => {});
+
+  document.querySelectorAll('[data-sku-row]').forEach(input => {
+    input.addEventListener('change', () => {
+      const sku = input.value.trim();
+      if (!sku) { mark(input, ''); return; }
+      post({ skus: [sku] }).then(data => {
+        if (!data.success) return;
+        const existing = data.existing[sku];
+        mark(input, existing ? describe({ existing: existing.map(p => p.name) }) : '');
+      }).catch(() => {});
+    });
+  });
+});
+
+// Grilla de productos: al salir de un campo se envía solo lo que cambió (PATCH JSON)
+document.addEventListener('DOMContentLoaded', () => {
+  const statusEl = document.getElementById('inlinePatchStatus');
+  const table = document.getElementById('productsTable');
+  if (!statusEl || !table) return;
+  const endpoint = statusEl.dataset.endpoint;
+
+  const currentValue = (el) => (el.type === 'checkbox' ? el.checked : el.value);
+  const originalValue = (el) => {
+    if (el.type === 'checkbox') return el.defaultChecked;
+    if (el.tagName === 'SELECT') {
+      const opt = Array.from(el.options).find(o => o.defaultSelected);
+      return opt ? opt.value : '';
+    }
+    return el.defaultValue;
+  };
+  const markSaved = (el) => {
+    if (el.type === 'checkbox') { el.defaultChecked = el.checked; return; }
+    if (el.tagName === 'SELECT') { Array.from(el.options).forEach(o => { o.defaultSelected = o.selected; }); return; }
+    el.defaultValue = el.value;
+  };
+  const setValue = (el, value) => {
+    if (el.type === 'checkbox') el.checked = !!value; else el.value = value;
+    markSaved(el);
+  };
+  const rowDiff = (tr) => {
+    const fields = {};
+    tr.querySelectorAll('[data-inline-field]').forEach(el => {
+      if (currentValue(el) !== originalValue(el)) fields[el.dataset.inlineField] = currentValue(el);
+    });
+    return fields;
+  };
+
+  const pending = new Map();
+  const sendRow = async (tr) => {
+    const fields = rowDiff(tr);
+    if (!Object.keys(fields).length) return;
+    const id = tr.dataset.inlineId;
+    if (pending.get(id)) return;
+    pending.set(id, true);
+    statusEl.textContent = 'Guardando…';
+    try {
+      const resp = await fetch(endpoint, {
+        method: 'PATCH',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+        body: JSON.stringify({ changes: [{ id, version: tr.dataset.inlineVersion, fields }] }),
+      });
+      const data = await resp.json().catch(() => ({}));
+      tr.querySelectorAll('[data-inline-field]').forEach(el => el.classList.remove('is-invalid'));
+      // Los campos rechazados quedan pendientes aunque el resto del producto se haya guardado
+      const rejected = new Set((data.errors || []).filter(err => err.id === id).map(err => err.field));
+      (data.updated || []).forEach(u => {
+        tr.dataset.inlineVersion = u.version;
+        tr.querySelectorAll('[data-inline-field]').forEach(el => {
+          const field = el.dataset.inlineField;
+          if (field in fields && !rejected.has(field)) markSaved(el);
+        });
+      });
+      (data.errors || []).forEach(err => {
+        const el = err.field ? tr.querySelector(`[data-inline-field="${err.field}"]`) : null;
+        if (el) { el.classList.add('is-invalid'); el.title = err.message; }
+      });
+      (data.conflicts || []).forEach(c => {
+        tr.dataset.inlineVersion = c.version;
+        Object.entries(c.current || {}).forEach(([field, value]) => {
+          const el = tr.querySelector(`[data-inline-field="${field}"]`);
+          if (el) setValue(el, value);
+        });
+      });
+      if (data.conflicts && data.conflicts.length) {
+        statusEl.textContent = 'Otro usuario modificó este producto; se recargaron sus valores. Volvé a aplicar tu cambio.';
+      } else if (data.errors && data.errors.length) {
+        statusEl.textContent = data.errors[0].message || 'Hay valores inválidos.';
+      } else if (!resp.ok) {
+        statusEl.textContent = data.message || 'No se pudo guardar.';
+      } else {
+        statusEl.textContent = 'Cambios guardados.';
+      }
+    } catch (e) {
+      statusEl.textContent = 'Sin conexión: el cambio no se guardó.';
+    } finally {
+      pending.delete(id);
+    }
+  };
+
+  table.addEventListener('focusout', (ev) => {
+    const el = ev.target.closest('[data-inline-field]');
+    if (!el) return;
+    const tr = el.closest('tr[data-inline-id]');
+    // Si el foco sigue dentro de la misma fila, esperar a que la deje
+    if (ev.relatedTarget && tr.contains(ev.relatedTarget)) return;
+    sendRow(tr);
+  });
+  // Enter no envía el formulario que rodea la tabla (borrado masivo): guarda la fila
+  table.addEventListener('keydown', (ev) => {
+    const el = ev.target.closest('input[data-inline-field]');
+    if (!el || ev.key !== 'Enter') return;
+    ev.preventDefault();
+    el.blur();
+  });
+  table.addEventListener('change', (ev) => {
+    const el = ev.target.closest('input[type=checkbox][data-inline-field], select[data-inline-field]');
+    if (el) sendRow(el.closest('tr[data-inline-id]'));
+  });
+});
@@ -190,7 +190,7 @@ document.addEventListener('DOMContentLoaded', () => {
       const KEY = 'recent_products_v1';
       const ids = JSON.parse(localStorage.getItem(KEY) || '[]');
       if (ids.length) {
-        fetch(`/api/products?ids=${ids.join(',')}`)
+        fetch(`/api/v2/products?fields=id,name,image&ids=${ids.join(',')}`)
           .then(r => r.json())
           .then(data => {
             const wrap = document.createElement('div');
@@ -602,4 +602,248 @@ document.addEventListener('DOMContentLoaded', () => {
 
     enableGalleryDragSort();
   }
+
+  // Autocompletado (/api/suggest) en los campos con data-suggest
+  document.querySelectorAll('input[data-suggest]').forEach((input) => {
+    const endpoint = input.getAttribute('data-suggest');
+    const menu = document.createElement('div');
+    menu.className = 'dropdown-menu w-100 shadow-sm';
+    menu.setAttribute('role', 'listbox');
+    input.insertAdjacentElement('afterend', menu);
+    input.setAttribute('aria-autocomplete', 'list');
+    const TYPE_LABELS = { product: 'Producto', category: 'Categoría', brand: 'Marca' };
+    const cache = new Map();
+    let timer = null;
+    let controller = null;
+    let active = -1;
+
+    const hide = () => {
+      menu.classList.remove('show');
+      active = -1;
+    };
+
+    const highlight = (idx) => {
+      const items = menu.querySelectorAll('.dropdown-item');
+      items.forEach((el, i) => el.classList.toggle('active', i === idx));
+      active = idx;
+    };
+
+    const render = (items) => {
+      menu.innerHTML = '';
+      items.forEach((item) => {
+        if (!item.url) return;
+        const a = document.createElement('a');
+        a.className = 'dropdown-item d-flex justify-content-between gap-2';
+        a.href = item.url;
+        a.setAttribute('role', 'option');
+        const label = document.createElement('span');
+        label.className = 'text-truncate';
+        label.textContent = item.label;
+        const kind = document.createElement('small');
+        kind.className = 'text-muted';
+        kind.textContent = TYPE_LABELS[item.type] || '';
+        a.append(label, kind);
+        menu.appendChild(a);
+      });
+      active = -1;
+      menu.classList.toggle('show', menu.children.length > 0);
+    };
+
+    const lookup = async (q) => {
+      if (cache.has(q)) {
+        render(cache.get(q));
+        return;
+      }
+      if (controller) controller.abort();
+      controller = new AbortController();
+      try {
+        const r = await fetch(`${endpoint}?q=${encodeURIComponent(q)}`, { signal: controller.signal, credentials: 'same-origin' });
+        if (!r.ok) return;
+        const data = await r.json();
+        cache.set(q, data.items || []);
+        if (input.value.trim() === q) render(data.items || []);
+      } catch (_) {}
+    };
+
+    input.addEventListener('input', () => {
+      clearTimeout(timer);
+      const q = input.value.trim();
+      if (q.length < 2) {
+        if (controller) controller.abort();
+        hide();
+        return;
+      }
+      timer = setTimeout(() => lookup(q), 150);
+    });
+
+    input.addEventListener('keydown', (ev) => {
+      if (!menu.classList.contains('show')) return;
+      const items = menu.querySelectorAll('.dropdown-item');
+      if (ev.key === 'ArrowDown') {
+        ev.preventDefault();
+        highlight(Math.min(active + 1, items.length - 1));
+      } else if (ev.key === 'ArrowUp') {
+        ev.preventDefault();
+        highlight(Math.max(active - 1, -1));
+      } else if (ev.key === 'Enter' && active >= 0) {
+        ev.preventDefault();
+        window.location.href = items[active].href;
+      } else if (ev.key === 'Escape') {
+        hide();
+      }
+    });
+
+    input.addEventListener('blur', () => setTimeout(hide, 150));
+  });
+
+  // Listados (categoría, marca, búsqueda): filtros y paginado sin recargar la página.
+  // Se pide solo la columna de resultados (?fragment=1) y se reemplaza en el lugar.
+  const listingResults = document.getElementById('listing-results');
+  if (listingResults && window.fetch && window.AbortController && window.history.pushState) {
+    const listingForm = document.querySelector('form[data-listing-form]');
+    const prefetched = new Map(); // url de página -> Promise<html>
+    let inflight = null;
+    let filterTimer = null;
+
+    const fragmentUrl = (url) => {
+      const u = new URL(url, window.location.href);
+      u.searchParams.set('fragment', '1');
+      return u.toString();
+    };
+
+    const formUrl = (form) => {
+      const u = new URL(form.getAttribute('action') || window.location.pathname, window.location.href);
+      const params = new URLSearchParams();
+      new FormData(form).forEach((value, key) => {
+        if (typeof value === 'string' && value.trim() !== '') params.append(key, value.trim());
+      });
+      u.search = params.toString();
+      return u.toString();
+    };
+
+    const fetchFragment = (url, signal) => fetch(fragmentUrl(url), {
+      signal,
+      credentials: 'same-origin',
+      headers: { 'X-Requested-With': 'XMLHttpRequest' },
+    }).then((r) => {
+      if (!r.ok) throw new Error(`HTTP ${r.status}`);
+      return r.text();
+    });
+
+    const syncForm = (url) => {
+      if (!listingForm) return;
+      const params = new URL(url, window.location.href).searchParams;
+      listingForm.querySelectorAll('input[name], select[name]').forEach((el) => {
+        if (el.type === 'checkbox' || el.type === 'radio') {
+          el.checked = params.getAll(el.name).includes(el.value);
+        } else if (el.type !== 'hidden') {
+          el.value = params.get(el.name) || '';
+        }
+      });
+    };
+
+    const prefetchNext = () => {
+      const meta = listingResults.querySelector('.listing-results');
+      if (!meta || !meta.dataset.nextUrl) return;
+      const next = new URL(meta.dataset.nextUrl, window.location.href).toString();
+      if (prefetched.has(next)) return;
+      if (navigator.connection && navigator.connection.saveData) return;
+      const p = fetchFragment(next).catch(() => {
+        prefetched.delete(next);
+        return null;
+      });
+      prefetched.set(next, p);
+    };
+
+    const schedulePrefetch = () => {
+      if (window.requestIdleCallback) {
+        window.requestIdleCallback(prefetchNext, { timeout: 3000 });
+      } else {
+        setTimeout(prefetchNext, 1500);
+      }
+    };
+
+    const loadListing = async (target, push) => {
+      const url = new URL(target, window.location.href).toString();
+      // Un cambio de filtro nuevo cancela el pedido anterior
+      if (inflight) inflight.abort();
+      const controller = new AbortController();
+      inflight = controller;
+      listingResults.setAttribute('aria-busy', 'true');
+      listingResults.classList.add('opacity-50');
+      try {
+        let html = null;
+        if (prefetched.has(url)) {
+          html = await prefetched.get(url);
+        }
+        if (html === null) {
+          html = await fetchFragment(url, controller.signal);
+        }
+        if (controller.signal.aborted) return;
+        prefetched.clear();
+        listingResults.innerHTML = html;
+        if (push) window.history.pushState({ listing: true }, '', url);
+        const top = listingResults.getBoundingClientRect().top;
+        if (top < 0) listingResults.scrollIntoView({ block: 'start' });
+        schedulePrefetch();
+      } catch (err) {
+        if (err.name === 'AbortError') return;
+        // Si falla el fragmento, navegación normal
+        window.location.href = url;
+      } finally {
+        if (inflight === controller) {
+          inflight = null;
+          listingResults.removeAttribute('aria-busy');
+          listingResults.classList.remove('opacity-50');
+        }
+      }
+    };
+
+    window.history.replaceState({ listing: true }, '', window.location.href);
+
+    if (listingForm) {
+      listingForm.addEventListener('submit', (ev) => {
+        ev.preventDefault();
+        clearTimeout(filterTimer);
+        loadListing(formUrl(listingForm), true);
+      });
+      listingForm.addEventListener('change', (ev) => {
+        if (ev.target.matches('input[type="text"], input[type="search"]')) return;
+        clearTimeout(filterTimer);
+        loadListing(formUrl(listingForm), true);
+      });
+      listingForm.addEventListener('input', (ev) => {
+        if (!ev.target.matches('input[type="text"], input[type="search"]')) return;
+        clearTimeout(filterTimer);
+        filterTimer = setTimeout(() => loadListing(formUrl(listingForm), true), 400);
+      });
+    }
+
+    listingResults.addEventListener('click', (ev) => {
+      const link = ev.target.closest('a.page-link');
+      if (!link || ev.defaultPrevented || ev.button !== 0 || ev.metaKey || ev.ctrlKey || ev.shiftKey || ev.altKey) return;
+      if (link.closest('.page-item.disabled, .page-item.active')) {
+        ev.preventDefault();
+        return;
+      }
+      if (new URL(link.href, window.location.href).origin !== window.location.origin) return;
+      ev.preventDefault();
+      loadListing(link.href, true);
+    });
+
+    listingResults.addEventListener('submit', (ev) => {
+      const form = ev.target;
+      if ((form.getAttribute('method') || 'get').toLowerCase() !== 'get') return;
+      ev.preventDefault();
+      loadListing(formUrl(form), true);
+    });
+
+    window.addEventListener('popstate', (ev) => {
+      if (!ev.state || !ev.state.listing) return;
+      syncForm(window.location.href);
+      loadListing(window.location.href, false);
+    });
+
+    schedulePrefetch();
+  }
 });